@@ -0,0 +1,133 @@
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+from .queries import (
+    InvalidQuery,
+    compile_filters,
+    parse_filters,
+    referenced_columns,
+)
+from .validators import INTEGER_RANGES
+
+# Query parameters of the aggregate endpoint that are not column filters
+AGGREGATE_PARAMS = {"metrics", "group_by"}
+AGGREGATE_FUNCTIONS = {"count", "sum", "avg", "min", "max"}
+# Types a dynamic table can be grouped by; numbers are aggregated instead
+GROUP_BY_TYPES = {"character varying", "boolean"}
+
+
+def aggregate_columns(params):
+    """Column names used by the metrics, grouping and filters of a request."""
+    names = referenced_columns(params, reserved=AGGREGATE_PARAMS)
+    names.update(
+        item.partition(":")[2] for item in params.get("metrics", "").split(",")
+    )
+    names.update(item.strip() for item in params.get("group_by", "").split(","))
+    names.discard("")
+    return names
+
+
+def parse_metrics(raw, columns):
+    """Parse ``metrics=count,sum:field2`` into ``[(function, column), ...]``.
+
+    ``count`` alone counts rows and ``count:field`` non-NULL values of any
+    field; the other functions take a number field.
+    """
+    metrics = []
+    for item in (raw or "count").split(","):
+        function, _, column = item.strip().partition(":")
+        if function not in AGGREGATE_FUNCTIONS:
+            raise InvalidQuery(f"Unknown aggregate function '{function}'")
+        if column:
+            data_type = columns.get(column)
+            if data_type is None:
+                raise InvalidQuery(f"Unknown field '{column}'")
+            if function != "count" and data_type not in INTEGER_RANGES:
+                raise InvalidQuery(f"'{function}' needs a number field, got '{column}'")
+        elif function != "count":
+            raise InvalidQuery(f"'{function}' needs a field, e.g. {function}:field")
+        if (function, column) in metrics:
+            raise InvalidQuery(f"Metric '{item.strip()}' appears twice")
+        metrics.append((function, column))
+    return metrics
+
+
+def parse_group_by(raw, columns):
+    group_by = []
+    if not raw:
+        return group_by
+    for column in raw.split(","):
+        column = column.strip()
+        data_type = columns.get(column)
+        if data_type is None:
+            raise InvalidQuery(f"Unknown field '{column}' in group_by")
+        if data_type not in GROUP_BY_TYPES:
+            raise InvalidQuery(
+                f"Cannot group by '{column}': only string and boolean fields"
+            )
+        if column in group_by:
+            raise InvalidQuery(f"Field '{column}' appears twice in group_by")
+        group_by.append(column)
+    return group_by
+
+
+def metric_name(function, column):
+    return f"{function}_{column}" if column else function
+
+
+def aggregate_sql(table_name, metrics, group_by, filters):
+    """Compile an aggregation to one parameterized query.
+
+    Groups are returned in ``group_by`` order, NULL groups last.
+    """
+    qn = connection.ops.quote_name
+    selected = [qn(column) for column in group_by]
+    for function, column in metrics:
+        if not column:
+            expression = "COUNT(*)"
+        elif function == "avg":
+            expression = f"AVG({qn(column)})::double precision"
+        else:
+            expression = f"{function.upper()}({qn(column)})"
+        selected.append(f"{expression} AS {qn(metric_name(function, column))}")
+
+    conditions, params = compile_filters(filters)
+    sql = f"SELECT {', '.join(selected)} FROM {qn(table_name)}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if group_by:
+        columns = ", ".join(qn(column) for column in group_by)
+        sql += f" GROUP BY {columns} ORDER BY {columns}"
+    return sql, params
+
+
+def aggregate(table_name, params, columns, using=DEFAULT_DB_ALIAS):
+    """Run the aggregation described by the aggregate endpoint's query string.
+
+    ``columns`` is the table's ``{column: data_type}`` map and ``using`` the
+    database alias to read from. Returns one dict per group with the group
+    values and one key per metric.
+    """
+    metrics = parse_metrics(params.get("metrics"), columns)
+    group_by = parse_group_by(params.get("group_by"), columns)
+    clashing = set(group_by) & {metric_name(*metric) for metric in metrics}
+    if clashing:
+        raise InvalidQuery(
+            f"Metric name clashes with group_by field '{clashing.pop()}'"
+        )
+    filters = parse_filters(params, columns, reserved=AGGREGATE_PARAMS)
+
+    sql, sql_params = aggregate_sql(table_name, metrics, group_by, filters)
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, sql_params)
+        names = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+    # SUM of a bigint column is numeric, but always a whole number
+    return [
+        {
+            name: int(value) if isinstance(value, Decimal) else value
+            for name, value in zip(names, row)
+        }
+        for row in rows
+    ]
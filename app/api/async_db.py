@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import itertools
+import re
+import time
+import weakref
+
+import asyncpg
+from django.conf import settings
+from django.db import connections
+
+from .catalog import COLUMNS_SQL
+
+# One pool per event loop; asyncpg connections cannot move between loops
+_pools = weakref.WeakKeyDictionary()
+
+# QueryRecorder of the request being served (see middleware.py), if any
+query_recorder = contextvars.ContextVar("query_recorder", default=None)
+
+
+def numbered(sql):
+    """Rewrite the ``%s`` placeholders of Django-style SQL to asyncpg's ``$n``."""
+    counter = itertools.count(1)
+    return re.sub(r"%s", lambda match: f"${next(counter)}", sql)
+
+
+@contextlib.contextmanager
+def recording(query):
+    """Report the time of the enclosed ``query`` to the request's recorder."""
+    recorder = query_recorder.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if recorder is not None:
+            recorder.record(query, time.perf_counter() - started)
+
+
+def recorded(method):
+    @functools.wraps(method)
+    async def wrapper(self, query, *args, **kwargs):
+        with recording(query):
+            return await method(self, query, *args, **kwargs)
+
+    return wrapper
+
+
+class RecordedConnection(asyncpg.Connection):
+    """Reports its queries to the ``query_recorder`` of the current request."""
+
+    execute = recorded(asyncpg.Connection.execute)
+    executemany = recorded(asyncpg.Connection.executemany)
+    fetch = recorded(asyncpg.Connection.fetch)
+    fetchrow = recorded(asyncpg.Connection.fetchrow)
+    fetchval = recorded(asyncpg.Connection.fetchval)
+
+    async def reset(self, *, timeout=None):
+        # Going back to the pool is not part of the request's work
+        token = query_recorder.set(None)
+        try:
+            await super().reset(timeout=timeout)
+        finally:
+            query_recorder.reset(token)
+
+
+async def _create_pool():
+    settings_dict = connections["default"].settings_dict
+    options = settings.ASYNC_DB_POOL
+    return await asyncpg.create_pool(
+        host=settings_dict["HOST"] or None,
+        port=settings_dict["PORT"] or None,
+        user=settings_dict["USER"],
+        password=settings_dict["PASSWORD"],
+        database=settings_dict["NAME"],
+        min_size=options["MIN_SIZE"],
+        max_size=options["MAX_SIZE"],
+        max_inactive_connection_lifetime=options["MAX_IDLE"],
+        connection_class=RecordedConnection,
+    )
+
+
+async def get_pool():
+    """Return the asyncpg pool of the running event loop, creating it once."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        # Concurrent first callers all wait for the same pool
+        pool = _pools[loop] = loop.create_task(_create_pool())
+    try:
+        return await asyncio.shield(pool)
+    except Exception:
+        _pools.pop(loop, None)
+        raise
+
+
+async def close_pool():
+    """Close the pool of the running event loop, if there is one."""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await (await pool).close()
+
+
+async def fetch_columns(table_name):
+    pool = await get_pool()
+    records = await pool.fetch(numbered(COLUMNS_SQL), table_name)
+    return [tuple(record) for record in records]
+
+
+async def fetch_rows(sql, params):
+    """Run ``sql``; return the names of its columns and its rows as tuples.
+
+    The names come from the prepared statement, so an empty result has them
+    too.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        with recording(sql):
+            statement = await conn.prepare(sql)
+            records = await statement.fetch(*params)
+        columns = [attribute.name for attribute in statement.get_attributes()]
+    return columns, [tuple(record) for record in records]
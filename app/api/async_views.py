@@ -0,0 +1,273 @@
+"""Async versions of the table endpoints, served under ``/api/async/``.
+
+They run on the ASGI application (``project.asgi``) and talk to PostgreSQL
+through an asyncpg pool, so a request waiting on a slow query holds a
+coroutine instead of a worker thread. SQL generation, validation and the
+model registry are shared with the synchronous views.
+"""
+
+import json
+import logging
+import time
+
+import asyncpg
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+
+from .async_db import fetch_rows, get_pool, numbered
+from .cache import abump_table_version
+from .catalog import register_columns_sql, register_table_sql
+from .formats import UnknownFormat, negotiate_format, render_rows
+from .metrics import set_rows_returned
+from .pagination import InvalidCursor
+from .partitions import prepare_sql
+from .queries import (
+    InvalidQuery,
+    page_rows,
+    query_from_params,
+    referenced_columns,
+)
+from .registry import UnsupportedColumnType, registry
+from .schema import (
+    InvalidField,
+    InvalidFieldType,
+    add_columns_sql,
+    create_table_sql,
+    new_columns,
+    parse_change_feed,
+    parse_partitioning,
+    table_model,
+)
+from .writers import insert_sql
+
+logger = logging.getLogger(__name__)
+
+
+def json_body(request):
+    try:
+        return json.loads(request.body or b"null")
+    except ValueError:
+        return None
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncCreateTableView(View):
+    async def post(self, request):
+        data = json_body(request)
+        table_name = data.get("name") if isinstance(data, dict) else None
+        fields = data.get("fields") if isinstance(data, dict) else None
+        if not table_name or not fields:
+            return JsonResponse(
+                {"error": "Invalid input"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            DynamicTable = table_model(table_name, fields)
+        except InvalidFieldType:
+            return JsonResponse(
+                {"error": "Invalid field type"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except InvalidField as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            partitioning = parse_partitioning(data.get("partition"), fields)
+            change_feed = parse_change_feed(data.get("change_feed"))
+        except InvalidField as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        pool = await get_pool()
+        try:
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    for statement in create_table_sql(
+                        DynamicTable, partitioning, change_feed
+                    ):
+                        await conn.execute(statement)
+                    for sql, params in register_table_sql(
+                        DynamicTable, partitioning, change_feed
+                    ):
+                        await conn.execute(numbered(sql), *params)
+        except asyncpg.exceptions.DuplicateTableError as e:
+            return JsonResponse(
+                {"error": f"Duplicate Table: {e}"}, status=status.HTTP_409_CONFLICT
+            )
+        except asyncpg.PostgresError as e:
+            logger.error(f"Table creation failed: {e}")
+            return JsonResponse(
+                {"error": "Table creation failed", "details": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        registry.invalidate(DynamicTable._meta.db_table)
+        await abump_table_version(DynamicTable._meta.db_table)
+
+        return JsonResponse(
+            {
+                "message": "Table created successfully",
+                "table_id": DynamicTable._meta.model_name,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncUpdateTableView(View):
+    async def put(self, request, id):
+        table_name = f"app_{id}"
+        data = json_body(request)
+        new_fields = data.get("fields", []) if isinstance(data, dict) else None
+        if not isinstance(new_fields, list):
+            return JsonResponse(
+                {"error": "Invalid input"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            entry = await registry.aget(table_name)
+        except UnsupportedColumnType as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            fields = new_columns(entry.columns, new_fields)
+        except InvalidField as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        lock_held = 0.0
+        if fields:
+            sql, params = add_columns_sql(entry.model, fields)
+            pool = await get_pool()
+            try:
+                async with pool.acquire() as conn:
+                    async with conn.transaction():
+                        await conn.execute(
+                            "SELECT set_config('lock_timeout', $1, true)",
+                            f"{settings.SCHEMA_LOCK_TIMEOUT_MS}ms",
+                        )
+                        started = time.perf_counter()
+                        await conn.execute(numbered(sql), *params)
+                        for sql, params in register_columns_sql(table_name, fields):
+                            await conn.execute(numbered(sql), *params)
+                lock_held = time.perf_counter() - started
+            except asyncpg.exceptions.LockNotAvailableError:
+                return JsonResponse(
+                    {"error": "Table is busy, try again later"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                )
+            except asyncpg.PostgresError as e:
+                logger.error(f"Adding new field failed: {e}")
+                return JsonResponse(
+                    {"error": "Adding new field failed", "details": str(e)},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            finally:
+                registry.invalidate(table_name)
+                await abump_table_version(table_name)
+
+        return JsonResponse(
+            {
+                "message": "Table updated successfully",
+                "added": [field.name for field in fields],
+                "lock_held_ms": round(lock_held * 1000, 3),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncAddRowView(View):
+    async def post(self, request, id):
+        table_name = f"app_{id}"
+        data = json_body(request)
+        if not isinstance(data, dict):
+            return JsonResponse(
+                {"error": "Row must be a JSON object"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            entry = await registry.aget(table_name, columns=data.keys())
+        except UnsupportedColumnType as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        errors = entry.validator.validate(data)
+        if errors:
+            return JsonResponse(
+                {"error": errors[0], "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        columns = [column for column in entry.columns if column in data]
+        pool = await get_pool()
+        try:
+            partitions = prepare_sql(entry, [data])
+            if partitions is not None:
+                sql, params = partitions
+                await pool.execute(numbered(sql), *params)
+            await pool.execute(
+                numbered(insert_sql(table_name, columns, 1)),
+                *[data[column] for column in columns],
+            )
+        except asyncpg.PostgresError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        await abump_table_version(table_name)
+        return JsonResponse(
+            {"message": "Row added successfully"}, status=status.HTTP_201_CREATED
+        )
+
+
+class AsyncDynamicTableRowsView(View):
+    async def get(self, request, id):
+        table_name = f"app_{id}"
+        params = request.GET
+        if "stream" in params:
+            return JsonResponse(
+                {"error": "Streaming is only available on /api/table/<id>/rows"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            row_format = negotiate_format(params, request.headers.get("Accept"))
+        except UnknownFormat as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            entry = await registry.aget(table_name, columns=referenced_columns(params))
+        except UnsupportedColumnType as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if entry is None:
+            return JsonResponse(
+                {"error": "Table not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            query = query_from_params(
+                table_name, params, entry.columns, search=entry.search
+            )
+            sql, sql_params = query.sql()
+        except (ValueError, InvalidCursor, InvalidQuery) as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        columns, rows = await fetch_rows(numbered(sql), sql_params)
+        next_token = None
+        if query.limit is not None:
+            columns, rows, next_token = page_rows(query, columns, rows, params)
+        content, content_type = render_rows(
+            row_format,
+            columns,
+            rows,
+            entry.columns,
+            next_token,
+            query.limit is not None,
+        )
+        set_rows_returned(request, len(rows))
+        response = HttpResponse(content, content_type=content_type)
+        patch_vary_headers(response, ["Accept"])
+        return response
@@ -0,0 +1,271 @@
+"""Write-behind buffers of single-row inserts.
+
+Tables with a ``write_buffer`` option in the catalog get a bounded queue and
+a flusher thread per process. ``AddRowView`` validates a row and queues it;
+the flusher writes the queued rows with multi-row INSERTs in one transaction
+once ``max_rows`` rows are queued or ``max_delay_ms`` after the first of
+them. A full queue makes requests wait up to ``WRITE_BUFFER_PUT_TIMEOUT_MS``
+for room before they are turned away.
+
+With ``ack="enqueue"`` a request is answered as soon as its row is queued,
+so the row is lost if the process dies before the next flush; with
+``ack="flush"`` it is answered once the row is committed. Buffers are
+flushed when their options change and when the process exits.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connection, transaction, utils
+
+from .cache import bump_on_commit
+from .partitions import prepare_partitions
+from .registry import registry
+from .writers import chunked, effective_chunk_size, insert_rows
+
+logger = logging.getLogger(__name__)
+
+ACK_MODES = ("enqueue", "flush")
+MAX_FLUSH_ROWS = 10000
+MAX_FLUSH_DELAY_MS = 60000
+
+# Tells a flusher to write what it has and stop
+_STOP = object()
+
+
+class InvalidBuffer(Exception):
+    """Raised for write buffer options that cannot be applied."""
+
+
+class BufferFull(Exception):
+    """Raised when a row found no room in the queue within the put timeout."""
+
+
+class BufferClosed(Exception):
+    """Raised when queueing into a buffer that is being flushed for good."""
+
+
+def parse_buffer(options):
+    """Validate write buffer options and fill in the defaults from settings."""
+    if not isinstance(options, dict):
+        raise InvalidBuffer("Write buffer options must be an object")
+    parsed = {
+        "max_rows": options.get("max_rows", settings.WRITE_BUFFER_MAX_ROWS),
+        "max_delay_ms": options.get("max_delay_ms", settings.WRITE_BUFFER_MAX_DELAY_MS),
+        "ack": options.get("ack", "enqueue"),
+    }
+    for name, low, high in (
+        ("max_rows", 1, MAX_FLUSH_ROWS),
+        ("max_delay_ms", 0, MAX_FLUSH_DELAY_MS),
+    ):
+        value = parsed[name]
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise InvalidBuffer(f"{name} must be an integer")
+        if not low <= value <= high:
+            raise InvalidBuffer(f"{name} must be between {low} and {high}")
+    if parsed["ack"] not in ACK_MODES:
+        raise InvalidBuffer(f"ack must be one of {', '.join(ACK_MODES)}")
+    return parsed
+
+
+class WriteBuffer:
+    def __init__(self, table_name, options, capacity):
+        self.table_name = table_name
+        self.options = options
+        self.queue = queue.Queue(capacity)
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self._closed = False
+        # Held to check ``_closed`` and queue a row, so that no row is queued
+        # behind the stop marker
+        self._put_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name=f"write-buffer-{table_name}", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, row, timeout):
+        """Queue ``row`` and return a ``Future`` resolved once it is written.
+
+        Waits up to ``timeout`` seconds for room, then raises ``BufferFull``.
+        """
+        deadline = time.monotonic() + timeout
+        if not self._put_lock.acquire(timeout=timeout):
+            raise BufferFull(f"The write buffer of {self.table_name} is full")
+        try:
+            if self._closed:
+                raise BufferClosed(f"The write buffer of {self.table_name} is closed")
+            future = Future()
+            remaining = max(deadline - time.monotonic(), 0)
+            self.queue.put((row, future), timeout=remaining)
+        except queue.Full:
+            raise BufferFull(f"The write buffer of {self.table_name} is full")
+        finally:
+            self._put_lock.release()
+        return future
+
+    def close(self):
+        """Stop taking rows and write the queued ones."""
+        with self._put_lock:
+            self._closed = True
+        self.queue.put(_STOP)
+        self._thread.join()
+        # Rows queued while the flusher was stopping
+        leftover = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            self.flush_batch(leftover)
+
+    def _run(self):
+        max_rows = self.options["max_rows"]
+        max_delay = self.options["max_delay_ms"] / 1000
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + max_delay
+            while len(batch) < max_rows:
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.flush_batch(batch)
+            # Reconnect on the next flush if the connection broke
+            connection.close_if_unusable_or_obsolete()
+        connection.close()
+
+    def flush_batch(self, batch):
+        """``flush``, failing the requests of ``batch`` instead of raising.
+
+        Keeps the flusher alive, and ``close`` from failing the request that
+        replaced the buffer, whatever happened to this batch.
+        """
+        try:
+            self.flush(batch)
+        except Exception as e:
+            logger.error(f"Flushing the buffer of {self.table_name} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def flush(self, batch):
+        """Write ``batch`` (``(row, future)`` pairs) and resolve the futures.
+
+        The rows go in one transaction. If the database rejects it, they are
+        written one by one, so that a bad row only fails its own request.
+        """
+        rows = [row for row, _ in batch]
+        present = set().union(*rows)
+        entry = registry.get(self.table_name, columns=present)
+        if entry is None:
+            raise utils.ProgrammingError(f"Table {self.table_name} does not exist")
+        columns = [column for column in entry.columns if column in present]
+        size = effective_chunk_size(len(rows), len(columns))
+        self.flushes += 1
+        try:
+            prepare_partitions(entry, rows)
+            with transaction.atomic():
+                bump_on_commit(self.table_name)
+                for chunk in chunked(rows, size):
+                    insert_rows(self.table_name, columns, chunk)
+        except utils.DatabaseError:
+            self._flush_one_by_one(columns, batch)
+            return
+        self.flushed_rows += len(rows)
+        for _, future in batch:
+            future.set_result(None)
+
+    def _flush_one_by_one(self, columns, batch):
+        with transaction.atomic():
+            bump_on_commit(self.table_name)
+            for row, future in batch:
+                try:
+                    with transaction.atomic():
+                        insert_rows(self.table_name, columns, [row])
+                except utils.DatabaseError as e:
+                    self.failed_rows += 1
+                    future.set_exception(e)
+                    continue
+                self.flushed_rows += 1
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+        }
+
+
+_buffers = {}
+_lock = threading.Lock()
+_exit_hook = []
+
+
+def get_buffer(entry):
+    """Return the write buffer of ``entry``'s table, (re)starting it as needed.
+
+    A buffer whose options changed since it was started is flushed and
+    replaced.
+    """
+    with _lock:
+        buffer = _buffers.get(entry.table_name)
+        if buffer is not None and buffer.options == entry.write_buffer:
+            return buffer
+        stale = buffer
+        buffer = _buffers[entry.table_name] = WriteBuffer(
+            entry.table_name, entry.write_buffer, settings.WRITE_BUFFER_CAPACITY
+        )
+        if not _exit_hook:
+            # Registered late, so that it runs before the connection pools
+            # are closed at exit
+            _exit_hook.append(atexit.register(close_buffers))
+    if stale is not None:
+        stale.close()
+    return buffer
+
+
+def close_buffer(table_name):
+    """Flush and stop the buffer of ``table_name``, if it has one."""
+    with _lock:
+        buffer = _buffers.pop(table_name, None)
+    if buffer is not None:
+        buffer.close()
+
+
+def close_buffers():
+    with _lock:
+        buffers = list(_buffers.values())
+        _buffers.clear()
+    for buffer in buffers:
+        try:
+            buffer.close()
+        except Exception as e:
+            logger.error(f"Flushing the buffer of {buffer.table_name} failed: {e}")
+
+
+def buffer_stats():
+    with _lock:
+        buffers = list(_buffers.values())
+    return {buffer.table_name: buffer.stats() for buffer in buffers}
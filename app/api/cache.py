@@ -0,0 +1,132 @@
+"""Per-table version counters and the cache of row read responses.
+
+Every write to a dynamic table bumps its version, so cached responses and
+ETags of older versions are never served again; they simply age out of the
+size-bounded cache. A separate options version is bumped when a table's
+options (write buffer, search, change feed) change, so that every process
+reloads its registry entry. Versions and responses live in the Django cache named
+by ``ROWS_CACHE_ALIAS``, which must be shared (e.g. Redis or Memcached) when
+the app runs in several processes.
+"""
+
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def rows_cache():
+    return caches[settings.ROWS_CACHE_ALIAS]
+
+
+def version_key(table_name):
+    return f"table-version:{table_name}"
+
+
+def options_key(table_name):
+    return f"table-options:{table_name}"
+
+
+def written_key(table_name):
+    return f"table-written:{table_name}"
+
+
+def current_version(key):
+    cache = rows_cache()
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock, so that a version lost to eviction or a
+        # restart is never handed out again
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def table_version(table_name):
+    """Return the current version of ``table_name``."""
+    return current_version(version_key(table_name))
+
+
+def bump_table_version(table_name):
+    cache = rows_cache()
+    key = version_key(table_name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+    if settings.DATABASE_REPLICAS:
+        cache.set(written_key(table_name), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def options_version(table_name):
+    """Return the options version of ``table_name``.
+
+    Like table versions, it never goes back to a value an entry may have
+    been loaded at, even when the cache evicted it.
+    """
+    return current_version(options_key(table_name))
+
+
+def bump_options_version(table_name):
+    cache = rows_cache()
+    key = options_key(table_name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # From the clock, like table versions
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+# For the async views: cache clients block, so they run in a worker thread.
+# Any thread will do, which keeps them off the thread of the sync views.
+aoptions_version = sync_to_async(options_version, thread_sensitive=False)
+abump_table_version = sync_to_async(bump_table_version, thread_sensitive=False)
+
+
+def recently_written(table_name):
+    """Whether ``table_name`` was written in the last ``REPLICA_STICKY_SECONDS``.
+
+    Such tables are read from the primary, which also keeps rows a replica
+    has not replayed yet out of the response cache of the new version.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return False
+    return rows_cache().get(written_key(table_name), False)
+
+
+def bump_on_commit(table_name):
+    """Bump the version of ``table_name`` once the current transaction commits.
+
+    Bumping before the commit would let a concurrent read cache the old rows
+    under the new version.
+    """
+    transaction.on_commit(lambda: bump_table_version(table_name))
+
+
+def response_etag(table_name, version, params, row_format):
+    """Strong ETag of a read of ``table_name`` at ``version`` with ``params``.
+
+    ``params`` is a ``QueryDict``; the order of parameters does not matter.
+    ``row_format`` is the negotiated output format, which may come from the
+    Accept header rather than the parameters.
+    """
+    query = urlencode(sorted(params.lists()), doseq=True)
+    digest = hashlib.md5(
+        f"{table_name}:{version}:{row_format}:{query}".encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def get_cached_response(etag):
+    """Return ``(content, row_count)`` of a cached response, or ``None``."""
+    return rows_cache().get(f"rows:{etag}")
+
+
+def cache_response(etag, content, row_count):
+    """Keep a response body, unless it is larger than ``ROWS_CACHE_MAX_BYTES``."""
+    if len(content) <= settings.ROWS_CACHE_MAX_BYTES:
+        rows_cache().set(f"rows:{etag}", (content, row_count))
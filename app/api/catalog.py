@@ -0,0 +1,122 @@
+"""Catalog of the dynamic tables, kept in ``app.models``.
+
+The statements here are plain parameterized SQL, so the sync views run them
+through Django's connection and the async views through asyncpg, in the
+same transaction as the DDL they describe.
+"""
+
+import json
+
+from django.db import connection
+
+from app.models import CatalogTable
+
+# Model field class -> information_schema data type of its column
+CATALOG_TYPES = {
+    "AutoField": "integer",
+    "BigAutoField": "bigint",
+    "BigIntegerField": "bigint",
+    "BooleanField": "boolean",
+    "CharField": "character varying",
+    "IntegerField": "integer",
+}
+# information_schema data type -> field type shown by the API
+FIELD_TYPE_NAMES = {
+    "bigint": "number",
+    "boolean": "boolean",
+    "character varying": "string",
+    "integer": "number",
+}
+# Every row carries the table's partitioning, write buffer and search options
+# (jsonb, may be NULL) and whether it has a change feed
+COLUMNS_SQL = (
+    "SELECT c.name, c.data_type, t.partitioning, t.write_buffer, t.search, "
+    "t.change_feed "
+    "FROM catalog_column c "
+    "JOIN catalog_table t ON t.id = c.table_id "
+    "WHERE t.db_table = %s ORDER BY c.position"
+)
+INSERT_TABLE_SQL = (
+    "INSERT INTO catalog_table "
+    "(name, db_table, schema_version, partitioning, change_feed, created_at, "
+    "updated_at) "
+    "VALUES (%s, %s, 1, %s::jsonb, %s, now(), now())"
+)
+BUMP_VERSION_SQL = (
+    "UPDATE catalog_table SET schema_version = schema_version + 1, "
+    "updated_at = now() WHERE db_table = %s"
+)
+# New columns are numbered after the table's last one
+INSERT_COLUMNS_SQL = (
+    "INSERT INTO catalog_column (table_id, name, data_type, position) "
+    "SELECT t.id, c.name, c.data_type, "
+    "COALESCE((SELECT MAX(position) FROM catalog_column WHERE table_id = t.id), 0) "
+    "+ c.ordinality "
+    "FROM catalog_table t, "
+    "unnest(%s::text[], %s::text[]) WITH ORDINALITY AS c(name, data_type, ordinality) "
+    "WHERE t.db_table = %s"
+)
+
+
+def insert_columns(db_table, fields):
+    return (
+        INSERT_COLUMNS_SQL,
+        [
+            [field.column for field in fields],
+            [CATALOG_TYPES[field.get_internal_type()] for field in fields],
+            db_table,
+        ],
+    )
+
+
+def register_table_sql(model, partitioning=None, change_feed=False):
+    """Statements recording the new table of ``model`` and its columns."""
+    meta = model._meta
+    # Passed as text, which both Django and asyncpg can bind
+    partitioning = None if partitioning is None else json.dumps(partitioning)
+    return [
+        (
+            INSERT_TABLE_SQL,
+            [meta.model_name, meta.db_table, partitioning, change_feed],
+        ),
+        insert_columns(meta.db_table, meta.concrete_fields),
+    ]
+
+
+def register_columns_sql(db_table, new_fields):
+    """Statements recording columns added to ``db_table``."""
+    return [(BUMP_VERSION_SQL, [db_table]), insert_columns(db_table, new_fields)]
+
+
+def execute_statements(statements):
+    with connection.cursor() as cursor:
+        for sql, params in statements:
+            cursor.execute(sql, params)
+
+
+def unregister_table(db_table):
+    CatalogTable.objects.filter(db_table=db_table).delete()
+
+
+def list_tables():
+    """All dynamic tables with their columns, in two queries."""
+    return [
+        {
+            "table_id": table.name,
+            "columns": [
+                {
+                    "name": column.name,
+                    "type": FIELD_TYPE_NAMES.get(column.data_type, column.data_type),
+                }
+                for column in table.columns.all()
+            ],
+            "schema_version": table.schema_version,
+            "partitioning": table.partitioning,
+            "write_buffer": table.write_buffer,
+            "search": table.search,
+            "change_feed": table.change_feed,
+            "created_at": table.created_at,
+            "updated_at": table.updated_at,
+        }
+        for table in CatalogTable.objects.prefetch_related("columns")
+    ]
@@ -0,0 +1,282 @@
+"""Change feed of the rows of dynamic tables.
+
+A change feed is asked for when a table is created (``change_feed`` in the
+body) or turned on later. Tables with one carry an internal ``_xid`` column
+holding the id (``xid8``) of the transaction that inserted or last updated
+each row, with an index on ``(_xid, id)``, and notify the
+``tablebuilder_changes`` channel when they are written. The feed returns
+rows in ``(_xid, id)`` order after a cursor, but only rows of transactions
+older than every transaction still running (the xmin of a snapshot taken
+first). A transaction that commits later has a larger id than that xmin, so
+its rows sort after any cursor handed out before and none is skipped; the
+price is that a long-running transaction holds back rows committed after it
+started.
+
+Long polls wait for a notification of their table through the process's
+listener thread, which holds one connection for all waiting requests.
+"""
+
+import logging
+import select
+import threading
+import time
+
+import psycopg2
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+
+from app.models import CatalogTable
+
+from .indexes import create_index, index_name, list_indexes
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+CHANGE_COLUMN = "_xid"
+CHANNEL = "tablebuilder_changes"
+# ``after`` value of a feed that starts with the rows written from now on
+NOW = "now"
+
+
+def change_index_name(table_name):
+    return index_name(table_name, ["changes"])
+
+
+def change_column_sql(table_name):
+    """The ``ALTER TABLE`` statement adding the change column, if missing.
+
+    Rows already in the table get the id of the transaction adding it, so a
+    feed read from the start returns them as well.
+    """
+    qn = connection.ops.quote_name
+    return (
+        f"ALTER TABLE {qn(table_name)} ADD COLUMN IF NOT EXISTS "
+        f"{qn(CHANGE_COLUMN)} xid8 NOT NULL DEFAULT pg_current_xact_id()"
+    )
+
+
+def change_trigger_sql(table_name):
+    table = connection.ops.quote_name(table_name)
+    return [
+        f"CREATE OR REPLACE TRIGGER tablebuilder_touch BEFORE UPDATE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION tablebuilder_touch_row()",
+        f"CREATE OR REPLACE TRIGGER tablebuilder_notify "
+        f"AFTER INSERT OR UPDATE ON {table} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION tablebuilder_notify_change()",
+    ]
+
+
+def change_feed_sql(table_name):
+    """Statements giving a new, empty table its change feed."""
+    qn = connection.ops.quote_name
+    return [
+        change_column_sql(table_name),
+        f"CREATE INDEX {qn(change_index_name(table_name))} ON {qn(table_name)} "
+        f'({qn(CHANGE_COLUMN)}, "id")',
+        *change_trigger_sql(table_name),
+    ]
+
+
+def enable_change_feed(entry, lock_timeout_ms):
+    """Give an existing table its change feed.
+
+    Adding the column rewrites the table under an ACCESS EXCLUSIVE lock,
+    waited for at most ``lock_timeout_ms``; the index is then built
+    concurrently. Every step is skipped when already done, so a call that
+    failed half way can simply be repeated. Returns the seconds the lock was
+    waited for and held.
+    """
+    table_name = entry.table_name
+    qn = connection.ops.quote_name
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('lock_timeout', %s, true)", [f"{lock_timeout_ms}ms"]
+            )
+            started = time.perf_counter()
+            cursor.execute(change_column_sql(table_name))
+            for statement in change_trigger_sql(table_name):
+                cursor.execute(statement)
+    lock_held = time.perf_counter() - started
+
+    partitioning = entry.partitioning
+    name = change_index_name(table_name)
+    indexes, _ = list_indexes(table_name)
+    index = next((index for index in indexes if index["name"] == name), None)
+    if index is not None and not index["valid"]:
+        # Left behind by a build that was interrupted
+        concurrently = "" if partitioning else "CONCURRENTLY "
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP INDEX {concurrently}IF EXISTS {qn(name)}")
+        index = None
+    if index is None:
+        create_index(
+            table_name,
+            [CHANGE_COLUMN, "id"],
+            [CHANGE_COLUMN, "id"],
+            name=name,
+            partition_column=partitioning["column"] if partitioning else None,
+        )
+    CatalogTable.objects.filter(db_table=table_name).update(change_feed=True)
+    return lock_held
+
+
+def parse_after(raw):
+    """Decode the ``after`` cursor into ``(xid, id)``; ``id`` may be ``None``.
+
+    ``(xid, None)`` stands before every row of transaction ``xid``.
+    """
+    position = decode_cursor(raw)
+    xid, row_id = position.get("x"), position.get("i")
+    if not isinstance(xid, str) or not xid.isdigit():
+        raise InvalidCursor(f"Invalid cursor: {raw}")
+    if row_id is not None and (isinstance(row_id, bool) or not isinstance(row_id, int)):
+        raise InvalidCursor(f"Invalid cursor: {raw}")
+    return xid, row_id
+
+
+def encode_after(xid, row_id=None):
+    return encode_cursor({"x": xid, "i": row_id})
+
+
+def read_changes(entry, after, limit):
+    """Read up to ``limit`` rows written after the ``after`` cursor.
+
+    ``after`` is a cursor, ``NOW`` or ``None`` for the start of the table.
+    Returns ``(columns, rows, cursor, more)``: ``cursor`` continues after the
+    rows returned, and ``more`` tells whether rows are left that could have
+    been returned now.
+    """
+    qn = connection.ops.quote_name
+    columns = list(entry.columns)
+    change = qn(CHANGE_COLUMN)
+    with connection.cursor() as cursor:
+        # Every transaction below the horizon has ended, and stays visible
+        cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text")
+        horizon = cursor.fetchone()[0]
+        position = (horizon, None) if after == NOW else after
+        conditions = [f"{change} < %s::xid8"]
+        params = [horizon]
+        if position is not None:
+            xid, row_id = position
+            if row_id is None:
+                conditions.append(f"{change} >= %s::xid8")
+                params.append(xid)
+            else:
+                conditions.append(f'({change}, "id") > (%s::xid8, %s)')
+                params.extend([xid, row_id])
+        cursor.execute(
+            f"SELECT {', '.join(map(qn, columns))}, {change}::text "
+            f"FROM {qn(entry.table_name)} WHERE {' AND '.join(conditions)} "
+            f'ORDER BY {change}, "id" LIMIT %s',
+            params + [limit + 1],
+        )
+        rows = cursor.fetchall()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if more:
+        last = rows[-1]
+        next_after = encode_after(last[-1], last[columns.index("id")])
+    else:
+        # Everything below the horizon has been read
+        next_after = encode_after(horizon)
+    return columns, [row[:-1] for row in rows], next_after, more
+
+
+def wait_for_changes(entry, after, limit, wait):
+    """``read_changes``, waiting up to ``wait`` seconds for rows to arrive.
+
+    A notification of the table wakes the wait early; it also reads again
+    every ``CHANGES_POLL_INTERVAL`` seconds, for rows held back by other
+    transactions or notifications missed while the listener reconnected.
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        version = listener.version(entry.table_name)
+        columns, rows, cursor, more = read_changes(entry, after, limit)
+        remaining = deadline - time.monotonic()
+        if rows or remaining <= 0:
+            return columns, rows, cursor, more
+        after = parse_after(cursor)
+        if not connection.in_atomic_block:
+            # Hands the connection back to the pool while waiting
+            connection.close()
+        listener.wait(
+            entry.table_name, version, min(remaining, settings.CHANGES_POLL_INTERVAL)
+        )
+
+
+class ChangeListener:
+    """Listens on ``CHANNEL`` for the process and wakes waiting long polls."""
+
+    def __init__(self, alias=DEFAULT_DB_ALIAS):
+        self.alias = alias
+        self._condition = threading.Condition()
+        # table name -> notifications received
+        self._versions = {}
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def version(self, table_name):
+        """Number of notifications of ``table_name`` received so far."""
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="change-listener", daemon=True
+                )
+                self._thread.start()
+            return self._versions.get(table_name, 0)
+
+    def wait(self, table_name, version, timeout):
+        """Wait until ``table_name`` was notified since ``version``."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._versions.get(table_name, 0) != version, timeout
+            )
+
+    def stop(self):
+        """Stop the thread and close its connection; it restarts when used."""
+        with self._condition:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stopping.set()
+        thread.join()
+        self._stopping.clear()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self._listen()
+            except psycopg2.Error as e:
+                logger.error(f"Listening for table changes failed: {e}")
+                self._stopping.wait(1)
+
+    def _listen(self):
+        params = connections[self.alias].get_connection_params()
+        conn = psycopg2.connect(**params)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            while not self._stopping.is_set():
+                # Wakes up every second to see whether it should stop
+                if not select.select([conn], [], [], 1)[0]:
+                    continue
+                conn.poll()
+                tables = {notify.payload for notify in conn.notifies}
+                conn.notifies.clear()
+                if not tables:
+                    continue
+                with self._condition:
+                    for table_name in tables:
+                        self._versions[table_name] = (
+                            self._versions.get(table_name, 0) + 1
+                        )
+                    self._condition.notify_all()
+        finally:
+            conn.close()
+
+
+listener = ChangeListener()
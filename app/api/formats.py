@@ -0,0 +1,225 @@
+"""Output formats of row reads.
+
+``objects`` is the default list of ``{column: value}`` objects. ``columns``
+and ``arrays`` are JSON forms without per-row keys, and ``binary`` is a
+compact columnar encoding (see ``encode_columnar``). JSON is written with
+orjson when it is installed.
+"""
+
+import array
+import itertools
+import json
+import struct
+import sys
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.negotiation import BaseContentNegotiation
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+ROW_FORMATS = {
+    "objects": "application/json",
+    "columns": "application/vnd.tablebuilder.columns+json",
+    "arrays": "application/vnd.tablebuilder.arrays+json",
+    "binary": "application/vnd.tablebuilder.columnar",
+}
+DEFAULT_FORMAT = "objects"
+MEDIA_TYPE_FORMATS = {media_type: name for name, media_type in ROW_FORMATS.items()} | {
+    "*/*": DEFAULT_FORMAT,
+    "application/*": DEFAULT_FORMAT,
+}
+
+COLUMNAR_MAGIC = b"TBC1"
+# information_schema data type -> (type name in the header, array typecode)
+COLUMNAR_TYPES = {
+    "integer": ("int32", "i"),
+    "bigint": ("int64", "q"),
+    "boolean": ("bool", "B"),
+    "character varying": ("string", None),
+}
+
+_encoder = DjangoJSONEncoder(separators=(",", ":"))
+
+
+class UnknownFormat(Exception):
+    """Raised for a ``format`` parameter that is not one of ``ROW_FORMATS``."""
+
+
+class ClientFormatNegotiation(BaseContentNegotiation):
+    """Leave the response format to the view instead of DRF's renderers.
+
+    DRF would answer 406 to the media types of ``ROW_FORMATS`` and treat
+    ``format=`` as a renderer suffix.
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def json_dumps(value):
+    """Encode ``value`` as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return _encoder.encode(value).encode()
+
+
+def negotiate_format(params, accept):
+    """Pick the output format from the ``format`` parameter or the Accept header.
+
+    An Accept header without any supported media type gets the default
+    format, as the rows endpoint has always answered with JSON.
+    """
+    if "format" in params:
+        name = params["format"]
+        if name not in ROW_FORMATS:
+            raise UnknownFormat(f"Unknown format '{name}'")
+        return name
+    candidates = []
+    for index, item in enumerate((accept or "").split(",")):
+        media_type, *options = (part.strip() for part in item.split(";"))
+        name = MEDIA_TYPE_FORMATS.get(media_type.lower())
+        if name is None:
+            continue
+        quality = 1.0
+        for option in options:
+            key, _, value = option.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            # Higher quality first, then explicit media types, then order
+            candidates.append((quality, "*" not in media_type, -index, name))
+    return max(candidates)[3] if candidates else DEFAULT_FORMAT
+
+
+def render_rows(row_format, columns, rows, types, next_token=None, paginated=False):
+    """Encode ``rows`` (sequences of values in ``columns`` order).
+
+    ``types`` maps columns to their information_schema data types. Paginated
+    reads carry the next page token. Returns ``(content, content_type)``.
+    """
+    if row_format == "binary":
+        header = {"next": next_token} if paginated else {}
+        content = encode_columnar(columns, rows, types, header)
+    elif row_format == "arrays":
+        body = {"columns": columns, "rows": rows}
+        if paginated:
+            body["next"] = next_token
+        content = json_dumps(body)
+    elif row_format == "columns":
+        values = zip(*rows) if rows else ([] for _ in columns)
+        body = {
+            "columns": columns,
+            "data": {column: list(data) for column, data in zip(columns, values)},
+        }
+        if paginated:
+            body["next"] = next_token
+        content = json_dumps(body)
+    else:
+        results = [dict(zip(columns, row)) for row in rows]
+        if paginated:
+            content = json_dumps({"results": results, "next": next_token})
+        else:
+            content = json_dumps(results)
+    return content, ROW_FORMATS[row_format]
+
+
+def encode_columnar(columns, rows, types, header=None):
+    """Encode rows column by column.
+
+    Layout: ``TBC1``, a little-endian uint32 length and a JSON header with
+    ``columns`` (``[{"name", "type"}]``), ``rows`` and any extra keys, then
+    for every column a null bitmap (bit set = NULL, LSB first) followed by
+    the values. ``int32``, ``int64`` and ``bool`` columns hold one fixed-size
+    little-endian value per row (0 for NULL); ``string`` columns hold
+    ``rows + 1`` uint32 offsets into the UTF-8 data that follows them.
+    """
+    count = len(rows)
+    header = {
+        **(header or {}),
+        "columns": [
+            {"name": column, "type": COLUMNAR_TYPES[types[column]][0]}
+            for column in columns
+        ],
+        "rows": count,
+    }
+    encoded_header = json_dumps(header)
+    parts = [COLUMNAR_MAGIC, struct.pack("<I", len(encoded_header)), encoded_header]
+    values_by_column = zip(*rows) if rows else ([] for _ in columns)
+    for column, values in zip(columns, values_by_column):
+        bitmap = bytearray((count + 7) // 8)
+        if None in values:
+            # tuple.index finds the NULLs without a Python level loop
+            index = -1
+            try:
+                while True:
+                    index = values.index(None, index + 1)
+                    bitmap[index >> 3] |= 1 << (index & 7)
+            except ValueError:
+                pass
+            code = COLUMNAR_TYPES[types[column]][1]
+            blank = 0 if code is not None else ""
+            values = [blank if value is None else value for value in values]
+        parts.append(bytes(bitmap))
+        code = COLUMNAR_TYPES[types[column]][1]
+        if code is not None:
+            parts.append(little_endian(array.array(code, values)))
+            continue
+        data = "".join(values).encode()
+        lengths = map(len, values)
+        if len(data) != sum(map(len, values)):
+            # Not all ASCII, so characters and bytes differ
+            lengths = [len(value.encode()) for value in values]
+        offsets = array.array("I", [0])
+        offsets.extend(itertools.accumulate(lengths))
+        parts.append(little_endian(offsets))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def little_endian(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def decode_columnar(content):
+    """Decode ``encode_columnar`` output into ``(header, {column: values})``."""
+    if content[:4] != COLUMNAR_MAGIC:
+        raise ValueError("Not a columnar response")
+    (length,) = struct.unpack_from("<I", content, 4)
+    position = 8 + length
+    header = json.loads(content[8:position])
+    count = header["rows"]
+    codes = {name: code for name, code in COLUMNAR_TYPES.values()}
+    data = {}
+    for column in header["columns"]:
+        bitmap = content[position : position + (count + 7) // 8]
+        position += len(bitmap)
+        code = codes[column["type"]]
+        if code is not None:
+            values = list(struct.unpack_from(f"<{count}{code}", content, position))
+            position += struct.calcsize(f"<{count}{code}")
+            if column["type"] == "bool":
+                values = [bool(value) for value in values]
+        else:
+            offsets = struct.unpack_from(f"<{count + 1}I", content, position)
+            position += 4 * (count + 1)
+            values = [
+                content[position + start : position + end].decode()
+                for start, end in zip(offsets, offsets[1:])
+            ]
+            position += offsets[-1]
+        data[column["name"]] = [
+            None if bitmap[index >> 3] & (1 << (index & 7)) else value
+            for index, value in enumerate(values)
+        ]
+    return header, data
@@ -0,0 +1,340 @@
+import codecs
+import csv
+import io
+import itertools
+import json
+import time
+
+from django.db import connection, transaction, utils
+
+from .cache import bump_on_commit
+from .registry import registry
+from .partitions import prepare_partitions
+from .schema import InvalidField, create_table
+from .validators import INTEGER_RANGES, validate_value
+from .writers import insert_rows
+
+IMPORT_FORMATS = ("csv", "ndjson")
+TRUE_VALUES = {"true", "t", "yes", "y", "1"}
+FALSE_VALUES = {"false", "f", "no", "n", "0"}
+# Rows looked at to infer column types when the table is created on import
+INFERENCE_SAMPLE_SIZE = 1000
+# Row errors kept in the report; the failed count is always exact
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFailed(Exception):
+    """Raised when an import is aborted; nothing has been written."""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+class TableNotFound(ImportFailed):
+    pass
+
+
+def coerce_text(data_type, raw):
+    """Convert a CSV cell to the Python value for ``data_type``.
+
+    Empty cells are NULL. Raises ``ValueError`` with a readable message.
+    """
+    if raw == "":
+        return None
+    if data_type in INTEGER_RANGES:
+        try:
+            value = int(raw.strip())
+        except ValueError:
+            raise ValueError("expected integer")
+    elif data_type == "boolean":
+        lowered = raw.strip().lower()
+        if lowered in TRUE_VALUES:
+            value = True
+        elif lowered in FALSE_VALUES:
+            value = False
+        else:
+            raise ValueError("expected boolean")
+    else:
+        value = raw
+    error = validate_value(data_type, value)
+    if error:
+        raise ValueError(error)
+    return value
+
+
+def _looks_integer(value):
+    if isinstance(value, (bool, float)):
+        return False
+    try:
+        number = int(value.strip() if isinstance(value, str) else value)
+    except (TypeError, ValueError):
+        return False
+    low, high = INTEGER_RANGES["integer"]
+    return low <= number <= high
+
+
+def _looks_boolean(value):
+    if isinstance(value, bool):
+        return True
+    return (
+        isinstance(value, str) and value.strip().lower() in TRUE_VALUES | FALSE_VALUES
+    )
+
+
+def infer_field_type(values):
+    """Pick number, boolean or string for a column from sample values."""
+    values = [value for value in values if value not in ("", None)]
+    if not values:
+        return "string"
+    if all(_looks_integer(value) for value in values):
+        return "number"
+    if all(_looks_boolean(value) for value in values):
+        return "boolean"
+    return "string"
+
+
+def read_records(lines, file_format):
+    """Return ``(header, records)`` for an iterable of decoded text lines.
+
+    CSV records are lists of cells in header order. NDJSON records are dicts
+    and the header is the keys of the first record.
+    """
+    if file_format == "csv":
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header is None:
+            raise ImportFailed("The file is empty")
+        return [name.strip() for name in header], reader
+
+    def ndjson_records():
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ImportFailed(f"NDJSON parse error on line {line_number}: {e}")
+            yield record
+
+    records = ndjson_records()
+    first = next(records, None)
+    if first is None:
+        raise ImportFailed("The file is empty")
+    if not isinstance(first, dict):
+        raise ImportFailed("NDJSON records must be JSON objects")
+    return list(first), itertools.chain([first], records)
+
+
+def copy_field(value):
+    """Encode one value for ``COPY ... (FORMAT csv)``; unquoted empty is NULL."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, int):
+        return str(value)
+    return '"' + value.replace('"', '""') + '"'
+
+
+def copy_rows(table_name, columns, rows):
+    """Write ``rows`` (lists ordered like ``columns``) with ``COPY FROM STDIN``."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(copy_field(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    qn = connection.ops.quote_name
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+        qn(table_name), ", ".join(qn(column) for column in columns)
+    )
+    # copy_expert bypasses the error wrapping of Django's cursor
+    with connection.cursor() as cursor, connection.wrap_database_errors:
+        cursor.copy_expert(sql, buffer)
+    return len(rows)
+
+
+def import_rows(
+    table_id,
+    byte_lines,
+    file_format="csv",
+    create=False,
+    on_error="abort",
+    chunk_size=10000,
+    progress=None,
+):
+    """Stream a CSV or NDJSON file into the dynamic table ``table_id``.
+
+    ``byte_lines`` is any iterable of raw lines (an uploaded file, a request
+    body or an open file). Headers are matched to the table's columns and
+    unknown headers are ignored. With ``create`` a missing table is created
+    from the header, with column types inferred from the first rows.
+
+    Returns a report dict. With ``on_error="abort"`` any invalid row raises
+    ``ImportFailed`` and the whole import is rolled back; with ``"skip"``
+    invalid rows are counted and reported.
+
+    ``progress(lines, inserted)`` is called after every chunk written.
+    """
+    if file_format not in IMPORT_FORMATS:
+        raise ImportFailed(f"Unsupported import format: {file_format}")
+    started = time.perf_counter()
+    table_id = table_id.lower()  # Table ids are lowercase, see create_table
+    table_name = f"app_{table_id}"
+    lines = codecs.iterdecode(byte_lines, "utf-8-sig")
+
+    try:
+        report = _import(
+            table_id,
+            table_name,
+            lines,
+            file_format,
+            create,
+            on_error,
+            chunk_size,
+            progress,
+        )
+    except Exception:
+        # The import may have created the table in the rolled back transaction
+        registry.invalidate(table_name)
+        raise
+
+    elapsed = time.perf_counter() - started
+    report.update(
+        table_id=table_id,
+        seconds=round(elapsed, 3),
+        rows_per_second=round(report["inserted"] / elapsed, 1) if elapsed else None,
+    )
+    return report
+
+
+def _import(
+    table_id, table_name, lines, file_format, create, on_error, chunk_size, progress
+):
+    with transaction.atomic():
+        bump_on_commit(table_name)
+        header, records = read_records(lines, file_format)
+        duplicates = sorted({name for name in header if header.count(name) > 1})
+        if duplicates:
+            raise ImportFailed(f"Duplicate column '{duplicates[0]}' in the header")
+        entry = registry.get(table_name)
+        created = False
+        if entry is None:
+            if not create:
+                raise TableNotFound(f"Table {table_id} not found")
+            sample = list(itertools.islice(records, INFERENCE_SAMPLE_SIZE))
+            records = itertools.chain(sample, records)
+            fields = []
+            for position, name in enumerate(header):
+                if not name or name == "id":
+                    continue
+                if file_format == "csv":
+                    values = [row[position] for row in sample if position < len(row)]
+                else:
+                    values = [row.get(name) for row in sample if isinstance(row, dict)]
+                fields.append({"name": name, "type": infer_field_type(values)})
+            try:
+                create_table(table_id, fields)
+            except InvalidField as e:
+                raise ImportFailed(str(e))
+            registry.invalidate(table_name)
+            entry = registry.get(table_name)
+            created = True
+
+        # Headers unknown to the schema are skipped
+        if file_format == "csv":
+            columns = [name for name in header if name in entry.columns]
+        else:
+            columns = list(entry.columns)
+        columns = [name for name in columns if name != "id"]
+        ignored = [name for name in header if name not in columns]
+        if not columns:
+            raise ImportFailed("No column of the file matches the table")
+        positions = [header.index(name) if name in header else None for name in columns]
+        types = [entry.columns[name] for name in columns]
+        checkers = [entry.validator.checkers[name] for name in columns]
+
+        total = inserted = failed = 0
+        errors = []
+        chunk = []
+        chunk_lines = []
+
+        def flush():
+            nonlocal inserted, failed
+            if not chunk:
+                return
+            # Partitions created here stay locked until the import commits
+            prepare_partitions(entry, [dict(zip(columns, row)) for row in chunk])
+            if on_error == "abort":
+                inserted += copy_rows(table_name, columns, chunk)
+            else:
+                try:
+                    with transaction.atomic():
+                        inserted += copy_rows(table_name, columns, chunk)
+                except utils.DatabaseError:
+                    # Find the offending rows one by one
+                    for line_number, row in zip(chunk_lines, chunk):
+                        try:
+                            with transaction.atomic():
+                                inserted += insert_rows(
+                                    table_name, columns, [dict(zip(columns, row))]
+                                )
+                        except utils.DatabaseError as e:
+                            failed += 1
+                            if len(errors) < MAX_REPORTED_ERRORS:
+                                errors.append(
+                                    {"row": line_number, "errors": [str(e).strip()]}
+                                )
+            chunk.clear()
+            chunk_lines.clear()
+            if progress is not None:
+                progress(total, inserted)
+
+        for line_number, record in enumerate(records, start=1):
+            total += 1
+            row = []
+            row_errors = []
+            if file_format == "csv":
+                for name, position, data_type in zip(columns, positions, types):
+                    if position is None or position >= len(record):
+                        raw = ""
+                    else:
+                        raw = record[position]
+                    try:
+                        row.append(coerce_text(data_type, raw))
+                    except ValueError as e:
+                        row_errors.append(f"Invalid value for field '{name}': {e}")
+            elif not isinstance(record, dict):
+                row_errors.append("Row must be a JSON object")
+            else:
+                for name, check in zip(columns, checkers):
+                    value = record.get(name)
+                    error = check(value) if value is not None else None
+                    if error:
+                        row_errors.append(f"Invalid value for field '{name}': {error}")
+                    row.append(value)
+            if row_errors:
+                if on_error == "abort":
+                    raise ImportFailed(
+                        f"Invalid row {line_number}",
+                        [{"row": line_number, "errors": row_errors}],
+                    )
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"row": line_number, "errors": row_errors})
+                continue
+            chunk.append(row)
+            chunk_lines.append(line_number)
+            if len(chunk) >= chunk_size:
+                flush()
+        flush()
+
+    return {
+        "created": created,
+        "columns": columns,
+        "ignored_columns": ignored,
+        "rows": total,
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+    }
@@ -0,0 +1,234 @@
+import hashlib
+
+import psycopg2
+from django.db import connection, utils
+
+# PostgreSQL truncates identifiers longer than this
+MAX_NAME_LENGTH = 63
+
+
+class InvalidIndex(Exception):
+    """Raised for an index request that does not fit the table."""
+
+
+def index_name(table_name, columns, unique=False):
+    """Default name of an index on ``columns``, kept under the identifier limit."""
+    name = "_".join([table_name, *columns, "uniq" if unique else "idx"])
+    if len(name) <= MAX_NAME_LENGTH:
+        return name
+    digest = hashlib.md5(name.encode()).hexdigest()[:8]
+    return f"{name[: MAX_NAME_LENGTH - 9]}_{digest}"
+
+
+def list_indexes(table_name):
+    """Return the indexes of ``table_name`` and any index builds in progress."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT i.relname,
+                   array_agg(a.attname ORDER BY k.ordinality),
+                   ix.indisunique,
+                   ix.indisprimary,
+                   ix.indisvalid,
+                   pg_relation_size(i.oid)
+            FROM pg_index ix
+            JOIN pg_class i ON i.oid = ix.indexrelid
+            CROSS JOIN LATERAL unnest(ix.indkey) WITH ORDINALITY AS k(attnum, ordinality)
+            JOIN pg_attribute a ON a.attrelid = ix.indrelid AND a.attnum = k.attnum
+            WHERE ix.indrelid = %s::regclass
+            GROUP BY i.relname, i.oid, ix.indisunique, ix.indisprimary, ix.indisvalid
+            ORDER BY i.relname
+            """,
+            [connection.ops.quote_name(table_name)],
+        )
+        indexes = [
+            {
+                "name": name,
+                "fields": list(columns),
+                "unique": unique,
+                "primary": primary,
+                "valid": valid,
+                "size_bytes": size,
+            }
+            for name, columns, unique, primary, valid, size in cursor.fetchall()
+        ]
+        cursor.execute(
+            """
+            SELECT i.relname, p.phase, p.blocks_done, p.blocks_total,
+                   p.tuples_done, p.tuples_total
+            FROM pg_stat_progress_create_index p
+            LEFT JOIN pg_class i ON i.oid = p.index_relid
+            WHERE p.relid = %s::regclass
+            """,
+            [connection.ops.quote_name(table_name)],
+        )
+        progress_columns = [col[0] for col in cursor.description]
+        progress_columns[0] = "name"
+        builds = [dict(zip(progress_columns, row)) for row in cursor.fetchall()]
+    return indexes, builds
+
+
+def partition_names(table_name):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT inhrelid::regclass::text FROM pg_inherits "
+            "WHERE inhparent = %s::regclass ORDER BY 1",
+            [connection.ops.quote_name(table_name)],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def check_index(
+    table_name,
+    columns,
+    existing_columns,
+    unique=False,
+    name=None,
+    partition_column=None,
+):
+    """Validate an index definition and return the index name.
+
+    Raises ``InvalidIndex`` for a definition ``create_index`` would reject.
+    """
+    if not columns or not isinstance(columns, list):
+        raise InvalidIndex("An index needs a list of fields")
+    for column in columns:
+        if column not in existing_columns:
+            raise InvalidIndex(f"Unknown field '{column}'")
+    if len(set(columns)) != len(columns):
+        raise InvalidIndex("Fields of an index must be distinct")
+    if name is not None and not isinstance(name, str):
+        raise InvalidIndex("The index name must be a string")
+    name = name or index_name(table_name, columns, unique)
+    if len(name) > MAX_NAME_LENGTH:
+        raise InvalidIndex(f"Index name longer than {MAX_NAME_LENGTH} characters")
+    if unique and partition_column is not None and partition_column not in columns:
+        raise InvalidIndex(
+            f"A unique index of a partitioned table must include '{partition_column}'"
+        )
+    return name
+
+
+def create_index(
+    table_name,
+    columns,
+    existing_columns,
+    unique=False,
+    name=None,
+    partition_column=None,
+    method="btree",
+):
+    """Build an index on ``columns`` with CREATE INDEX CONCURRENTLY.
+
+    ``method`` is the index access method, ``gin`` for the search column.
+
+    Concurrent builds do not block reads or writes on the table but cannot
+    run inside a transaction. If the build fails, the invalid index it
+    leaves behind is dropped. Returns the index name.
+
+    Partitioned tables (``partition_column`` is their partition key) cannot
+    be indexed concurrently, so the index is created on the parent only and
+    every partition's index is built concurrently and attached to it.
+    Partitions created later get the index automatically.
+    """
+    name = check_index(
+        table_name, columns, existing_columns, unique, name, partition_column
+    )
+    if connection.in_atomic_block:
+        raise InvalidIndex("Indexes cannot be built concurrently inside a transaction")
+
+    qn = connection.ops.quote_name
+    if partition_column is not None:
+        return _create_partitioned_index(table_name, columns, unique, name, method)
+    sql = "CREATE {}INDEX CONCURRENTLY {} ON {} USING {} ({})".format(
+        "UNIQUE " if unique else "",
+        qn(name),
+        qn(table_name),
+        method,
+        ", ".join(qn(column) for column in columns),
+    )
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(sql)
+        except utils.DatabaseError as e:
+            # A failed concurrent build leaves an invalid index behind, but an
+            # existing index with the same name must be kept
+            if not isinstance(e.__cause__, psycopg2.errors.DuplicateTable):
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {qn(name)}")
+            raise
+    return name
+
+
+def _create_partitioned_index(table_name, columns, unique, name, method="btree"):
+    qn = connection.ops.quote_name
+    definition = "USING {} ({})".format(
+        method, ", ".join(qn(column) for column in columns)
+    )
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE {kind} {qn(name)} ON ONLY {qn(table_name)} {definition}"
+        )
+        partition_index = None
+        try:
+            for partition in partition_names(table_name):
+                partition_index = index_name(partition, columns, unique)
+                cursor.execute(
+                    f"CREATE {kind} CONCURRENTLY {qn(partition_index)} "
+                    f"ON {qn(partition)} {definition}"
+                )
+                cursor.execute(
+                    f"ALTER INDEX {qn(name)} ATTACH PARTITION {qn(partition_index)}"
+                )
+                partition_index = None
+        except utils.DatabaseError as e:
+            # Dropping the parent's index drops the attached ones too
+            cursor.execute(f"DROP INDEX IF EXISTS {qn(name)}")
+            if partition_index is not None and not isinstance(
+                e.__cause__, psycopg2.errors.DuplicateTable
+            ):
+                cursor.execute(
+                    f"DROP INDEX CONCURRENTLY IF EXISTS {qn(partition_index)}"
+                )
+            raise
+    return name
+
+
+def is_internal_index(table_name, index):
+    """Whether ``index`` (from ``list_indexes``) is kept by the table itself.
+
+    Those are the indexes of internal columns (search, change feed) and the
+    ``id`` index of tables partitioned on another column.
+    """
+    from .schema import INTERNAL_PREFIX
+
+    if index["name"] == f"{table_name}_id":
+        return True
+    return any(column.startswith(INTERNAL_PREFIX) for column in index["fields"])
+
+
+def drop_index(table_name, name, partitioned=False):
+    """Drop index ``name`` of ``table_name`` without blocking the table.
+
+    Returns ``False`` if the table has no such index. The primary key and
+    internal indexes cannot be dropped. Indexes of ``partitioned`` tables
+    cannot be dropped concurrently and briefly lock the table.
+    """
+    if not isinstance(name, str):
+        raise InvalidIndex("The index name must be a string")
+    indexes, _ = list_indexes(table_name)
+    index = next((index for index in indexes if index["name"] == name), None)
+    if index is None:
+        return False
+    if index["primary"]:
+        raise InvalidIndex("The primary key index cannot be dropped")
+    if is_internal_index(table_name, index):
+        raise InvalidIndex(f"Index {name} is used by the table and cannot be dropped")
+    if connection.in_atomic_block:
+        raise InvalidIndex(
+            "Indexes cannot be dropped concurrently inside a transaction"
+        )
+    concurrently = "" if partitioned else "CONCURRENTLY "
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX {concurrently}{connection.ops.quote_name(name)}")
+    return True
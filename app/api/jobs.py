@@ -0,0 +1,378 @@
+"""In-process executor of background jobs.
+
+Jobs are rows of ``app.models.Job`` run by a thread pool of
+``JOBS_MAX_WORKERS`` threads in the process that submitted them; there is
+no broker. At most ``JOBS_KIND_LIMITS[kind]`` jobs of a kind run at once per
+process, the others wait in order. A job reports progress and notices
+cancellation through its ``JobContext``; cancelling a running job also
+cancels the SQL statement it is waiting on.
+
+Job state is written through the ``jobs`` database alias, a second
+connection, so that it is visible while the job's own transaction is open.
+"""
+
+import contextlib
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, connections, transaction, utils
+from django.utils import timezone
+
+from app.models import Job
+
+from .cache import bump_options_version, bump_table_version
+from .changes import enable_change_feed
+from .importer import ImportFailed, import_rows
+from .indexes import create_index, list_indexes
+from .registry import registry
+from .schema import add_columns, create_table
+from .search import enable_search
+
+logger = logging.getLogger(__name__)
+
+JOBS_ALIAS = "jobs"
+WORKER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job whose cancellation was requested."""
+
+
+class UnknownJobKind(Exception):
+    """Raised when submitting a job of a kind no handler is registered for."""
+
+
+class JobFailed(Exception):
+    """Raised by a handler for an expected failure, reported as the job's error."""
+
+
+# kind -> handler(context, **params) returning the job's JSON result
+JOB_KINDS = {}
+# kind -> discard(**params), releasing what a job that never ran holds
+JOB_DISCARDS = {}
+
+
+def job_kind(kind, discard=None):
+    """Register the decorated function as the handler of ``kind`` jobs.
+
+    ``discard`` is called with the job's params instead of the handler when
+    the job is cancelled before it started, e.g. to remove its upload.
+    """
+
+    def register(handler):
+        JOB_KINDS[kind] = handler
+        if discard is not None:
+            JOB_DISCARDS[kind] = discard
+        return handler
+
+    return register
+
+
+def job_state(job_id):
+    return Job.objects.using(JOBS_ALIAS).filter(id=job_id)
+
+
+def discard_job(job):
+    discard = JOB_DISCARDS.get(job.kind)
+    if discard is None:
+        return
+    try:
+        discard(**job.params)
+    except Exception as e:
+        logger.error(f"Job {job.kind} {job.id} could not be discarded: {e}")
+
+
+class JobContext:
+    """Handle of a running job, passed to its handler."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._reported = 0.0
+
+    def progress(self, done, total=None, force=False):
+        """Record progress, at most every ``JOBS_PROGRESS_INTERVAL`` seconds.
+
+        Raises ``JobCancelled`` if the job was cancelled since, so handlers
+        stop at their next progress report.
+        """
+        now = time.monotonic()
+        if not force and now - self._reported < settings.JOBS_PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        job_state(self.job_id).update(progress={"done": done, "total": total})
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if job_state(self.job_id).filter(cancel_requested=True).exists():
+            raise JobCancelled()
+
+
+class JobExecutor:
+    def __init__(self, max_workers, kind_limits):
+        self.max_workers = max_workers
+        self.kind_limits = kind_limits
+        self._pool = None
+        self._lock = threading.Lock()
+        # kind -> number of jobs running, and ids of the ones waiting
+        self._running = {}
+        self._waiting = {}
+        # job id -> Future set when the job has finished in this process
+        self._futures = {}
+
+    def submit(self, kind, params):
+        """Record a ``kind`` job and run it once the current transaction commits."""
+        if kind not in JOB_KINDS:
+            raise UnknownJobKind(f"Unknown job kind: {kind}")
+        job = Job.objects.create(kind=kind, params=params, worker=WORKER)
+        with self._lock:
+            self._futures[job.id] = Future()
+        transaction.on_commit(lambda: self._enqueue(job.id, kind))
+        return job
+
+    def wait(self, job_id, timeout=None):
+        """Block until a job submitted by this process has finished."""
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout)
+        return Job.objects.get(id=job_id)
+
+    def _enqueue(self, job_id, kind):
+        with self._lock:
+            limit = self.kind_limits.get(kind)
+            if limit is not None and self._running.get(kind, 0) >= limit:
+                self._waiting.setdefault(kind, deque()).append(job_id)
+                return
+            self._running[kind] = self._running.get(kind, 0) + 1
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="job"
+                )
+            pool = self._pool
+        pool.submit(self._run, job_id, kind)
+
+    def _run(self, job_id, kind):
+        try:
+            run_job(job_id)
+        except Exception as e:
+            logger.error(f"Job {job_id} could not be run: {e}")
+        finally:
+            connections.close_all()
+            with self._lock:
+                waiting = self._waiting.get(kind)
+                next_id = waiting.popleft() if waiting else None
+                if next_id is None:
+                    self._running[kind] -= 1
+                future = self._futures.pop(job_id, None)
+                pool = self._pool
+            if next_id is not None:
+                pool.submit(self._run, next_id, kind)
+            if future is not None:
+                future.set_result(None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": sum(self._running.values()),
+                "waiting": sum(len(ids) for ids in self._waiting.values()),
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+
+def run_job(job_id):
+    """Run a queued job in the calling thread and record how it ended."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        backend_pid = cursor.fetchone()[0]
+    started = (
+        job_state(job_id)
+        .filter(status=Job.QUEUED)
+        .update(
+            status=Job.RUNNING,
+            started_at=timezone.now(),
+            worker=WORKER,
+            backend_pid=backend_pid,
+        )
+    )
+    if not started:
+        # Cancelled while it was waiting, possibly by a process that could
+        # not discard it
+        discard_job(job_state(job_id).get())
+        return
+    job = job_state(job_id).get()
+    context = JobContext(job_id)
+    outcome = {"result": None, "error": ""}
+    try:
+        context.check_cancelled()
+        outcome["result"] = JOB_KINDS[job.kind](context, **job.params)
+        outcome["status"] = Job.SUCCEEDED
+    except JobCancelled:
+        outcome["status"] = Job.CANCELLED
+    except Exception as e:
+        if (
+            isinstance(e, utils.OperationalError)
+            and job_state(job_id).filter(cancel_requested=True).exists()
+        ):
+            # The statement was cancelled by cancel_job
+            outcome["status"] = Job.CANCELLED
+        else:
+            if not isinstance(e, JobFailed):
+                logger.error(f"Job {job.kind} {job_id} failed: {e}")
+            outcome["status"] = Job.FAILED
+            outcome["error"] = str(e).strip()
+    job_state(job_id).update(finished_at=timezone.now(), backend_pid=None, **outcome)
+
+
+def cancel_job(job_id):
+    """Cancel a job, from any process.
+
+    A waiting job is cancelled at once and discarded (see ``job_kind``). A
+    running job is asked to stop: its current SQL statement is cancelled and
+    it stops at its next progress report. Returns the job, or ``None`` if
+    there is no such job.
+    """
+    with transaction.atomic():
+        job = Job.objects.select_for_update().filter(id=job_id).first()
+        if job is None or job.status in Job.FINISHED:
+            return job
+        if job.status == Job.QUEUED:
+            job.status = Job.CANCELLED
+            job.finished_at = timezone.now()
+            job.save(update_fields=["status", "finished_at"])
+            transaction.on_commit(lambda: discard_job(job))
+            return job
+        job.cancel_requested = True
+        job.save(update_fields=["cancel_requested"])
+    if job.backend_pid is not None:
+        # After the commit, so the job sees why its statement was cancelled
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_cancel_backend(%s)", [job.backend_pid])
+    return job
+
+
+def job_response(job):
+    return {
+        "job_id": str(job.id),
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "result": job.result,
+        "error": job.error or None,
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+executor = JobExecutor(settings.JOBS_MAX_WORKERS, settings.JOBS_KIND_LIMITS)
+
+
+@job_kind("create_table")
+def run_create_table(context, name, fields, partitioning=None, change_feed=False):
+    DynamicTable = create_table(name, fields, partitioning, change_feed)
+    registry.invalidate(DynamicTable._meta.db_table)
+    bump_table_version(DynamicTable._meta.db_table)
+    return {"table_id": DynamicTable._meta.model_name}
+
+
+@job_kind("add_columns")
+def run_add_columns(context, table_id, fields):
+    table_name = f"app_{table_id}"
+    entry = registry.get(table_name)
+    if entry is None:
+        raise JobFailed(f"Table {table_id} not found")
+    try:
+        lock_held = add_columns(
+            entry.model,
+            entry.columns,
+            fields,
+            lock_timeout_ms=settings.SCHEMA_LOCK_TIMEOUT_MS,
+        )
+    finally:
+        registry.invalidate(table_name)
+        bump_table_version(table_name)
+    return {
+        "added": [field["name"] for field in fields],
+        "lock_held_ms": round(lock_held * 1000, 3),
+    }
+
+
+@job_kind("create_index")
+def run_create_index(
+    context, table_id, fields, unique=False, name=None, partition_column=None
+):
+    table_name = f"app_{table_id}"
+    entry = registry.get(table_name)
+    if entry is None:
+        raise JobFailed(f"Table {table_id} not found")
+    name = create_index(
+        table_name,
+        fields,
+        entry.columns,
+        unique=unique,
+        name=name,
+        partition_column=partition_column,
+    )
+    indexes, _ = list_indexes(table_name)
+    return {"index": next(index for index in indexes if index["name"] == name)}
+
+
+@job_kind("enable_search")
+def run_enable_search(context, table_id, options):
+    table_name = f"app_{table_id}"
+    entry = registry.get(table_name)
+    if entry is None:
+        raise JobFailed(f"Table {table_id} not found")
+    try:
+        lock_held = enable_search(entry, options, settings.SCHEMA_LOCK_TIMEOUT_MS)
+    finally:
+        registry.invalidate(table_name)
+        bump_options_version(table_name)
+        bump_table_version(table_name)
+    return {"search": options, "lock_held_ms": round(lock_held * 1000, 3)}
+
+
+@job_kind("enable_change_feed")
+def run_enable_change_feed(context, table_id):
+    table_name = f"app_{table_id}"
+    entry = registry.get(table_name)
+    if entry is None:
+        raise JobFailed(f"Table {table_id} not found")
+    try:
+        lock_held = enable_change_feed(entry, settings.SCHEMA_LOCK_TIMEOUT_MS)
+    finally:
+        registry.invalidate(table_name)
+        bump_options_version(table_name)
+    return {"lock_held_ms": round(lock_held * 1000, 3)}
+
+
+def remove_upload(path, **options):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+@job_kind("import_rows", discard=remove_upload)
+def run_import_rows(context, table_id, path, **options):
+    try:
+        with open(path, "rb") as byte_lines:
+            return import_rows(
+                table_id,
+                byte_lines,
+                progress=lambda lines, inserted: context.progress(lines),
+                **options,
+            )
+    except ImportFailed as e:
+        raise JobFailed(str(e)) from e
+    finally:
+        remove_upload(path)
@@ -0,0 +1,329 @@
+"""In-process request metrics, rendered in the Prometheus text format.
+
+Metrics are kept per process; when the app runs with several worker
+processes, each one exposes its own numbers on ``/metrics``.
+"""
+
+import bisect
+import threading
+
+from app.db.pool import pool_stats
+
+from .buffers import buffer_stats
+from .registry import registry
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = (
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, format_labels(self.labels, key), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [[0] * (len(self.buckets) + 1), 0]
+            counts[0][index] += 1
+            counts[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self._values.items()
+            )
+        bounds = [*self.buckets, float("inf")]
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    format_labels(
+                        (*self.labels, "le"), (*key, format_value(float(bound)))
+                    ),
+                    cumulative,
+                )
+            labels = format_labels(self.labels, key)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Gauge:
+    """A gauge whose values are read from ``collect()`` at scrape time.
+
+    ``collect`` returns ``{label values tuple: value}``.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels, collect):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def samples(self):
+        for key, value in sorted(self.collect().items()):
+            yield self.name, format_labels(self.labels, key), value
+
+
+class CollectedCounter(Gauge):
+    """Like ``Gauge``, for values that only ever increase, e.g. pool checkouts."""
+
+    kind = "counter"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def collected_counter(self, *args, **kwargs):
+        return self.register(CollectedCounter(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+REQUEST_LABELS = ("endpoint", "method", "status")
+request_duration = metrics.histogram(
+    "tablebuilder_request_duration_seconds",
+    "Time spent handling API requests, including streaming the response.",
+    REQUEST_LABELS,
+)
+request_queries = metrics.histogram(
+    "tablebuilder_request_db_queries",
+    "SQL queries run per API request.",
+    ("endpoint",),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+db_query_seconds = metrics.counter(
+    "tablebuilder_db_query_seconds_total",
+    "Time spent in SQL queries, by endpoint.",
+    ("endpoint",),
+)
+db_queries = metrics.counter(
+    "tablebuilder_db_queries_total", "SQL queries run, by endpoint.", ("endpoint",)
+)
+rows_returned = metrics.counter(
+    "tablebuilder_rows_returned_total",
+    "Table rows returned by read endpoints.",
+    ("endpoint",),
+)
+response_bytes = metrics.histogram(
+    "tablebuilder_response_bytes",
+    "Size of API response bodies.",
+    ("endpoint",),
+    buckets=SIZE_BUCKETS,
+)
+slow_requests = metrics.counter(
+    "tablebuilder_slow_requests_total",
+    "Requests slower than SLOW_REQUEST_MS.",
+    ("endpoint",),
+)
+
+
+# Pool stats that count events since the pool was created
+POOL_EVENTS = (
+    "checkouts",
+    "connections_created",
+    "connections_closed",
+    "waits",
+    "timeouts",
+    "health_checks",
+    "health_check_failures",
+)
+POOL_COUNTERS = (*POOL_EVENTS, "wait_seconds")
+
+
+def collect_registry_stats():
+    return {("size",): registry.stats()["size"]}
+
+
+def collect_registry_lookups():
+    stats = registry.stats()
+    return {("hit",): stats["hits"], ("miss",): stats["misses"]}
+
+
+def collect_registry_evictions():
+    return {(): registry.stats()["evictions"]}
+
+
+def collect_buffer_stats():
+    return {
+        (table, "queued"): stats["queued"] for table, stats in buffer_stats().items()
+    }
+
+
+def collect_buffer_flushes():
+    return {(table,): stats["flushes"] for table, stats in buffer_stats().items()}
+
+
+def collect_buffer_rows():
+    return {
+        (table, result): stats[f"{result}_rows"]
+        for table, stats in buffer_stats().items()
+        for result in ("flushed", "failed")
+    }
+
+
+def collect_pool_stats():
+    return {
+        (pool, name): value
+        for pool, stats in pool_stats().items()
+        for name, value in stats.items()
+        if name not in POOL_COUNTERS
+    }
+
+
+def collect_pool_events():
+    return {
+        (pool, event): stats[event]
+        for pool, stats in pool_stats().items()
+        for event in POOL_EVENTS
+    }
+
+
+def collect_pool_wait_seconds():
+    return {(pool,): stats["wait_seconds"] for pool, stats in pool_stats().items()}
+
+
+metrics.gauge(
+    "tablebuilder_model_registry",
+    "Dynamic model registry size.",
+    ("stat",),
+    collect_registry_stats,
+)
+metrics.collected_counter(
+    "tablebuilder_model_registry_lookups_total",
+    "Dynamic model registry lookups, by whether the entry was cached.",
+    ("result",),
+    collect_registry_lookups,
+)
+metrics.collected_counter(
+    "tablebuilder_model_registry_evictions_total",
+    "Entries evicted from the dynamic model registry.",
+    (),
+    collect_registry_evictions,
+)
+metrics.gauge(
+    "tablebuilder_db_pool",
+    "Database connection pool sizes and longest wait.",
+    ("pool", "stat"),
+    collect_pool_stats,
+)
+metrics.collected_counter(
+    "tablebuilder_db_pool_events_total",
+    "Database connection pool checkouts, waits, connections and health checks.",
+    ("pool", "event"),
+    collect_pool_events,
+)
+metrics.collected_counter(
+    "tablebuilder_db_pool_wait_seconds_total",
+    "Time spent waiting for a database connection.",
+    ("pool",),
+    collect_pool_wait_seconds,
+)
+metrics.gauge(
+    "tablebuilder_write_buffer",
+    "Rows queued in the write buffers of this process.",
+    ("table", "stat"),
+    collect_buffer_stats,
+)
+metrics.collected_counter(
+    "tablebuilder_write_buffer_flushes_total",
+    "Batches written by the write buffers of this process.",
+    ("table",),
+    collect_buffer_flushes,
+)
+metrics.collected_counter(
+    "tablebuilder_write_buffer_rows_total",
+    "Rows written or rejected by the write buffers of this process.",
+    ("table", "result"),
+    collect_buffer_rows,
+)
+
+
+def set_rows_returned(request, count):
+    """Record how many table rows the response to ``request`` carries.
+
+    Accepts a DRF ``Request`` or a Django ``HttpRequest``.
+    """
+    request = getattr(request, "_request", request)
+    request.rows_returned = getattr(request, "rows_returned", 0) + count
@@ -0,0 +1,177 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+from .async_db import query_recorder
+from .metrics import (
+    db_queries,
+    db_query_seconds,
+    request_duration,
+    request_queries,
+    response_bytes,
+    rows_returned,
+    slow_requests,
+)
+
+logger = logging.getLogger(__name__)
+
+# Statements kept per request for the slow request log
+MAX_LOGGED_STATEMENTS = 50
+MAX_LOGGED_SQL_LENGTH = 1000
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook counting and timing SQL queries.
+
+    Queries of the asyncpg pool are reported through ``record``.
+    """
+
+    def __init__(self, keep_statements=False):
+        self.count = 0
+        self.seconds = 0.0
+        self.keep_statements = keep_statements
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - started)
+
+    def record(self, sql, elapsed):
+        self.count += 1
+        self.seconds += elapsed
+        if self.keep_statements and len(self.statements) < MAX_LOGGED_STATEMENTS:
+            self.statements.append((sql, elapsed))
+
+
+@contextmanager
+def recording(recorder):
+    """Install ``recorder`` on the connection of every database alias.
+
+    Reads may run on a replica alias, so the default connection alone would
+    miss their queries.
+    """
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(recorder))
+        yield
+
+
+def record_query(execute, sql, params, many, context):
+    """Report a query to the ``query_recorder`` of the current request.
+
+    Under ASGI, sync views run in a thread whose connections the middleware
+    cannot wrap, but the request's context is carried over to it.
+    """
+    recorder = query_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+@receiver(request_started)
+def install_query_recorder(**kwargs):
+    # Sent from the thread the request's sync code runs in
+    for conn in connections.all():
+        if record_query not in conn.execute_wrappers:
+            conn.execute_wrappers.append(record_query)
+
+
+class MetricsMiddleware:
+    """Record latency, SQL, rows and response size of every API request.
+
+    Streaming responses are measured when their last chunk has been sent,
+    including the queries that run while streaming. Under ASGI the
+    middleware stays async, so async views are not moved to a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not request.path.startswith("/api/"):
+            return self.get_response(request)
+
+        recorder = QueryRecorder(keep_statements=settings.SLOW_REQUEST_MS > 0)
+        started = time.perf_counter()
+        with recording(recorder):
+            response = self.get_response(request)
+        return self.measure(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        if not request.path.startswith("/api/"):
+            return await self.get_response(request)
+
+        recorder = QueryRecorder(keep_statements=settings.SLOW_REQUEST_MS > 0)
+        started = time.perf_counter()
+        token = query_recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            query_recorder.reset(token)
+        return self.measure(request, response, recorder, started)
+
+    def measure(self, request, response, recorder, started):
+        if response.streaming:
+            response.streaming_content = self.measure_stream(
+                request, response, response.streaming_content, recorder, started
+            )
+        else:
+            self.record(request, response, recorder, started, len(response.content))
+        return response
+
+    def measure_stream(self, request, response, content, recorder, started):
+        size = 0
+        try:
+            with recording(recorder):
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            self.record(request, response, recorder, started, size)
+
+    def record(self, request, response, recorder, started, size):
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        endpoint = match.url_name if match and match.url_name else "unmatched"
+        request_duration.observe(
+            elapsed,
+            endpoint=endpoint,
+            method=request.method,
+            status=response.status_code,
+        )
+        request_queries.observe(recorder.count, endpoint=endpoint)
+        db_queries.inc(recorder.count, endpoint=endpoint)
+        db_query_seconds.inc(recorder.seconds, endpoint=endpoint)
+        response_bytes.observe(size, endpoint=endpoint)
+        rows = getattr(request, "rows_returned", None)
+        if rows is not None:
+            rows_returned.inc(rows, endpoint=endpoint)
+
+        if 0 < settings.SLOW_REQUEST_MS <= elapsed * 1000:
+            slow_requests.inc(endpoint=endpoint)
+            statements = "".join(
+                f"\n  {duration * 1000:8.2f} ms  {sql[:MAX_LOGGED_SQL_LENGTH]}"
+                for sql, duration in recorder.statements
+            )
+            logger.warning(
+                f"Slow request {request.method} {request.get_full_path()} "
+                f"({response.status_code}): {elapsed * 1000:.1f} ms, "
+                f"{recorder.count} queries in {recorder.seconds * 1000:.1f} ms"
+                f"{statements}"
+            )
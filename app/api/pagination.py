@@ -0,0 +1,38 @@
+import base64
+import binascii
+import json
+
+
+class InvalidCursor(Exception):
+    """Raised when a page token cannot be decoded."""
+
+
+def encode_cursor(position):
+    """Encode a keyset position (a JSON-serialisable dict) as an opaque token."""
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode a token produced by ``encode_cursor``."""
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursor(f"Invalid page token: {token}") from e
+    if not isinstance(position, dict):
+        raise InvalidCursor(f"Invalid page token: {token}")
+    return position
+
+
+def parse_limit(value, default, maximum):
+    """Parse the ``limit`` query parameter, clamped to ``maximum``."""
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be a positive integer")
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, maximum)
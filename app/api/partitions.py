@@ -0,0 +1,144 @@
+"""Partitions of partitioned dynamic tables.
+
+Hash partitions are all created with the table. Range partitions of
+``interval`` values each are created on demand, before the rows that need
+them are written, by the ``tablebuilder_add_*_partitions`` functions of
+migration 0003. The functions return at once when the partitions exist, so
+the same statement can run before every write, from any driver.
+"""
+
+import re
+
+from django.db import connection, transaction
+
+# information_schema data type of a partition key -> range of its values
+KEY_RANGES = {
+    "integer": (-(2**31), 2**31 - 1),
+    "bigint": (-(2**63), 2**63 - 1),
+}
+ADD_RANGE_PARTITIONS_SQL = (
+    "SELECT tablebuilder_add_range_partitions(%s, %s, %s::bigint[], %s, %s)"
+)
+ADD_ID_PARTITIONS_SQL = (
+    "SELECT tablebuilder_add_id_partitions(%s, %s, %s, %s::bigint[])"
+)
+PARTITIONS_SQL = (
+    "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples, "
+    "pg_total_relation_size(c.oid) "
+    "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+    "WHERE i.inhparent = %s::regclass"
+)
+RANGE_BOUND = re.compile(r"FOR VALUES FROM \((.+)\) TO \((.+)\)")
+
+
+class InvalidPartitionRequest(Exception):
+    """Raised for a partition operation the table's partitioning cannot do."""
+
+
+def prepare_sql(entry, rows):
+    """Statement creating the range partitions ``rows`` are written to.
+
+    ``entry`` is the table's ``TableEntry`` and ``rows`` are dicts. Returns
+    ``(sql, params)``, or ``None`` when no partition has to be created.
+    Rows of tables partitioned on ``id`` get their ids from the identity
+    sequence, so the partitions ahead of it are covered.
+    """
+    spec = entry.partitioning
+    if spec is None or spec["type"] != "range":
+        return None
+    column = spec["column"]
+    step = spec["interval"]
+    lows = sorted(
+        {row[column] // step * step for row in rows if row.get(column) is not None}
+    )
+    if column == "id":
+        return ADD_ID_PARTITIONS_SQL, [entry.table_name, step, len(rows), lows]
+    if not lows:
+        return None
+    min_value, max_value = KEY_RANGES[entry.columns[column]]
+    return ADD_RANGE_PARTITIONS_SQL, [
+        entry.table_name,
+        step,
+        lows,
+        min_value,
+        max_value,
+    ]
+
+
+def prepare_partitions(entry, rows):
+    """Create the range partitions ``rows`` are written to, if any are missing.
+
+    Run it outside the transaction that writes the rows: creating a
+    partition locks the whole table until the transaction ends.
+    """
+    statement = prepare_sql(entry, rows)
+    if statement is not None:
+        with connection.cursor() as cursor:
+            cursor.execute(*statement)
+
+
+def parse_bound(value):
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return int(value.strip("'"))
+
+
+def list_partitions(table_name):
+    """Partitions of ``table_name``, ordered by their bounds.
+
+    ``rows`` is the planner's estimate, ``None`` until the partition was
+    first vacuumed or analyzed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(PARTITIONS_SQL, [connection.ops.quote_name(table_name)])
+        records = cursor.fetchall()
+    partitions = []
+    for name, bounds, reltuples, size in records:
+        partition = {
+            "name": name,
+            "bounds": bounds,
+            "rows": None if reltuples < 0 else int(reltuples),
+            "size_bytes": size,
+        }
+        match = RANGE_BOUND.fullmatch(bounds)
+        if match:
+            partition["from"] = parse_bound(match.group(1))
+            partition["to"] = parse_bound(match.group(2))
+        partitions.append(partition)
+
+    def order(partition):
+        # Range partitions by their lower bound, then the others by name
+        if "from" not in partition:
+            return (1, 0, partition["name"])
+        low = partition["from"]
+        return (0, float("-inf") if low is None else low, partition["name"])
+
+    return sorted(partitions, key=order)
+
+
+def drop_partitions(entry, before, lock_timeout_ms):
+    """Drop the range partitions of ``entry`` holding only values below ``before``.
+
+    Dropping a partition is a catalog change, not a DELETE of its rows, but
+    it needs an ACCESS EXCLUSIVE lock on the table; ``lock_timeout`` makes
+    it give up instead of queueing every other query behind it. Returns the
+    names of the dropped partitions.
+    """
+    if entry.partitioning is None or entry.partitioning["type"] != "range":
+        raise InvalidPartitionRequest("Only range partitions can be dropped")
+    dropped = [
+        partition["name"]
+        for partition in list_partitions(entry.table_name)
+        if partition.get("to") is not None and partition["to"] <= before
+    ]
+    if not dropped:
+        return dropped
+    qn = connection.ops.quote_name
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('lock_timeout', %s, true)", [f"{lock_timeout_ms}ms"]
+            )
+            for name in dropped:
+                cursor.execute(f"DROP TABLE {qn(name)}")
+    return dropped
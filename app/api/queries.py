@@ -0,0 +1,406 @@
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connection
+
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, parse_limit
+from .search import RANK_COLUMN, SEARCH_COLUMN
+from .validators import INTEGER_RANGES, validate_value
+
+# Query parameters of the rows endpoint that are not column filters
+RESERVED_PARAMS = {"limit", "after", "stream", "order_by", "fields", "format", "search"}
+FILTER_OPERATORS = {
+    "eq": "=",
+    "ne": "<>",
+    "lt": "<",
+    "lte": "<=",
+    "gt": ">",
+    "gte": ">=",
+    "in": "IN",
+    "isnull": "IS NULL",
+    "startswith": "LIKE",
+}
+# Operators that make sense for each information_schema data type
+TYPE_OPERATORS = {
+    "integer": {"eq", "ne", "lt", "lte", "gt", "gte", "in", "isnull"},
+    "bigint": {"eq", "ne", "lt", "lte", "gt", "gte", "in", "isnull"},
+    "character varying": {
+        "eq",
+        "ne",
+        "lt",
+        "lte",
+        "gt",
+        "gte",
+        "in",
+        "isnull",
+        "startswith",
+    },
+    "boolean": {"eq", "ne", "in", "isnull"},
+}
+TRUE_STRINGS = {"true", "1"}
+FALSE_STRINGS = {"false", "0"}
+
+
+class InvalidQuery(Exception):
+    """Raised for filter, ordering or paging parameters that do not fit the table."""
+
+
+def parse_value(column, data_type, raw):
+    """Convert a query string value to the Python type of ``column``."""
+    if data_type in INTEGER_RANGES:
+        try:
+            value = int(raw)
+        except ValueError:
+            raise InvalidQuery(f"Invalid value for '{column}': expected integer")
+        low, high = INTEGER_RANGES[data_type]
+        if not low <= value <= high:
+            raise InvalidQuery(f"Invalid value for '{column}': integer out of range")
+        return value
+    if data_type == "boolean":
+        lowered = raw.lower()
+        if lowered in TRUE_STRINGS:
+            return True
+        if lowered in FALSE_STRINGS:
+            return False
+        raise InvalidQuery(f"Invalid value for '{column}': expected boolean")
+    return raw
+
+
+def parse_bool(name, raw):
+    lowered = raw.lower()
+    if lowered in TRUE_STRINGS:
+        return True
+    if lowered in FALSE_STRINGS:
+        return False
+    raise InvalidQuery(f"Invalid value for '{name}': expected true or false")
+
+
+def referenced_columns(params, reserved=RESERVED_PARAMS):
+    """Column names used by filter and ordering parameters."""
+    names = {key.partition("__")[0] for key in params if key not in reserved}
+    names.update(
+        item.strip().lstrip("-") for item in params.get("order_by", "").split(",")
+    )
+    names.update(item.strip() for item in params.get("fields", "").split(","))
+    names.discard("")
+    return names
+
+
+def parse_filters(params, columns, reserved=RESERVED_PARAMS):
+    """Turn ``column__op=value`` query parameters into filter tuples.
+
+    ``params`` is a ``QueryDict`` and ``columns`` the table's
+    ``{column: data_type}`` map. Returns a list of ``(column, op, value)``.
+    """
+    filters = []
+    for key in params:
+        if key in reserved:
+            continue
+        column, _, op = key.partition("__")
+        op = op or "eq"
+        data_type = columns.get(column)
+        if data_type is None:
+            raise InvalidQuery(f"Unknown field '{column}'")
+        if op not in FILTER_OPERATORS:
+            raise InvalidQuery(f"Unknown filter operator '{op}'")
+        if op not in TYPE_OPERATORS.get(data_type, ()):
+            raise InvalidQuery(f"Operator '{op}' is not supported for '{column}'")
+        raws = params.getlist(key)
+        if op == "in":
+            # Either ?f__in=a,b or ?f__in=a&f__in=b
+            if len(raws) == 1:
+                raws = raws[0].split(",")
+            values = [parse_value(column, data_type, raw) for raw in raws]
+            filters.append((column, op, values))
+            continue
+        for raw in raws:
+            if op == "isnull":
+                value = parse_bool(key, raw)
+            else:
+                value = parse_value(column, data_type, raw)
+            filters.append((column, op, value))
+    return filters
+
+
+def parse_order_by(raw, columns):
+    """Parse ``order_by=a,-b`` into ``[(column, descending), ...]``."""
+    order_by = []
+    if not raw:
+        return order_by
+    for item in raw.split(","):
+        item = item.strip()
+        descending = item.startswith("-")
+        column = item.lstrip("-")
+        if column not in columns:
+            raise InvalidQuery(f"Unknown field '{column}' in order_by")
+        if any(column == existing for existing, _ in order_by):
+            raise InvalidQuery(f"Field '{column}' appears twice in order_by")
+        order_by.append((column, descending))
+    return order_by
+
+
+def parse_fields(raw, columns):
+    """Parse ``fields=a,b`` into the list of columns to return."""
+    fields = []
+    for item in raw.split(","):
+        column = item.strip()
+        if not column:
+            raise InvalidQuery("Empty field name in fields")
+        if column not in columns:
+            raise InvalidQuery(f"Unknown field '{column}' in fields")
+        if column in fields:
+            raise InvalidQuery(f"Field '{column}' appears twice in fields")
+        fields.append(column)
+    return fields
+
+
+def escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def compile_filters(filters):
+    """Compile filter tuples into a list of SQL conditions and their params."""
+    qn = connection.ops.quote_name
+    conditions = []
+    params = []
+    for column, op, value in filters:
+        if op == "isnull":
+            conditions.append(f"{qn(column)} IS {'' if value else 'NOT '}NULL")
+        elif op == "in":
+            conditions.append(f"{qn(column)} = ANY(%s)")
+            params.append(value)
+        elif op == "startswith":
+            conditions.append(f"{qn(column)} LIKE %s")
+            params.append(escape_like(value) + "%")
+        else:
+            conditions.append(f"{qn(column)} {FILTER_OPERATORS[op]} %s")
+            params.append(value)
+    return conditions, params
+
+
+def keyset_condition(order_keys, position):
+    """Build the condition selecting rows after ``position`` in ``order_keys``.
+
+    ``order_keys`` is a list of ``(column, descending)`` ending with a unique
+    column and ``position`` the values of those columns in the last row
+    returned. PostgreSQL sorts NULLs last in ascending and first in
+    descending order, which is mirrored here.
+    """
+    qn = connection.ops.quote_name
+    alternatives = []
+    params = []
+    for index, (column, descending) in enumerate(order_keys):
+        parts = []
+        part_params = []
+        for prior_index in range(index):
+            prior_column = order_keys[prior_index][0]
+            prior_value = position[prior_index]
+            if prior_value is None:
+                parts.append(f"{qn(prior_column)} IS NULL")
+            else:
+                parts.append(f"{qn(prior_column)} = %s")
+                part_params.append(prior_value)
+        value = position[index]
+        if value is None:
+            if descending:
+                parts.append(f"{qn(column)} IS NOT NULL")
+            else:
+                # Nothing sorts after NULL in ascending order
+                continue
+        elif descending:
+            parts.append(f"{qn(column)} < %s")
+            part_params.append(value)
+        elif column == "id":
+            # The primary key is never NULL; keep this an index range scan
+            parts.append(f"{qn(column)} > %s")
+            part_params.append(value)
+        else:
+            parts.append(f"({qn(column)} > %s OR {qn(column)} IS NULL)")
+            part_params.append(value)
+        alternatives.append("(" + " AND ".join(parts) + ")")
+        params.extend(part_params)
+    if not alternatives:
+        return "FALSE", []
+    return "(" + " OR ".join(alternatives) + ")", params
+
+
+def check_position(order_keys, position, columns):
+    """Check the values of a page token against the types of ``order_keys``.
+
+    Raises ``InvalidCursor`` for a token that was not produced by this
+    ordering, so tampered values never reach the database.
+    """
+    if len(position) != len(order_keys):
+        raise InvalidCursor("Page token does not match the ordering")
+    for (column, _), value in zip(order_keys, position):
+        if column == RANK_COLUMN:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        elif value is None:
+            valid = column != "id"
+        else:
+            valid = validate_value(columns[column], value) is None
+        if not valid:
+            raise InvalidCursor("Invalid page token")
+
+
+@dataclass
+class RowQuery:
+    """A read from one dynamic table, compiled to one parameterized query."""
+
+    table_name: str
+    filters: list = field(default_factory=list)
+    order_by: list = field(default_factory=list)
+    limit: int = None
+    # Values of ``order_keys`` in the last row of the previous page
+    after: list = None
+    # Columns to return; all of them when ``None``
+    fields: list = None
+    # All columns of the table, selected instead of ``*`` so that its
+    # internal columns are left out
+    columns: list = None
+    # Words to search for, and the text search configuration of the table
+    search: str = None
+    search_config: str = None
+
+    @property
+    def order_keys(self):
+        """The ordering, made total by ``id`` when ordering or paginating.
+
+        Search results are ordered by rank unless ``order_by`` is given.
+        """
+        keys = list(self.order_by)
+        if self.search is not None and not keys:
+            keys.append((RANK_COLUMN, True))
+        paginated = self.limit is not None or self.after is not None
+        if (keys or paginated) and not any(column == "id" for column, _ in keys):
+            keys.append(("id", False))
+        return keys
+
+    @property
+    def extra_columns(self):
+        """Sort key columns selected only to build the next page token."""
+        selected = self.fields if self.fields is not None else self.columns
+        if selected is None or self.limit is None:
+            return []
+        return [column for column, _ in self.order_keys if column not in selected]
+
+    def search_source(self, conditions, params):
+        """The matching rows with their rank, as a subquery to select from."""
+        qn = connection.ops.quote_name
+        tsquery = "websearch_to_tsquery(%s::regconfig, %s)"
+        terms = [self.search_config, self.search]
+        select = "*" if self.columns is None else ", ".join(map(qn, self.columns))
+        where = " AND ".join([f"{qn(SEARCH_COLUMN)} @@ {tsquery}", *conditions])
+        # float8, so that ranks survive the round trip through page tokens
+        sql = (
+            f"SELECT {select}, ts_rank({qn(SEARCH_COLUMN)}, {tsquery})::float8 "
+            f"AS {qn(RANK_COLUMN)} FROM {qn(self.table_name)} WHERE {where}"
+        )
+        return f"({sql}) AS {qn('matches')}", terms + terms + params
+
+    def sql(self):
+        qn = connection.ops.quote_name
+        conditions, params = compile_filters(self.filters)
+        source = qn(self.table_name)
+        if self.search is not None:
+            # Filters apply to the subquery, the page position to its rows
+            source, params = self.search_source(conditions, params)
+            conditions = []
+        order_keys = self.order_keys
+        if self.after is not None:
+            if len(self.after) != len(order_keys):
+                raise InvalidQuery("Page token does not match the ordering")
+            condition, condition_params = keyset_condition(order_keys, self.after)
+            conditions.append(condition)
+            params.extend(condition_params)
+
+        selected = self.fields if self.fields is not None else self.columns
+        if selected is None:
+            select = "*"
+        else:
+            select = ", ".join(qn(column) for column in selected + self.extra_columns)
+        sql = f"SELECT {select} FROM {source}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if order_keys:
+            sql += " ORDER BY " + ", ".join(
+                f"{qn(column)}{' DESC' if descending else ''}"
+                for column, descending in order_keys
+            )
+        if self.limit is not None:
+            sql += " LIMIT %s"
+            # One extra row tells whether there is a next page
+            params.append(self.limit + 1)
+        return sql, params
+
+
+def query_from_params(table_name, params, columns, search=None):
+    """Build the ``RowQuery`` described by the rows endpoint's query string.
+
+    The query is paginated when ``limit`` or ``after`` is present. ``search``
+    is the table's search options, if it has any. Raises ``InvalidQuery``,
+    ``InvalidCursor`` or ``ValueError`` for bad parameters.
+    """
+    query = RowQuery(
+        table_name,
+        filters=parse_filters(params, columns),
+        order_by=parse_order_by(params.get("order_by"), columns),
+    )
+    query.columns = list(columns)
+    if "search" in params:
+        if search is None:
+            raise InvalidQuery("Search is not enabled for this table")
+        if not params["search"].strip():
+            raise InvalidQuery("search must not be empty")
+        query.search = params["search"]
+        query.search_config = search["config"]
+    if "fields" in params:
+        query.fields = parse_fields(params["fields"], columns)
+    if "limit" in params or "after" in params:
+        query.limit = parse_limit(
+            params.get("limit"), settings.ROWS_PAGE_SIZE, settings.ROWS_MAX_PAGE_SIZE
+        )
+        if params.get("after"):
+            position = decode_cursor(params["after"])
+            if not isinstance(position.get("k"), list):
+                raise InvalidCursor("Invalid page token")
+            if position.get("o") != params.get("order_by", ""):
+                raise InvalidCursor("Page token does not match order_by")
+            if position.get("s") != query.search:
+                raise InvalidCursor("Page token does not match search")
+            check_position(query.order_keys, position["k"], columns)
+            query.after = position["k"]
+    return query
+
+
+def page_rows(query, columns, rows, params):
+    """Split the ``rows`` (tuples) read for a page into the page and next token.
+
+    ``query.sql()`` fetches one row more than the page size to tell whether
+    there is a next page. Returns ``(columns, rows, next_token)`` without the
+    sort key columns that were only selected for the token.
+    """
+    page = rows[: query.limit]
+    next_token = None
+    if len(rows) > query.limit:
+        next_token = next_page_token(query, dict(zip(columns, page[-1])), params)
+    if query.extra_columns:
+        width = len(columns) - len(query.extra_columns)
+        columns = columns[:width]
+        page = [row[:width] for row in page]
+    return columns, page, next_token
+
+
+def next_page_token(query, last, params):
+    """Token of the page following the row ``last`` (a dict) of ``query``.
+
+    The next page starts after the sort key values of the last row, so
+    fetching it costs the same at any depth.
+    """
+    position = {
+        "k": [last[column] for column, _ in query.order_keys],
+        "o": params.get("order_by", ""),
+    }
+    if query.search is not None:
+        position["s"] = query.search
+    return encode_cursor(position)
@@ -0,0 +1,196 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from django.apps.registry import Apps
+from django.conf import settings
+from django.db import connection, models
+
+from .cache import aoptions_version, options_version
+from .catalog import COLUMNS_SQL
+from .validators import RowValidator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_SIZE = 1024
+
+
+class UnsupportedColumnType(Exception):
+    """Raised when a dynamic table has a column the registry cannot map."""
+
+
+@dataclass(frozen=True)
+class TableEntry:
+    table_name: str
+    model: type
+    # column name -> information_schema data_type, in ordinal order
+    columns: dict
+    validator: RowValidator
+    # The table's partitioning option (see schema.parse_partitioning) or None
+    partitioning: dict = None
+    # Options of buffered single-row inserts (see buffers.parse_buffer) or None
+    write_buffer: dict = None
+    # Full-text search options (see search.parse_search) or None
+    search: dict = None
+    # Whether the table has a change feed (see changes.py)
+    change_feed: bool = False
+    # Options version the entry was loaded at (see cache.options_version)
+    options_version: int = 0
+
+
+def build_column_field(column_name, data_type):
+    """Return a model field matching an existing column of a dynamic table."""
+    if column_name == "id":
+        return models.BigAutoField(primary_key=True)
+    if data_type == "character varying":
+        return models.CharField(max_length=255, null=True, blank=True)
+    if data_type == "integer":
+        return models.IntegerField(null=True, blank=True)
+    if data_type == "bigint":
+        return models.BigIntegerField(null=True, blank=True)
+    if data_type == "boolean":
+        return models.BooleanField(null=True, blank=True)
+    raise UnsupportedColumnType(f"Unsupported column type: {data_type}")
+
+
+def build_model(table_name, columns):
+    """Build an unmanaged model class for ``table_name``.
+
+    Every model gets its own ``Apps`` instance so that rebuilding a table's
+    model never touches (or warns about) the global app registry.
+    """
+    meta = type(
+        "Meta",
+        (object,),
+        {"db_table": table_name, "app_label": "app", "apps": Apps()},
+    )
+    attrs = {"__module__": "app.models", "Meta": meta}
+    for column_name, data_type in columns.items():
+        attrs[column_name] = build_column_field(column_name, data_type)
+    return type(table_name, (models.Model,), attrs)
+
+
+class DynamicModelRegistry:
+    """Thread-safe LRU cache of model classes and column maps per table.
+
+    Entries are built on first use from the table catalog and kept until
+    they are evicted, invalidated by a schema change, or the table's options
+    version moves on.
+    """
+
+    def __init__(self, maxsize=DEFAULT_REGISTRY_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation, so that a build which raced with a
+        # schema change is not stored.
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, table_name, columns=()):
+        """Return the ``TableEntry`` for ``table_name`` or ``None`` if missing.
+
+        If the cached entry lacks any of ``columns`` it is reloaded once, as
+        another process may have added them since it was cached. It is also
+        reloaded when another process changed the table's options.
+        """
+        version = options_version(table_name)
+        entry, generation = self._lookup(table_name, columns, version)
+        if entry is not None:
+            return entry
+        loaded = self._load_columns(table_name)
+        return self._store(table_name, loaded, generation, version)
+
+    async def aget(self, table_name, columns=()):
+        """Async variant of ``get`` that loads through the asyncpg pool."""
+        from .async_db import fetch_columns
+
+        version = await aoptions_version(table_name)
+        entry, generation = self._lookup(table_name, columns, version)
+        if entry is not None:
+            return entry
+        loaded = await fetch_columns(table_name)
+        return self._store(table_name, loaded, generation, version)
+
+    def _lookup(self, table_name, columns, version):
+        with self._lock:
+            entry = self._entries.get(table_name)
+            if (
+                entry is not None
+                and entry.options_version == version
+                and entry.columns.keys() >= set(columns)
+            ):
+                self._entries.move_to_end(table_name)
+                self.hits += 1
+                return entry, None
+            self.misses += 1
+            return None, self._generation
+
+    def _store(self, table_name, loaded, generation, version):
+        """Cache an entry built from the rows of ``catalog.COLUMNS_SQL``."""
+        if not loaded:
+            return None
+        columns = {row[0]: row[1] for row in loaded}
+        # Django and asyncpg return jsonb as text
+        partitioning, write_buffer, search = (
+            json.loads(value) if isinstance(value, str) else value
+            for value in loaded[0][2:5]
+        )
+        entry = TableEntry(
+            table_name,
+            build_model(table_name, columns),
+            columns,
+            RowValidator(columns),
+            partitioning,
+            write_buffer,
+            search,
+            loaded[0][5],
+            version,
+        )
+        with self._lock:
+            if generation == self._generation:
+                self._entries[table_name] = entry
+                self._entries.move_to_end(table_name)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return entry
+
+    def refresh(self, table_name):
+        """Drop the cached entry for ``table_name`` and load it again."""
+        self.invalidate(table_name)
+        return self.get(table_name)
+
+    def invalidate(self, table_name):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(table_name, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _load_columns(self, table_name):
+        with connection.cursor() as cursor:
+            cursor.execute(COLUMNS_SQL, [table_name])
+            return cursor.fetchall()
+
+
+registry = DynamicModelRegistry(
+    maxsize=getattr(settings, "DYNAMIC_MODEL_REGISTRY_SIZE", DEFAULT_REGISTRY_SIZE)
+)
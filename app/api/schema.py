@@ -0,0 +1,271 @@
+import time
+
+from django.apps.registry import Apps
+from django.db import connection, models, transaction
+
+from .catalog import execute_statements, register_columns_sql, register_table_sql
+from .changes import change_feed_sql
+
+FIELD_TYPES = ("string", "number", "boolean")
+PARTITION_TYPES = ("hash", "range")
+DEFAULT_HASH_PARTITIONS = 8
+MAX_HASH_PARTITIONS = 1024
+DEFAULT_RANGE_INTERVAL = 1_000_000
+# Columns named with this prefix are internal to a table (such as the search
+# column, see search.py), so fields cannot use it
+INTERNAL_PREFIX = "_"
+
+
+class InvalidField(Exception):
+    """Raised for a field definition that cannot be applied to a table."""
+
+
+class InvalidFieldType(InvalidField):
+    """Raised for a field type other than string, number or boolean."""
+
+
+class InvalidPartitioning(InvalidField):
+    """Raised for a ``partition`` option that cannot be applied to a table."""
+
+
+def build_field(field_type):
+    """Return the model field used for a user-facing field type."""
+    if field_type == "string":
+        return models.CharField(max_length=255, null=True, blank=True)
+    if field_type == "number":
+        return models.IntegerField(null=True, blank=True)
+    if field_type == "boolean":
+        return models.BooleanField(null=True, blank=True)
+    raise InvalidFieldType(f"Unsupported field type: {field_type}")
+
+
+def check_field_name(name):
+    if isinstance(name, str) and name.startswith(INTERNAL_PREFIX):
+        raise InvalidField(
+            f"Field '{name}': names starting with '{INTERNAL_PREFIX}' are reserved"
+        )
+
+
+def table_model(table_name, fields):
+    """Build the model class of a new dynamic table.
+
+    ``table_name`` is the user-facing name; the database table is
+    ``app_<table_name>`` in lowercase. ``fields`` is a list of
+    ``{"name": ..., "type": ...}`` dicts.
+    """
+    table_name = table_name.lower()  # Ensure the table name is in lowercase
+    attrs = {
+        "__module__": "app.models",
+        "Meta": type(
+            "Meta",
+            (object,),
+            {"db_table": f"app_{table_name}", "app_label": "app", "apps": Apps()},
+        ),
+    }
+    for field in fields:
+        check_field_name(field["name"])
+        attrs[field["name"]] = build_field(field["type"])
+    return type(table_name, (models.Model,), attrs)
+
+
+def parse_partitioning(partition, fields):
+    """Validate the ``partition`` option of a new table.
+
+    ``partition`` is ``{"type": "hash" | "range", "column": ...}`` with an
+    optional ``partitions`` count (hash) or ``interval`` width (range). The
+    column is ``id`` or one of the ``number`` fields. Returns the option with
+    its defaults filled in, or ``None`` for an unpartitioned table.
+    """
+    if partition is None:
+        return None
+    if not isinstance(partition, dict):
+        raise InvalidPartitioning("partition must be an object")
+    kind = partition.get("type")
+    if kind not in PARTITION_TYPES:
+        raise InvalidPartitioning("partition type must be 'hash' or 'range'")
+    column = partition.get("column", "id")
+    number_fields = [
+        field.get("name")
+        for field in fields
+        if isinstance(field, dict) and field.get("type") == "number"
+    ]
+    if column != "id" and column not in number_fields:
+        raise InvalidPartitioning(
+            f"Cannot partition on '{column}': only id and number fields can be used"
+        )
+    spec = {"type": kind, "column": column}
+    if kind == "hash":
+        count = partition.get("partitions", DEFAULT_HASH_PARTITIONS)
+        if not _is_int(count) or not 1 <= count <= MAX_HASH_PARTITIONS:
+            raise InvalidPartitioning(
+                f"partitions must be an integer from 1 to {MAX_HASH_PARTITIONS}"
+            )
+        spec["partitions"] = count
+    else:
+        interval = partition.get("interval", DEFAULT_RANGE_INTERVAL)
+        if not _is_int(interval) or interval < 1:
+            raise InvalidPartitioning("interval must be a positive integer")
+        spec["interval"] = interval
+    return spec
+
+
+def parse_change_feed(value):
+    """Validate the ``change_feed`` option of a new table."""
+    if value is None:
+        return False
+    if not isinstance(value, bool):
+        raise InvalidField("change_feed must be true or false")
+    return value
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def create_table(table_name, fields, partitioning=None, change_feed=False):
+    """Create a dynamic table, record it in the catalog and return its model.
+
+    ``partitioning`` is an option returned by ``parse_partitioning``, and
+    ``change_feed`` gives the table a change feed (see ``changes``). Raises
+    ``InvalidFieldType`` before touching the database, and lets database
+    errors (for example a duplicate table) propagate.
+    """
+    DynamicTable = table_model(table_name, fields)
+    with transaction.atomic():
+        if partitioning is None and not change_feed:
+            with connection.schema_editor() as schema_editor:
+                schema_editor.create_model(DynamicTable)
+        else:
+            with connection.cursor() as cursor:
+                for statement in create_table_sql(
+                    DynamicTable, partitioning, change_feed
+                ):
+                    cursor.execute(statement)
+        execute_statements(register_table_sql(DynamicTable, partitioning, change_feed))
+    return DynamicTable
+
+
+def create_table_sql(DynamicTable, partitioning=None, change_feed=False):
+    """Return the statements that create the table of ``DynamicTable``.
+
+    The SQL is collected, not executed, so drivers other than Django's can
+    run it.
+    """
+    with connection.schema_editor(collect_sql=True, atomic=False) as schema_editor:
+        if partitioning is None:
+            schema_editor.create_model(DynamicTable)
+            statements = schema_editor.collected_sql
+        else:
+            statements = partitioned_table_sql(
+                schema_editor, DynamicTable, partitioning
+            )
+    if change_feed:
+        statements = statements + change_feed_sql(DynamicTable._meta.db_table)
+    return statements
+
+
+def partitioned_table_sql(schema_editor, model, partitioning):
+    """Statements creating a partitioned table and its first partitions.
+
+    A primary key has to contain the partition key, so tables partitioned on
+    a (nullable) number column get a plain index on ``id`` instead. Range
+    partitions are created as rows arrive (see ``partitions.prepare_sql``);
+    rows whose partition key is NULL go to a default partition whose CHECK
+    constraint spares new partitions a scan of it.
+    """
+    qn = schema_editor.quote_name
+    table = model._meta.db_table
+    column = partitioning["column"]
+    definitions = ['"id" bigint GENERATED BY DEFAULT AS IDENTITY NOT NULL']
+    for field in model._meta.local_fields:
+        if field.primary_key:
+            continue
+        definition, _ = schema_editor.column_sql(model, field)
+        definitions.append(f"{qn(field.column)} {definition}")
+    if column == "id":
+        definitions.append('PRIMARY KEY ("id")')
+    statements = [
+        f"CREATE TABLE {qn(table)} ({', '.join(definitions)}) "
+        f"PARTITION BY {partitioning['type'].upper()} ({qn(column)})"
+    ]
+    if partitioning["type"] == "hash":
+        count = partitioning["partitions"]
+        statements.extend(
+            f"CREATE TABLE {qn(f'{table}_h{remainder}')} PARTITION OF {qn(table)} "
+            f"FOR VALUES WITH (MODULUS {count}, REMAINDER {remainder})"
+            for remainder in range(count)
+        )
+    elif column != "id":
+        default = f"{table}_null"
+        statements.append(
+            f"CREATE TABLE {qn(default)} PARTITION OF {qn(table)} DEFAULT"
+        )
+        statements.append(f"ALTER TABLE {qn(default)} ADD CHECK ({qn(column)} IS NULL)")
+    if column != "id":
+        statements.append(f"CREATE INDEX {qn(f'{table}_id')} ON {qn(table)} (\"id\")")
+    return statements
+
+
+def new_columns(existing_columns, fields):
+    """Validate field definitions to be added to a table.
+
+    Returns the model fields, or raises ``InvalidField`` if any field has no
+    name, clashes with an existing or repeated column, or has a bad type.
+    """
+    new_fields = []
+    seen = set(existing_columns)
+    for field in fields:
+        name = field.get("name") if isinstance(field, dict) else None
+        if not name:
+            raise InvalidField("Every field needs a name")
+        if name in seen:
+            raise InvalidField(f"Field '{name}' already exists")
+        check_field_name(name)
+        seen.add(name)
+        new_field = build_field(field.get("type"))
+        new_field.set_attributes_from_name(name)
+        new_fields.append(new_field)
+    return new_fields
+
+
+def add_columns_sql(model, new_fields):
+    """Return one ``ALTER TABLE`` statement adding all ``new_fields``."""
+    with connection.schema_editor(collect_sql=True, atomic=False) as schema_editor:
+        clauses = []
+        params = []
+        for new_field in new_fields:
+            definition, field_params = schema_editor.column_sql(model, new_field)
+            clauses.append(
+                f"ADD COLUMN {schema_editor.quote_name(new_field.column)} {definition}"
+            )
+            params.extend(field_params)
+        table = schema_editor.quote_name(model._meta.db_table)
+    return f"ALTER TABLE {table} " + ", ".join(clauses), params
+
+
+def add_columns(model, existing_columns, fields, lock_timeout_ms):
+    """Add ``fields`` to the table of ``model`` with a single ALTER TABLE.
+
+    Every field is validated before the table is touched, and all columns
+    are added by one statement in one transaction, together with their
+    catalog rows, so either all of them are added or none is.
+    ``lock_timeout`` makes the statement give up instead of queueing every
+    other query on the table behind it.
+
+    Returns the seconds the ACCESS EXCLUSIVE lock was waited for and held.
+    """
+    new_fields = new_columns(existing_columns, fields)
+    if not new_fields:
+        return 0.0
+    sql, params = add_columns_sql(model, new_fields)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('lock_timeout', %s, true)", [f"{lock_timeout_ms}ms"]
+            )
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+        execute_statements(register_columns_sql(model._meta.db_table, new_fields))
+    # The lock is released when the transaction commits
+    return time.perf_counter() - started
@@ -0,0 +1,126 @@
+"""Full-text search over the string fields of a dynamic table.
+
+Search is turned on per table for chosen string fields. PostgreSQL keeps a
+generated ``_search`` tsvector column of those fields up to date on every
+write, and a GIN index on it serves the ``search=`` parameter of the rows
+endpoint (see ``queries.RowQuery``), which matches ``websearch_to_tsquery``
+and orders the matches by ``ts_rank``. Like every column whose name starts
+with ``schema.INTERNAL_PREFIX``, the search column is not in the catalog, so
+it is never returned, written or filtered on.
+"""
+
+import time
+
+from django.db import connection, transaction
+
+from app.models import CatalogTable
+
+from .indexes import create_index, index_name
+
+SEARCH_COLUMN = "_search"
+# Rank of a match, selected next to the row while searching
+RANK_COLUMN = "_rank"
+DEFAULT_SEARCH_CONFIG = "simple"
+SEARCHABLE_TYPES = {"character varying"}
+
+
+class InvalidSearch(Exception):
+    """Raised for search options that cannot be applied to a table."""
+
+
+def parse_search(options, columns):
+    """Validate search options against the table's ``columns``.
+
+    ``options`` is ``{"fields": [...], "config": ...}`` where ``config`` is a
+    text search configuration of the database, ``simple`` by default.
+    Returns the options with the default filled in.
+    """
+    if not isinstance(options, dict):
+        raise InvalidSearch("Search options must be an object")
+    fields = options.get("fields")
+    if not fields or not isinstance(fields, list):
+        raise InvalidSearch("Search needs a list of string fields")
+    for field in fields:
+        if columns.get(field) not in SEARCHABLE_TYPES:
+            raise InvalidSearch(f"'{field}' is not a string field")
+    if len(set(fields)) != len(fields):
+        raise InvalidSearch("Search fields must be distinct")
+    config = options.get("config", DEFAULT_SEARCH_CONFIG)
+    if not isinstance(config, str):
+        raise InvalidSearch("config must be a text search configuration name")
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_ts_config WHERE cfgname = %s", [config])
+        if cursor.fetchone() is None:
+            raise InvalidSearch(f"Unknown text search configuration '{config}'")
+    return {"fields": fields, "config": config}
+
+
+def search_index_name(table_name):
+    return index_name(table_name, ["search"])
+
+
+def search_column_sql(table_name, options):
+    """The ``ALTER TABLE`` statement adding the search column, and its params."""
+    qn = connection.ops.quote_name
+    document = " || ' ' || ".join(
+        f"coalesce({qn(field)}, '')" for field in options["fields"]
+    )
+    return (
+        f"ALTER TABLE {qn(table_name)} ADD COLUMN {qn(SEARCH_COLUMN)} tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector(%s::regconfig, {document})) STORED",
+        [options["config"]],
+    )
+
+
+def enable_search(entry, options, lock_timeout_ms):
+    """Index the fields of ``options`` for search, replacing earlier options.
+
+    Adding the generated column rewrites the table under an ACCESS EXCLUSIVE
+    lock, waited for at most ``lock_timeout_ms``; the GIN index is then built
+    concurrently. The catalog records the options once both are in place.
+    Returns the seconds the lock was waited for and held.
+    """
+    table_name = entry.table_name
+    qn = connection.ops.quote_name
+    sql, params = search_column_sql(table_name, options)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('lock_timeout', %s, true)", [f"{lock_timeout_ms}ms"]
+            )
+            started = time.perf_counter()
+            # Dropping the column of earlier options drops its index too
+            cursor.execute(
+                f"ALTER TABLE {qn(table_name)} "
+                f"DROP COLUMN IF EXISTS {qn(SEARCH_COLUMN)}"
+            )
+            cursor.execute(sql, params)
+        CatalogTable.objects.filter(db_table=table_name).update(search=None)
+    lock_held = time.perf_counter() - started
+
+    partitioning = entry.partitioning
+    create_index(
+        table_name,
+        [SEARCH_COLUMN],
+        [SEARCH_COLUMN],
+        name=search_index_name(table_name),
+        partition_column=partitioning["column"] if partitioning else None,
+        method="gin",
+    )
+    CatalogTable.objects.filter(db_table=table_name).update(search=options)
+    return lock_held
+
+
+def disable_search(table_name, lock_timeout_ms):
+    """Drop the search column and its index."""
+    qn = connection.ops.quote_name
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('lock_timeout', %s, true)", [f"{lock_timeout_ms}ms"]
+            )
+            cursor.execute(
+                f"ALTER TABLE {qn(table_name)} "
+                f"DROP COLUMN IF EXISTS {qn(SEARCH_COLUMN)}"
+            )
+        CatalogTable.objects.filter(db_table=table_name).update(search=None)
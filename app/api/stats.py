@@ -0,0 +1,91 @@
+"""Size and column statistics of dynamic tables.
+
+The row count is the planner's estimate (``pg_class.reltuples``), summed
+over the partitions of partitioned tables, so it costs no scan; it is
+``None`` until the table was first vacuumed or analyzed. ``exact=true``
+counts the rows instead. Null fractions and distinct value estimates come
+from ``pg_stats``, i.e. from the last ANALYZE. Results are kept for
+``STATS_CACHE_SECONDS`` in the rows cache; exact counts under the table's
+version, so a write is never hidden by them.
+"""
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .cache import rows_cache, table_version
+
+# One row per relation holding rows of the table: itself, or its partitions
+# (pg_partition_tree returns nothing for tables that are not partitioned)
+RELATIONS_SQL = (
+    "SELECT reltuples, pg_table_size(oid), pg_indexes_size(oid) FROM pg_class "
+    "WHERE (oid = %s::regclass AND relkind = 'r') OR oid IN "
+    "(SELECT relid FROM pg_partition_tree(%s::regclass) WHERE isleaf)"
+)
+# Partitioned tables keep the statistics of all their rows as ``inherited``
+COLUMN_STATS_SQL = (
+    "SELECT attname, null_frac, n_distinct FROM pg_stats "
+    "WHERE schemaname = current_schema() AND tablename = %s AND inherited = %s"
+)
+
+
+def stats_key(table_name, exact):
+    if exact:
+        return f"table-stats:{table_name}:{table_version(table_name)}:exact"
+    return f"table-stats:{table_name}"
+
+
+def table_stats(entry, exact=False, using=DEFAULT_DB_ALIAS):
+    """Statistics of the table of ``entry``, from the cache when recent.
+
+    ``using`` is the database alias to read from.
+    """
+    cache = rows_cache()
+    key = stats_key(entry.table_name, exact)
+    stats = cache.get(key)
+    if stats is None:
+        stats = read_stats(entry, exact, using)
+        cache.set(key, stats, settings.STATS_CACHE_SECONDS)
+    return stats
+
+
+def read_stats(entry, exact, using):
+    table_name = entry.table_name
+    qn = connections[using].ops.quote_name
+    with connections[using].cursor() as cursor:
+        cursor.execute(RELATIONS_SQL, [qn(table_name)] * 2)
+        relations = cursor.fetchall()
+        cursor.execute(COLUMN_STATS_SQL, [table_name, entry.partitioning is not None])
+        analyzed = {
+            name: (null_frac, n_distinct) for name, null_frac, n_distinct in cursor
+        }
+        count = None
+        if exact:
+            cursor.execute(f"SELECT count(*) FROM {qn(table_name)}")
+            count = cursor.fetchone()[0]
+
+    estimates = [reltuples for reltuples, _, _ in relations if reltuples >= 0]
+    # A partition that was never analyzed is usually new, and empty
+    rows = int(sum(estimates)) if estimates else None
+    table_bytes = sum(size for _, size, _ in relations)
+    index_bytes = sum(size for _, _, size in relations)
+    columns = {}
+    for column in entry.columns:
+        if column not in analyzed:
+            columns[column] = {"null_frac": None, "n_distinct": None}
+            continue
+        null_frac, n_distinct = analyzed[column]
+        # Negative values are a fraction of the rows, which grows with them
+        if n_distinct < 0 and rows is not None:
+            n_distinct = -n_distinct * rows
+        columns[column] = {
+            "null_frac": null_frac,
+            "n_distinct": None if n_distinct < 0 else round(n_distinct),
+        }
+    return {
+        "rows_estimate": rows,
+        "rows": count,
+        "table_bytes": table_bytes,
+        "index_bytes": index_bytes,
+        "total_bytes": table_bytes + index_bytes,
+        "columns": columns,
+    }
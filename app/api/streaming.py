@@ -0,0 +1,47 @@
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .formats import json_dumps
+
+STREAM_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def stream_rows(
+    sql, params, stream_format, batch_size, on_rows=None, using=DEFAULT_DB_ALIAS
+):
+    """Yield the result of ``sql`` encoded as NDJSON or a JSON array.
+
+    Rows are read in batches from a named (server-side) cursor inside a
+    transaction, so memory use does not depend on the size of the result and
+    the first batch is sent as soon as PostgreSQL produces it. ``on_rows`` is
+    called with the size of each batch.
+    """
+    first = True
+    with transaction.atomic(using=using):
+        cursor = connections[using].chunked_cursor()
+        try:
+            cursor.execute(sql, params)
+            if stream_format == "json":
+                yield b"["
+            columns = None
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if columns is None:
+                    # Named cursors only know their columns after a fetch
+                    columns = [col[0] for col in cursor.description]
+                if on_rows is not None:
+                    on_rows(len(rows))
+                encoded = [json_dumps(dict(zip(columns, row))) for row in rows]
+                if stream_format == "ndjson":
+                    yield b"\n".join(encoded) + b"\n"
+                else:
+                    yield (b"" if first else b",") + b",".join(encoded)
+                first = False
+            if stream_format == "json":
+                yield b"]"
+        finally:
+            cursor.close()
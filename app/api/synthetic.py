@@ -0,0 +1,69 @@
+import random
+
+from django.db import connection, transaction
+
+from .catalog import unregister_table
+from .importer import copy_rows
+from .registry import registry
+from .schema import FIELD_TYPES, create_table
+
+
+def synthetic_fields(column_count):
+    """Field definitions cycling through string, number and boolean."""
+    return [
+        {"name": f"field{number}", "type": FIELD_TYPES[number % len(FIELD_TYPES)]}
+        for number in range(column_count)
+    ]
+
+
+def synthetic_row(fields, rng, null_fraction=0.1):
+    row = {}
+    for field in fields:
+        if rng.random() < null_fraction:
+            row[field["name"]] = None
+        elif field["type"] == "string":
+            row[field["name"]] = f"value {rng.randrange(1000)}"
+        elif field["type"] == "number":
+            row[field["name"]] = rng.randrange(-(10**6), 10**6)
+        else:
+            row[field["name"]] = rng.random() < 0.5
+    return row
+
+
+def synthetic_rows(fields, count, seed=0):
+    """Generate ``count`` reproducible rows for ``fields``."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield synthetic_row(fields, rng)
+
+
+def generate_table(table_name, column_count, row_count, seed=0, chunk_size=10000):
+    """Create a table with ``column_count`` fields and ``row_count`` random rows.
+
+    Rows are written with ``COPY`` in one transaction. Returns the table id.
+    """
+    fields = synthetic_fields(column_count)
+    columns = [field["name"] for field in fields]
+    with transaction.atomic():
+        DynamicTable = create_table(table_name, fields)
+        db_table = DynamicTable._meta.db_table
+        chunk = []
+        for row in synthetic_rows(fields, row_count, seed):
+            chunk.append([row[column] for column in columns])
+            if len(chunk) >= chunk_size:
+                copy_rows(db_table, columns, chunk)
+                chunk = []
+        if chunk:
+            copy_rows(db_table, columns, chunk)
+    registry.invalidate(db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {connection.ops.quote_name(db_table)}")
+    return DynamicTable._meta.model_name
+
+
+def drop_table(table_id):
+    table_name = f"app_{table_id}"
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {connection.ops.quote_name(table_name)}")
+    unregister_table(table_name)
+    registry.invalidate(table_name)
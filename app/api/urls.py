@@ -1,10 +1,65 @@
 from django.urls import path
 
-from .views import AddRowView, CreateTableView, DynamicTableRowsView, UpdateTableView
+from .async_views import (
+    AsyncAddRowView,
+    AsyncCreateTableView,
+    AsyncDynamicTableRowsView,
+    AsyncUpdateTableView,
+)
+from .views import (
+    AddRowView,
+    AggregateRowsView,
+    BulkAddRowsView,
+    ChangeFeedView,
+    CreateTableView,
+    DynamicTableRowsView,
+    ImportRowsView,
+    IndexDetailView,
+    IndexListView,
+    JobDetailView,
+    JobListView,
+    PartitionListView,
+    SearchView,
+    TableListView,
+    TableStatsView,
+    WriteBufferView,
+    UpdateTableView,
+)
 
 urlpatterns = [
+    path("tables", TableListView.as_view(), name="list-tables"),
     path("table", CreateTableView.as_view(), name="create-table"),
     path("table/<str:id>", UpdateTableView.as_view(), name="update-table"),
     path("table/<str:id>/row", AddRowView.as_view(), name="add-row"),
+    path("table/<str:id>/buffer", WriteBufferView.as_view(), name="write-buffer"),
     path("table/<str:id>/rows", DynamicTableRowsView.as_view(), name="get-rows"),
+    path(
+        "table/<str:id>/aggregate", AggregateRowsView.as_view(), name="aggregate-rows"
+    ),
+    path("table/<str:id>/rows/bulk", BulkAddRowsView.as_view(), name="add-rows"),
+    path("table/<str:id>/import", ImportRowsView.as_view(), name="import-rows"),
+    path("table/<str:id>/indexes", IndexListView.as_view(), name="indexes"),
+    path(
+        "table/<str:id>/indexes/<str:name>",
+        IndexDetailView.as_view(),
+        name="index-detail",
+    ),
+    path("jobs", JobListView.as_view(), name="jobs"),
+    path("jobs/<uuid:id>", JobDetailView.as_view(), name="job-detail"),
+    path("table/<str:id>/partitions", PartitionListView.as_view(), name="partitions"),
+    path("table/<str:id>/stats", TableStatsView.as_view(), name="stats"),
+    path("table/<str:id>/search", SearchView.as_view(), name="search"),
+    path("table/<str:id>/changes", ChangeFeedView.as_view(), name="changes"),
+    path("async/table", AsyncCreateTableView.as_view(), name="async-create-table"),
+    path(
+        "async/table/<str:id>",
+        AsyncUpdateTableView.as_view(),
+        name="async-update-table",
+    ),
+    path("async/table/<str:id>/row", AsyncAddRowView.as_view(), name="async-add-row"),
+    path(
+        "async/table/<str:id>/rows",
+        AsyncDynamicTableRowsView.as_view(),
+        name="async-get-rows",
+    ),
 ]
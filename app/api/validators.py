@@ -0,0 +1,113 @@
+INTEGER_RANGES = {
+    "integer": (-(2**31), 2**31 - 1),
+    "bigint": (-(2**63), 2**63 - 1),
+}
+MAX_STRING_LENGTH = 255
+
+
+def integer_checker(low, high):
+    def check(value):
+        # bool is a subclass of int, but True is not a number here
+        if type(value) is not int:
+            return "expected integer"
+        if not low <= value <= high:
+            return "integer out of range"
+        return None
+
+    return check
+
+
+def check_string(value):
+    if type(value) is not str:
+        return "expected string"
+    if len(value) > MAX_STRING_LENGTH:
+        return f"string longer than {MAX_STRING_LENGTH} characters"
+    return None
+
+
+def check_boolean(value):
+    if type(value) is not bool:
+        return "expected boolean"
+    return None
+
+
+def check_any(value):
+    return None
+
+
+# information_schema data_type -> function returning an error message for
+# a non-NULL value, or None if the value fits
+VALUE_CHECKERS = {
+    **{
+        data_type: integer_checker(low, high)
+        for data_type, (low, high) in INTEGER_RANGES.items()
+    },
+    "character varying": check_string,
+    "boolean": check_boolean,
+}
+
+
+def validate_value(data_type, value):
+    """Return an error message if ``value`` does not fit ``data_type``."""
+    if value is None:
+        return None
+    return VALUE_CHECKERS.get(data_type, check_any)(value)
+
+
+class RowValidator:
+    """Validator of rows for one table schema, compiled once per schema.
+
+    ``columns`` is the table's ``{column: data_type}`` map. Each column is
+    mapped to its value checker up front, so validating a row costs one
+    dict lookup per field whatever the width of the table.
+    """
+
+    def __init__(self, columns):
+        self.checkers = {
+            column: VALUE_CHECKERS.get(data_type, check_any)
+            for column, data_type in columns.items()
+        }
+
+    def validate(self, row):
+        """Return all error messages for ``row``, empty if it is valid."""
+        if type(row) is not dict:
+            return ["Row must be a JSON object"]
+        errors = []
+        checkers = self.checkers
+        for field_name, field_value in row.items():
+            check = checkers.get(field_name)
+            if check is None:
+                errors.append(f"Unknown field '{field_name}'")
+            elif field_value is not None:
+                error = check(field_value)
+                if error:
+                    errors.append(
+                        f"Invalid data type for field '{field_name}': {error}"
+                    )
+        return errors
+
+    def validate_many(self, rows):
+        """Validate a batch in one pass.
+
+        Returns ``(valid, errors)``: the ``(index, row)`` pairs of valid rows
+        and ``{"index": index, "errors": [...]}`` for each invalid one.
+        """
+        valid = []
+        errors = []
+        validate = self.validate
+        for index, row in enumerate(rows):
+            row_errors = validate(row)
+            if row_errors:
+                errors.append({"index": index, "errors": row_errors})
+            else:
+                valid.append((index, row))
+        return valid, errors
+
+
+def validate_row(columns, row):
+    """Validate one row against a ``{column: data_type}`` map.
+
+    Returns a list of error messages, empty if the row is valid. Callers
+    holding a registry entry should use its compiled ``validator`` instead.
+    """
+    return RowValidator(columns).validate(row)
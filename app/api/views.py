@@ -1,19 +1,141 @@
+import csv
 import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
 
 import psycopg2
-from django.db import connection, models, transaction, utils
-from django.http import JsonResponse
+from django.conf import settings
+from django.db import connection, connections, transaction, utils
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.views import APIView
 
+from app.db.replicas import read_alias, run_on_replica
+from app.models import CatalogTable, Job
+
+from .aggregates import aggregate, aggregate_columns
+from .buffers import (
+    ACK_MODES,
+    BufferClosed,
+    BufferFull,
+    InvalidBuffer,
+    buffer_stats,
+    close_buffer,
+    get_buffer,
+    parse_buffer,
+)
+from .indexes import (
+    InvalidIndex,
+    check_index,
+    create_index,
+    drop_index,
+    list_indexes,
+)
+from .cache import (
+    bump_on_commit,
+    bump_options_version,
+    bump_table_version,
+    cache_response,
+    get_cached_response,
+    recently_written,
+    response_etag,
+    table_version,
+)
+from .catalog import list_tables
+from .changes import NOW, enable_change_feed, parse_after, wait_for_changes
+from .formats import (
+    ROW_FORMATS,
+    ClientFormatNegotiation,
+    UnknownFormat,
+    negotiate_format,
+    render_rows,
+)
+from .importer import IMPORT_FORMATS, ImportFailed, TableNotFound, import_rows
+from .jobs import cancel_job, executor, job_response
+from .metrics import metrics, set_rows_returned
+from .pagination import InvalidCursor, parse_limit
+from .parsers import NDJSONParser
+from .queries import (
+    InvalidQuery,
+    page_rows,
+    query_from_params,
+    referenced_columns,
+)
+from .registry import UnsupportedColumnType, registry
+from .partitions import (
+    InvalidPartitionRequest,
+    drop_partitions,
+    list_partitions,
+    prepare_partitions,
+)
+from .schema import (
+    InvalidField,
+    InvalidFieldType,
+    add_columns,
+    create_table,
+    new_columns,
+    parse_change_feed,
+    parse_partitioning,
+    table_model,
+)
+from .search import InvalidSearch, disable_search, enable_search, parse_search
+from .stats import table_stats
+from .streaming import STREAM_CONTENT_TYPES, stream_rows
+from .writers import chunked, effective_chunk_size, insert_rows
+
 logger = logging.getLogger(__name__)
 
+BACKGROUND_PARAMETER = openapi.Parameter(
+    "background",
+    openapi.IN_QUERY,
+    type=openapi.TYPE_BOOLEAN,
+    description=(
+        "Run the operation as a background job and answer 202 with the job id; "
+        "follow it on /api/jobs/<job_id>"
+    ),
+)
+
+
+def in_background(request):
+    return request.query_params.get("background", "").lower() in ("1", "true")
+
+
+def job_accepted(job):
+    return JsonResponse(
+        {
+            "message": "Job accepted",
+            "job_id": str(job.id),
+            "status": job.status,
+            "url": reverse("job-detail", kwargs={"id": job.id}),
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+class TableListView(APIView):
+    @swagger_auto_schema(
+        operation_description=(
+            "List the dynamic tables with their fields, schema version and "
+            "creation time, read from the table catalog"
+        ),
+        responses={200: "List of tables"},
+    )
+    def get(self, request):
+        return JsonResponse({"tables": list_tables()})
+
 
 class CreateTableView(APIView):
     @swagger_auto_schema(
         operation_description="Create a new dynamic table",
+        manual_parameters=[BACKGROUND_PARAMETER],
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
@@ -38,6 +160,38 @@ class CreateTableView(APIView):
                     ),
                     description="List of fields to create in the table",
                 ),
+                "partition": openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "type": openapi.Schema(
+                            type=openapi.TYPE_STRING, enum=["hash", "range"]
+                        ),
+                        "column": openapi.Schema(
+                            type=openapi.TYPE_STRING,
+                            description="id (default) or a number field",
+                        ),
+                        "partitions": openapi.Schema(
+                            type=openapi.TYPE_INTEGER,
+                            description="Number of hash partitions (default 8)",
+                        ),
+                        "interval": openapi.Schema(
+                            type=openapi.TYPE_INTEGER,
+                            description=(
+                                "Values per range partition (default 1000000); "
+                                "partitions are created as rows arrive"
+                            ),
+                        ),
+                    },
+                    required=["type"],
+                    description="Partition the table (optional)",
+                ),
+                "change_feed": openapi.Schema(
+                    type=openapi.TYPE_BOOLEAN,
+                    description=(
+                        "Keep a change feed of the table's rows, read from "
+                        "/api/table/<id>/changes (default false)"
+                    ),
+                ),
             },
             required=["name", "fields"],
             example={
@@ -50,6 +204,7 @@ class CreateTableView(APIView):
         ),
         responses={
             201: "Table created successfully",
+            202: "Job accepted",
             400: "Invalid input",
             409: "Duplicate Table",
         },
@@ -63,32 +218,29 @@ class CreateTableView(APIView):
                 {"error": "Invalid input"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Create dynamic model
-        attrs = {"__module__": "app.models"}
-        for field in fields:
-            field_name = field["name"]
-            field_type = field["type"]
-
-            if field_type == "string":
-                field_instance = models.CharField(max_length=255, null=True, blank=True)
-            elif field_type == "number":
-                field_instance = models.IntegerField(null=True, blank=True)
-            elif field_type == "boolean":
-                field_instance = models.BooleanField(null=True, blank=True)
-            else:
-                return JsonResponse(
-                    {"error": "Invalid field type"}, status=status.HTTP_400_BAD_REQUEST
-                )
-
-            attrs[field_name] = field_instance
-
-        table_name = table_name.lower()  # Ensure the table name is in lowercase
-        DynamicTable = type(table_name, (models.Model,), attrs)
-
-        # Register model in the application
+        # Create dynamic model and register it in the database
         try:
-            with connection.schema_editor() as schema_editor:
-                schema_editor.create_model(DynamicTable)
+            partitioning = parse_partitioning(request.data.get("partition"), fields)
+            change_feed = parse_change_feed(request.data.get("change_feed"))
+            if in_background(request):
+                table_model(table_name, fields)
+                job = executor.submit(
+                    "create_table",
+                    {
+                        "name": table_name,
+                        "fields": fields,
+                        "partitioning": partitioning,
+                        "change_feed": change_feed,
+                    },
+                )
+                return job_accepted(job)
+            DynamicTable = create_table(table_name, fields, partitioning, change_feed)
+        except InvalidFieldType:
+            return JsonResponse(
+                {"error": "Invalid field type"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except InvalidField as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except utils.ProgrammingError as e:
             # Check if the error is a DuplicateTable error
             if isinstance(e.__cause__, psycopg2.errors.DuplicateTable):
@@ -101,16 +253,25 @@ class CreateTableView(APIView):
                     {"error": "Table creation failed", "details": str(e)},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 )
+        registry.invalidate(DynamicTable._meta.db_table)
+        bump_table_version(DynamicTable._meta.db_table)
 
         return JsonResponse(
-            {"message": "Table created successfully", "table_id": table_name},
+            {
+                "message": "Table created successfully",
+                "table_id": DynamicTable._meta.model_name,
+            },
             status=status.HTTP_201_CREATED,
         )
 
 
 class UpdateTableView(APIView):
     @swagger_auto_schema(
-        operation_description="Update the table by adding new columns",
+        operation_description=(
+            "Update the table by adding new columns. All fields are validated "
+            "first and then added by one ALTER TABLE statement."
+        ),
+        manual_parameters=[BACKGROUND_PARAMETER],
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
@@ -142,62 +303,93 @@ class UpdateTableView(APIView):
         ),
         responses={
             200: "Table updated successfully",
+            202: "Job accepted",
             400: "Invalid field type",
+            404: "Table not found",
+            503: "Table is locked by other queries, try again later",
         },
     )
     def put(self, request, id):
         table_name = f"app_{id}"
         new_fields = request.data.get("fields", [])
+        if not isinstance(new_fields, list):
+            return JsonResponse(
+                {"error": "Invalid input"}, status=status.HTTP_400_BAD_REQUEST
+            )
 
-        # Define a dynamic model class
-        DynamicModel = type(
-            "DynamicModel",
-            (models.Model,),
-            {
-                "__module__": "app.models",
-                "Meta": type("Meta", (object,), {"db_table": table_name}),
-            },
-        )
+        try:
+            entry = registry.get(table_name)
+        except UnsupportedColumnType as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
 
-        # Connect to the database schema editor
-        with connection.schema_editor() as schema_editor:
-            for field in new_fields:
-                field_name = field["name"]
-                field_type = field["type"]
-
-                if field_type == "string":
-                    new_field = models.CharField(max_length=255, null=True, blank=True)
-                elif field_type == "number":
-                    new_field = models.IntegerField(null=True, blank=True)
-                elif field_type == "boolean":
-                    new_field = models.BooleanField(null=True, blank=True)
-                else:
-                    return JsonResponse(
-                        {"error": f"Unsupported field type: {field_type}"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                # Set the field name
-                new_field.set_attributes_from_name(field_name)
-
-                # Add the new field to the table
-                try:
-                    schema_editor.add_field(DynamicModel, new_field)
-                except utils.ProgrammingError as e:
-                    logger.error(f"Adding new field failed: {e}")
-                    return JsonResponse(
-                        {"error": "Adding new field failed", "details": str(e)},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
+        if in_background(request):
+            try:
+                new_columns(entry.columns, new_fields)
+            except InvalidField as e:
+                return JsonResponse(
+                    {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+                )
+            job = executor.submit("add_columns", {"table_id": id, "fields": new_fields})
+            return job_accepted(job)
+
+        try:
+            lock_held = add_columns(
+                entry.model,
+                entry.columns,
+                new_fields,
+                lock_timeout_ms=settings.SCHEMA_LOCK_TIMEOUT_MS,
+            )
+        except InvalidField as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except utils.OperationalError as e:
+            if isinstance(e.__cause__, psycopg2.errors.LockNotAvailable):
+                return JsonResponse(
+                    {"error": "Table is busy, try again later"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                )
+            raise
+        except utils.ProgrammingError as e:
+            logger.error(f"Adding new field failed: {e}")
+            return JsonResponse(
+                {"error": "Adding new field failed", "details": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        finally:
+            registry.invalidate(table_name)
+            bump_table_version(table_name)
 
         return JsonResponse(
-            {"message": "Table updated successfully"}, status=status.HTTP_200_OK
+            {
+                "message": "Table updated successfully",
+                "added": [field["name"] for field in new_fields],
+                "lock_held_ms": round(lock_held * 1000, 3),
+            },
+            status=status.HTTP_200_OK,
         )
 
 
 class AddRowView(APIView):
     @swagger_auto_schema(
-        operation_description="Add a new row to the dynamic table",
+        operation_description=(
+            "Add a new row to the dynamic table. Rows of tables with a write "
+            "buffer are queued and written in batches."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "ack",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=list(ACK_MODES),
+                description=(
+                    "Buffered tables only: answer once the row is queued (202) "
+                    "or once it is written (201); defaults to the table's option"
+                ),
+            ),
+        ],
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
@@ -220,121 +412,1267 @@ class AddRowView(APIView):
         ),
         responses={
             201: "Row added successfully",
+            202: "Row queued",
             400: "Invalid input or adding row failed",
             404: "Table not found",
+            503: "The table's write buffer is full, try again later",
         },
     )
     def post(self, request, id):
         table_name = f"app_{id}"
         data = request.data
 
-        # Define a dynamic model class
-        DynamicModel = type(
-            "DynamicModel",
-            (models.Model,),
+        try:
+            entry = registry.get(
+                table_name, columns=data.keys() if isinstance(data, dict) else ()
+            )
+        except UnsupportedColumnType as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        errors = entry.validator.validate(data)
+        if errors:
+            return JsonResponse(
+                {"error": errors[0], "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if entry.write_buffer is not None:
+            response = self._add_buffered(request, entry, data)
+            if response is not None:
+                return response
+        else:
+            # The buffer may have been turned off by another process
+            close_buffer(table_name)
+        try:
+            prepare_partitions(entry, [data])
+            with transaction.atomic():
+                instance = entry.model(**data)
+                instance.save()
+                bump_on_commit(table_name)
+            return JsonResponse(
+                {"message": "Row added successfully"}, status=status.HTTP_201_CREATED
+            )
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @staticmethod
+    def _add_buffered(request, entry, data):
+        """Queue the row in the table's write buffer.
+
+        Returns ``None`` when the buffer is being replaced, so the row is
+        written directly instead.
+        """
+        ack = request.query_params.get("ack", entry.write_buffer["ack"])
+        if ack not in ACK_MODES:
+            return JsonResponse(
+                {"error": f"Invalid ack mode: {ack}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            written = get_buffer(entry).put(
+                dict(data), timeout=settings.WRITE_BUFFER_PUT_TIMEOUT_MS / 1000
+            )
+        except BufferClosed:
+            return None
+        except BufferFull as e:
+            response = JsonResponse(
+                {"error": f"{e}, try again later"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+            response["Retry-After"] = "1"
+            return response
+        if ack == "enqueue":
+            return JsonResponse(
+                {"message": "Row queued"}, status=status.HTTP_202_ACCEPTED
+            )
+        try:
+            written.result(timeout=settings.WRITE_BUFFER_ACK_TIMEOUT_MS / 1000)
+        except FutureTimeout:
+            # The row stays queued and may still be written
+            return JsonResponse(
+                {"message": "Row queued, not written yet"},
+                status=status.HTTP_202_ACCEPTED,
+            )
+        except utils.DatabaseError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return JsonResponse(
+            {"message": "Row added successfully"}, status=status.HTTP_201_CREATED
+        )
+
+
+class WriteBufferView(APIView):
+    @swagger_auto_schema(
+        operation_description=(
+            "Show the write buffer options of the table and the buffer's "
+            "counters in this process"
+        ),
+        responses={200: "Options and counters", 404: "Table not found"},
+    )
+    def get(self, request, id):
+        table_name = f"app_{id}"
+        entry = registry.get(table_name)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return JsonResponse(
             {
-                "__module__": "app.models",
-                "Meta": type("Meta", (object,), {"db_table": table_name}),
+                "write_buffer": entry.write_buffer,
+                "stats": buffer_stats().get(table_name),
+            }
+        )
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Buffer single-row inserts into the table: rows are queued in "
+            "memory and written by multi-row INSERTs every max_rows rows or "
+            "max_delay_ms milliseconds"
+        ),
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "max_rows": openapi.Schema(
+                    type=openapi.TYPE_INTEGER, description="Rows per flush"
+                ),
+                "max_delay_ms": openapi.Schema(
+                    type=openapi.TYPE_INTEGER,
+                    description="Longest wait of a queued row before a flush",
+                ),
+                "ack": openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    enum=list(ACK_MODES),
+                    description="Default acknowledgement of added rows",
+                ),
             },
+            example={"max_rows": 500, "max_delay_ms": 50, "ack": "flush"},
+        ),
+        responses={
+            200: "Write buffer enabled",
+            400: "Invalid options",
+            404: "Table not found",
+        },
+    )
+    def put(self, request, id):
+        table_name = f"app_{id}"
+        try:
+            options = parse_buffer(request.data)
+        except InvalidBuffer as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not CatalogTable.objects.filter(db_table=table_name).update(
+            write_buffer=options
+        ):
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        registry.invalidate(table_name)
+        bump_options_version(table_name)
+        return JsonResponse({"write_buffer": options})
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Stop buffering inserts into the table, after writing the rows "
+            "queued in this process"
+        ),
+        responses={200: "Write buffer disabled", 404: "Table not found"},
+    )
+    def delete(self, request, id):
+        table_name = f"app_{id}"
+        if not CatalogTable.objects.filter(db_table=table_name).update(
+            write_buffer=None
+        ):
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        registry.invalidate(table_name)
+        bump_options_version(table_name)
+        close_buffer(table_name)
+        return JsonResponse({"write_buffer": None})
+
+
+class BulkAddRowsView(APIView):
+    parser_classes = [JSONParser, NDJSONParser]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Add many rows to the dynamic table in one request. The body is a "
+            "JSON array of row objects or NDJSON (application/x-ndjson)."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "on_error",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=["abort", "skip"],
+                description=(
+                    "abort: write nothing if any row is invalid (default); "
+                    "skip: write the valid rows and report the invalid ones"
+                ),
+            ),
+            openapi.Parameter(
+                "chunk_size",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description="Rows per INSERT statement",
+            ),
+        ],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(type=openapi.TYPE_OBJECT),
+            example=[
+                {"field1": "First", "field2": 1},
+                {"field1": "Second", "field2": 2, "field3": False},
+            ],
+        ),
+        responses={
+            201: "Rows added",
+            400: "Invalid input or adding rows failed",
+            404: "Table not found",
+        },
+    )
+    def post(self, request, id):
+        started = time.perf_counter()
+        table_name = f"app_{id}"
+        rows = request.data
+
+        on_error = request.query_params.get("on_error", "abort")
+        if on_error not in ("abort", "skip"):
+            return JsonResponse(
+                {"error": f"Invalid on_error mode: {on_error}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            chunk_size = int(
+                request.query_params.get("chunk_size", settings.BULK_INSERT_CHUNK_SIZE)
+            )
+        except ValueError:
+            chunk_size = 0
+        if chunk_size < 1:
+            return JsonResponse(
+                {"error": "chunk_size must be a positive integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not isinstance(rows, list):
+            return JsonResponse(
+                {"error": "Expected a JSON array or NDJSON body"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        present = set()
+        for row in rows:
+            if isinstance(row, dict):
+                present.update(row)
+        try:
+            entry = registry.get(table_name, columns=present)
+        except UnsupportedColumnType as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Validate everything before the first write
+        valid_rows, errors = entry.validator.validate_many(rows)
+        validated = time.perf_counter()
+
+        if errors and on_error == "abort":
+            return JsonResponse(
+                {"error": "Invalid rows", "inserted": 0, "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        columns = [column for column in entry.columns if column in present]
+        size = effective_chunk_size(chunk_size, len(columns))
+        inserted = 0
+        try:
+            prepare_partitions(entry, [row for _, row in valid_rows])
+            with transaction.atomic():
+                bump_on_commit(table_name)
+                for chunk in chunked(valid_rows, size):
+                    if on_error == "abort":
+                        inserted += insert_rows(
+                            table_name, columns, [row for _, row in chunk]
+                        )
+                    else:
+                        inserted += self._insert_skipping_errors(
+                            table_name, columns, chunk, errors
+                        )
+        except utils.DatabaseError as e:
+            logger.error(f"Bulk insert into {table_name} failed: {e}")
+            return JsonResponse(
+                {"error": "Adding rows failed", "details": str(e), "inserted": 0},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        finished = time.perf_counter()
+
+        errors.sort(key=lambda error: error["index"])
+        return JsonResponse(
+            {
+                "message": "Rows added",
+                "received": len(rows),
+                "inserted": inserted,
+                "failed": len(rows) - inserted,
+                "errors": errors,
+                "timings": {
+                    "validate_ms": round((validated - started) * 1000, 3),
+                    "insert_ms": round((finished - validated) * 1000, 3),
+                    "total_ms": round((finished - started) * 1000, 3),
+                },
+            },
+            status=status.HTTP_201_CREATED,
         )
 
-        # Add fields dynamically based on the existing table schema
-        with connection.cursor() as cursor:
-            cursor.execute(
-                f"SELECT column_name, data_type FROM information_schema.columns WHERE table_name = '{table_name}'"
+    @staticmethod
+    def _insert_skipping_errors(table_name, columns, chunk, errors):
+        """Insert a chunk, falling back to row by row if the database rejects it."""
+        try:
+            with transaction.atomic():
+                return insert_rows(table_name, columns, [row for _, row in chunk])
+        except utils.DatabaseError:
+            pass
+        inserted = 0
+        for index, row in chunk:
+            try:
+                with transaction.atomic():
+                    inserted += insert_rows(table_name, columns, [row])
+            except utils.DatabaseError as e:
+                errors.append({"index": index, "errors": [str(e).strip()]})
+        return inserted
+
+
+class ImportRowsView(APIView):
+    parser_classes = [MultiPartParser]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Import a CSV or NDJSON file into the dynamic table with COPY. Send "
+            "the file as the 'file' field of a multipart upload, or as the raw "
+            "body with Content-Type text/csv or application/x-ndjson. CSV "
+            "headers are matched to the table columns; unknown ones are ignored."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "format",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=list(IMPORT_FORMATS),
+                description="File format, guessed from the file name or Content-Type",
+            ),
+            openapi.Parameter(
+                "create",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                description="Create the table from the header if it does not exist",
+            ),
+            openapi.Parameter(
+                "on_error",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=["abort", "skip"],
+                description="abort: import nothing on any invalid row (default)",
+            ),
+            openapi.Parameter(
+                "chunk_size",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description="Rows per COPY round trip",
+            ),
+            BACKGROUND_PARAMETER,
+        ],
+        responses={
+            201: "Rows imported",
+            202: "Job accepted",
+            400: "Invalid file or import failed",
+            404: "Table not found",
+        },
+    )
+    def post(self, request, id):
+        params = request.query_params
+        on_error = params.get("on_error", "abort")
+        if on_error not in ("abort", "skip"):
+            return JsonResponse(
+                {"error": f"Invalid on_error mode: {on_error}"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            columns = cursor.fetchall()
-            if not columns:
+        try:
+            chunk_size = int(params.get("chunk_size", settings.IMPORT_CHUNK_SIZE))
+        except ValueError:
+            chunk_size = 0
+        if chunk_size < 1:
+            return JsonResponse(
+                {"error": "chunk_size must be a positive integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if request.content_type.startswith("multipart/form-data"):
+            upload = request.FILES.get("file")
+            if upload is None:
                 return JsonResponse(
-                    {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+                    {"error": "Missing 'file' upload"},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-            for column in columns:
-                column_name, data_type = column
-                if column_name == "id":
-                    field = models.AutoField(primary_key=True)
-                elif data_type == "character varying":
-                    field = models.CharField(max_length=255, null=True, blank=True)
-                elif data_type in ["integer", "bigint"]:
-                    field = models.IntegerField(null=True, blank=True)
-                elif data_type == "boolean":
-                    field = models.BooleanField(null=True, blank=True)
-                else:
-                    return JsonResponse(
-                        {"error": f"Unsupported column type: {data_type}"}, status=400
-                    )
-                if not hasattr(DynamicModel, column_name):
-                    DynamicModel.add_to_class(column_name, field)
-
-        # Validate and save the data
-        for field_name, field_value in data.items():
-            column_type = next(
-                (column[1] for column in columns if column[0] == field_name), None
-            )
-            if column_type == "integer" and not isinstance(field_value, int):
+            byte_lines = upload
+            guessed_format = "ndjson" if upload.name.endswith(".ndjson") else "csv"
+        else:
+            byte_lines = request.stream
+            if byte_lines is None:
                 return JsonResponse(
-                    {
-                        "error": f"Invalid data type for field '{field_name}': expected integer"
-                    },
+                    {"error": "Empty body"}, status=status.HTTP_400_BAD_REQUEST
+                )
+            is_ndjson = request.content_type == NDJSONParser.media_type
+            guessed_format = "ndjson" if is_ndjson else "csv"
+
+        options = {
+            "file_format": params.get("format", guessed_format),
+            "create": params.get("create", "").lower() in ("1", "true"),
+            "on_error": on_error,
+            "chunk_size": chunk_size,
+        }
+        if in_background(request):
+            # The job reads the file after the request is over
+            with tempfile.NamedTemporaryFile(
+                dir=settings.JOBS_UPLOAD_DIR, prefix="import-", delete=False
+            ) as upload_file:
+                shutil.copyfileobj(byte_lines, upload_file)
+            job = executor.submit(
+                "import_rows", {"table_id": id, "path": upload_file.name, **options}
+            )
+            return job_accepted(job)
+
+        try:
+            report = import_rows(id, byte_lines, **options)
+        except TableNotFound as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except ImportFailed as e:
+            return JsonResponse(
+                {"error": str(e), "errors": e.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except (UnicodeDecodeError, csv.Error) as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except utils.DatabaseError as e:
+            logger.error(f"Import into {id} failed: {e}")
+            return JsonResponse(
+                {"error": "Import failed", "details": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return JsonResponse(
+            {"message": "Rows imported", **report}, status=status.HTTP_201_CREATED
+        )
+
+
+class DynamicTableRowsView(APIView):
+    # The response format is chosen by the view from format= or Accept
+    content_negotiation_class = ClientFormatNegotiation
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Get rows from the dynamic table. Without paging parameters all rows "
+            "are returned as a list; with limit or after a page of rows is "
+            "returned together with the token of the next page. Any other "
+            "parameter filters on a column: field=value, field__gt=, __gte=, "
+            "__lt=, __lte=, __ne=, __in=a,b, __isnull=true and, for string "
+            "fields, __startswith=."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description="Page size, capped by the server maximum",
+            ),
+            openapi.Parameter(
+                "after",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="Token of the page to fetch, taken from 'next'",
+            ),
+            openapi.Parameter(
+                "order_by",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="Comma separated fields, prefixed with - for descending",
+            ),
+            openapi.Parameter(
+                "fields",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="Comma separated fields to return; all fields by default",
+            ),
+            openapi.Parameter(
+                "format",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=list(ROW_FORMATS),
+                description=(
+                    "objects (default), columns ({columns, data: {field: [...]}}), "
+                    "arrays ({columns, rows: [[...]]}) or binary (columnar); the "
+                    "format can also be chosen with the Accept header"
+                ),
+            ),
+            openapi.Parameter(
+                "search",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description=(
+                    "Words to find in the table's searchable fields, in web "
+                    'search syntax ("quoted phrase", or, -word); matches are '
+                    "ordered by rank unless order_by is given"
+                ),
+            ),
+            openapi.Parameter(
+                "stream",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=["ndjson", "json"],
+                description=(
+                    "Stream the whole table from a server-side cursor as NDJSON "
+                    "or as a chunked JSON array"
+                ),
+            ),
+        ],
+        responses={
+            200: "List of all rows, or a page of rows with the next page token",
+            400: "Invalid filter, ordering, paging, format or streaming parameters",
+            404: "Table not found",
+        },
+    )
+    def get(self, request, id):
+        # Determine the dynamic model based on the table id
+        table_name = f"app_{id}"
+        params = request.query_params
+
+        try:
+            row_format = negotiate_format(params, request.headers.get("Accept"))
+        except UnknownFormat as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        stream_format = params.get("stream")
+        paginate = "limit" in params or "after" in params
+        if stream_format is not None:
+            if stream_format not in STREAM_CONTENT_TYPES:
+                return JsonResponse(
+                    {"error": f"Invalid stream format: {stream_format}"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            if column_type == "character varying" and not isinstance(field_value, str):
+            if paginate:
                 return JsonResponse(
-                    {
-                        "error": f"Invalid data type for field '{field_name}': expected string"
-                    },
+                    {"error": "stream cannot be combined with limit or after"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            if column_type == "boolean" and not isinstance(field_value, bool):
+            if "format" in params:
                 return JsonResponse(
-                    {
-                        "error": f"Invalid data type for field '{field_name}': expected boolean"
-                    },
+                    {"error": "stream cannot be combined with format"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+
         try:
-            with transaction.atomic():
-                instance = DynamicModel(**data)
-                instance.save()
+            entry = registry.get(table_name, columns=referenced_columns(params))
+        except UnsupportedColumnType as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if entry is None:
             return JsonResponse(
-                {"message": "Row added successfully"}, status=status.HTTP_201_CREATED
+                {"error": "Table not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        except Exception as e:
+
+        try:
+            query = query_from_params(
+                table_name, params, entry.columns, search=entry.search
+            )
+            sql, sql_params = query.sql()
+        except (ValueError, InvalidCursor, InvalidQuery) as e:
             return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Unchanged tables are answered from the ETag or the response cache
+        etag = response_etag(table_name, table_version(table_name), params, row_format)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            response["ETag"] = etag
+            patch_vary_headers(response, ["Accept"])
+            return response
 
-class DynamicTableRowsView(APIView):
+        if stream_format is not None:
+            response = StreamingHttpResponse(
+                stream_rows(
+                    sql,
+                    sql_params,
+                    stream_format,
+                    settings.ROWS_STREAM_BATCH_SIZE,
+                    on_rows=lambda count: set_rows_returned(request, count),
+                    using=read_alias(pinned=recently_written(table_name)),
+                ),
+                content_type=STREAM_CONTENT_TYPES[stream_format],
+            )
+            response["ETag"] = etag
+            return response
+
+        cached = get_cached_response(etag)
+        if cached is not None:
+            content, row_count = cached
+            set_rows_returned(request, row_count)
+            response = HttpResponse(content, content_type=ROW_FORMATS[row_format])
+            response["ETag"] = etag
+            patch_vary_headers(response, ["Accept"])
+            return response
+
+        def read(using):
+            with connections[using].cursor() as cursor:
+                cursor.execute(sql, sql_params)
+                return [col[0] for col in cursor.description], cursor.fetchall()
+
+        columns, rows = run_on_replica(read, pinned=recently_written(table_name))
+        next_token = None
+        if paginate:
+            columns, rows, next_token = page_rows(query, columns, rows, params)
+        content, content_type = render_rows(
+            row_format, columns, rows, entry.columns, next_token, paginate
+        )
+        set_rows_returned(request, len(rows))
+        cache_response(etag, content, len(rows))
+        response = HttpResponse(content, content_type=content_type)
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+
+class AggregateRowsView(APIView):
     @swagger_auto_schema(
-        operation_description="Get all rows from the dynamic table",
+        operation_description=(
+            "Aggregate the rows of the dynamic table inside the database. "
+            "metrics lists count, count:field, sum:field, avg:field, min:field "
+            "and max:field (number fields); group_by lists string or boolean "
+            "fields. Other parameters filter rows as on the rows endpoint."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "metrics",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="Comma separated metrics, e.g. count,sum:field2 (default count)",
+            ),
+            openapi.Parameter(
+                "group_by",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="Comma separated string or boolean fields",
+            ),
+        ],
         responses={
-            200: "List of all rows in the dynamic table",
+            200: "One result per group, with the group values and the metrics",
+            400: "Invalid metric, grouping or filter",
             404: "Table not found",
         },
     )
     def get(self, request, id):
-        # Determine the dynamic model based on the table id
         table_name = f"app_{id}"
+        params = request.query_params
+        try:
+            entry = registry.get(table_name, columns=aggregate_columns(params))
+        except UnsupportedColumnType as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if entry is None:
+            return JsonResponse(
+                {"error": "Table not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            results = run_on_replica(
+                lambda using: aggregate(table_name, params, entry.columns, using),
+                pinned=recently_written(table_name),
+            )
+        except InvalidQuery as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        set_rows_returned(request, len(results))
+        return JsonResponse({"results": results})
+
+
+class IndexListView(APIView):
+    @swagger_auto_schema(
+        operation_description=(
+            "List the indexes of the dynamic table with their size, and the "
+            "progress of index builds that are running"
+        ),
+        responses={200: "Indexes and builds in progress", 404: "Table not found"},
+    )
+    def get(self, request, id):
+        table_name = f"app_{id}"
+        if registry.get(table_name) is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        indexes, builds = list_indexes(table_name)
+        return JsonResponse({"indexes": indexes, "builds": builds})
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Create a B-tree index on one or more fields with CREATE INDEX "
+            "CONCURRENTLY, so reads and writes continue during the build"
+        ),
+        manual_parameters=[BACKGROUND_PARAMETER],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "fields": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_STRING),
+                    description="Indexed fields, in order",
+                ),
+                "unique": openapi.Schema(
+                    type=openapi.TYPE_BOOLEAN, description="Create a unique index"
+                ),
+                "name": openapi.Schema(
+                    type=openapi.TYPE_STRING, description="Index name (optional)"
+                ),
+            },
+            required=["fields"],
+            example={"fields": ["field1", "field2"], "unique": False},
+        ),
+        responses={
+            201: "Index created",
+            202: "Job accepted",
+            400: "Invalid input",
+            404: "Table not found",
+            409: "Index already exists or unique index on duplicate values",
+        },
+    )
+    def post(self, request, id):
+        table_name = f"app_{id}"
+        fields = request.data.get("fields")
+        unique = bool(request.data.get("unique", False))
+
+        try:
+            entry = registry.get(
+                table_name, columns=fields if isinstance(fields, list) else ()
+            )
+        except UnsupportedColumnType as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        options = {
+            "unique": unique,
+            "name": request.data.get("name"),
+            "partition_column": (entry.partitioning or {}).get("column"),
+        }
+        if in_background(request):
+            try:
+                check_index(table_name, fields, entry.columns, **options)
+            except InvalidIndex as e:
+                return JsonResponse(
+                    {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+                )
+            job = executor.submit(
+                "create_index", {"table_id": id, "fields": fields, **options}
+            )
+            return job_accepted(job)
+
+        started = time.perf_counter()
+        try:
+            name = create_index(table_name, fields, entry.columns, **options)
+        except InvalidIndex as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except utils.IntegrityError as e:
+            return JsonResponse(
+                {"error": "Duplicate values for a unique index", "details": str(e)},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except utils.ProgrammingError as e:
+            if isinstance(e.__cause__, psycopg2.errors.DuplicateTable):
+                return JsonResponse(
+                    {"error": f"Index already exists: {e}"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            logger.error(f"Index creation failed: {e}")
+            return JsonResponse(
+                {"error": "Index creation failed", "details": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        build_time = time.perf_counter() - started
+
+        indexes, _ = list_indexes(table_name)
+        index = next(index for index in indexes if index["name"] == name)
+        return JsonResponse(
+            {
+                "message": "Index created",
+                "index": index,
+                "build_ms": round(build_time * 1000, 3),
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class IndexDetailView(APIView):
+    @swagger_auto_schema(
+        operation_description="Drop an index with DROP INDEX CONCURRENTLY",
+        responses={
+            200: "Index dropped",
+            400: "The index cannot be dropped",
+            404: "Table or index not found",
+        },
+    )
+    def delete(self, request, id, name):
+        table_name = f"app_{id}"
+        entry = registry.get(table_name)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            dropped = drop_index(
+                table_name, name, partitioned=entry.partitioning is not None
+            )
+        except InvalidIndex as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not dropped:
+            return JsonResponse(
+                {"error": f"Index {name} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return JsonResponse({"message": "Index dropped"}, status=status.HTTP_200_OK)
+
+
+class SearchView(APIView):
+    @swagger_auto_schema(
+        operation_description="Show the full-text search options of the table",
+        responses={200: "Search options, null when disabled", 404: "Table not found"},
+    )
+    def get(self, request, id):
+        entry = registry.get(f"app_{id}")
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return JsonResponse({"search": entry.search})
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Enable full-text search on string fields: a generated tsvector "
+            "column of the fields with a GIN index, used by search= on the "
+            "rows endpoint. Adding the column rewrites the table, so large "
+            "tables are best indexed with background=true."
+        ),
+        manual_parameters=[BACKGROUND_PARAMETER],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "fields": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_STRING),
+                    description="String fields to search",
+                ),
+                "config": openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    description="Text search configuration (default simple)",
+                ),
+            },
+            required=["fields"],
+            example={"fields": ["field1"], "config": "english"},
+        ),
+        responses={
+            200: "Search enabled",
+            202: "Job accepted",
+            400: "Invalid options",
+            404: "Table not found",
+            503: "Table is locked by other queries, try again later",
+        },
+    )
+    def put(self, request, id):
+        table_name = f"app_{id}"
+        entry = registry.get(table_name)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            options = parse_search(request.data, entry.columns)
+        except InvalidSearch as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if in_background(request):
+            job = executor.submit("enable_search", {"table_id": id, "options": options})
+            return job_accepted(job)
+
+        try:
+            lock_held = enable_search(
+                entry, options, lock_timeout_ms=settings.SCHEMA_LOCK_TIMEOUT_MS
+            )
+        except utils.OperationalError as e:
+            if isinstance(e.__cause__, psycopg2.errors.LockNotAvailable):
+                return JsonResponse(
+                    {"error": "Table is busy, try again later"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                )
+            raise
+        except (InvalidIndex, utils.DatabaseError) as e:
+            logger.error(f"Enabling search failed: {e}")
+            return JsonResponse(
+                {"error": "Enabling search failed", "details": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        finally:
+            registry.invalidate(table_name)
+            bump_options_version(table_name)
+            bump_table_version(table_name)
+        return JsonResponse(
+            {"search": options, "lock_held_ms": round(lock_held * 1000, 3)}
+        )
+
+    @swagger_auto_schema(
+        operation_description="Disable full-text search and drop its column",
+        responses={
+            200: "Search disabled",
+            404: "Table not found",
+            503: "Table is locked by other queries, try again later",
+        },
+    )
+    def delete(self, request, id):
+        table_name = f"app_{id}"
+        if registry.get(table_name) is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            disable_search(table_name, lock_timeout_ms=settings.SCHEMA_LOCK_TIMEOUT_MS)
+        except utils.OperationalError as e:
+            if isinstance(e.__cause__, psycopg2.errors.LockNotAvailable):
+                return JsonResponse(
+                    {"error": "Table is busy, try again later"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                )
+            raise
+        finally:
+            registry.invalidate(table_name)
+            bump_options_version(table_name)
+            bump_table_version(table_name)
+        return JsonResponse({"search": None})
+
+
+class ChangeFeedView(APIView):
+    @swagger_auto_schema(
+        operation_description=(
+            "Rows inserted or updated after a cursor, in the order they were "
+            "committed. Start without after (whole table) or with after=now, "
+            "then pass the returned cursor to the next request; more=true "
+            "means rows are left to read right away. With wait=N the request "
+            "waits up to N seconds for rows to arrive."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "after",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="Cursor from the previous response, or now",
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description="Most rows to return, capped by the server maximum",
+            ),
+            openapi.Parameter(
+                "wait",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_NUMBER,
+                description="Seconds to wait for new rows when there are none",
+            ),
+        ],
+        responses={
+            200: "Changed rows, the next cursor and whether more rows are ready",
+            400: "Invalid cursor, limit or wait, or the table has no change feed",
+            404: "Table not found",
+        },
+    )
+    def get(self, request, id):
+        table_name = f"app_{id}"
+        params = request.query_params
+        try:
+            entry = registry.get(table_name)
+        except UnsupportedColumnType as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        if not entry.change_feed:
+            return JsonResponse(
+                {"error": f"Table {id} has no change feed, enable it with PUT"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            after = params.get("after") or None
+            if after is not None and after != NOW:
+                after = parse_after(after)
+            limit = parse_limit(
+                params.get("limit"),
+                settings.ROWS_PAGE_SIZE,
+                settings.ROWS_MAX_PAGE_SIZE,
+            )
+            try:
+                wait = float(params.get("wait", 0))
+            except ValueError:
+                raise ValueError("wait must be a number of seconds")
+            if not 0 <= wait <= settings.CHANGES_MAX_WAIT:
+                raise ValueError(
+                    f"wait must be between 0 and {settings.CHANGES_MAX_WAIT} seconds"
+                )
+        except (ValueError, InvalidCursor) as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        columns, rows, cursor, more = wait_for_changes(entry, after, limit, wait)
+        set_rows_returned(request, len(rows))
+        return JsonResponse(
+            {
+                "changes": [dict(zip(columns, row)) for row in rows],
+                "cursor": cursor,
+                "more": more,
+            }
+        )
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Give a table created without change_feed its change feed. "
+            "Adding the column rewrites the table, so large tables are best "
+            "converted with background=true."
+        ),
+        manual_parameters=[BACKGROUND_PARAMETER],
+        responses={
+            200: "Change feed enabled",
+            202: "Job accepted",
+            404: "Table not found",
+            503: "Table is locked by other queries, try again later",
+        },
+    )
+    def put(self, request, id):
+        table_name = f"app_{id}"
+        entry = registry.get(table_name)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        if entry.change_feed:
+            return JsonResponse({"change_feed": True, "lock_held_ms": 0.0})
+        if in_background(request):
+            job = executor.submit("enable_change_feed", {"table_id": id})
+            return job_accepted(job)
 
-        with connection.cursor() as cursor:
-            # Check if the table exists
-            cursor.execute(
-                f"SELECT table_name FROM information_schema.tables WHERE table_schema='public' AND table_name='{table_name}'"
+        try:
+            lock_held = enable_change_feed(
+                entry, lock_timeout_ms=settings.SCHEMA_LOCK_TIMEOUT_MS
             )
-            if not cursor.fetchone():
+        except utils.OperationalError as e:
+            if isinstance(e.__cause__, psycopg2.errors.LockNotAvailable):
                 return JsonResponse(
-                    {"error": "Table not found"}, status=status.HTTP_404_NOT_FOUND
+                    {"error": "Table is busy, try again later"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
                 )
+            raise
+        except (InvalidIndex, utils.DatabaseError) as e:
+            logger.error(f"Enabling the change feed failed: {e}")
+            return JsonResponse(
+                {"error": "Enabling the change feed failed", "details": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        finally:
+            registry.invalidate(table_name)
+            bump_options_version(table_name)
+        return JsonResponse(
+            {"change_feed": True, "lock_held_ms": round(lock_held * 1000, 3)}
+        )
 
-            # Fetch all rows from the table
-            cursor.execute(f"SELECT * FROM {table_name}")
-            rows = cursor.fetchall()
 
-            # Fetch column names
-            cursor.execute(
-                f"SELECT column_name FROM information_schema.columns WHERE table_name = '{table_name}' ORDER BY ordinal_position"
+class PartitionListView(APIView):
+    @swagger_auto_schema(
+        operation_description=(
+            "List the partitions of a partitioned table with their bounds, "
+            "estimated row count and size"
+        ),
+        responses={
+            200: "Partitioning option and partitions",
+            404: "Table not found",
+        },
+    )
+    def get(self, request, id):
+        table_name = f"app_{id}"
+        entry = registry.get(table_name)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
             )
-            columns = [col[0] for col in cursor.fetchall()]
+        partitions = [] if entry.partitioning is None else list_partitions(table_name)
+        return JsonResponse(
+            {"partitioning": entry.partitioning, "partitions": partitions}
+        )
 
-        # Convert rows to a list of dictionaries
-        results = [dict(zip(columns, row)) for row in rows]
+    @swagger_auto_schema(
+        operation_description=(
+            "Drop the range partitions whose values all lie below `before`. "
+            "Dropping a partition removes its rows without scanning or "
+            "deleting them one by one."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "before",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                required=True,
+                description="Drop partitions whose upper bound is at most this value",
+            ),
+        ],
+        responses={
+            200: "Partitions dropped",
+            400: "Invalid input or the table is not range partitioned",
+            404: "Table not found",
+            503: "Table is locked by other queries, try again later",
+        },
+    )
+    def delete(self, request, id):
+        table_name = f"app_{id}"
+        try:
+            before = int(request.query_params["before"])
+        except (KeyError, ValueError):
+            return JsonResponse(
+                {"error": "before must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        entry = registry.get(table_name)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
 
-        return JsonResponse(results, safe=False)
+        try:
+            dropped = drop_partitions(
+                entry, before, lock_timeout_ms=settings.SCHEMA_LOCK_TIMEOUT_MS
+            )
+        except InvalidPartitionRequest as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except utils.OperationalError as e:
+            if isinstance(e.__cause__, psycopg2.errors.LockNotAvailable):
+                return JsonResponse(
+                    {"error": "Table is busy, try again later"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                )
+            raise
+        if dropped:
+            bump_table_version(table_name)
+        return JsonResponse(
+            {"message": "Partitions dropped", "dropped": dropped},
+            status=status.HTTP_200_OK,
+        )
+
+
+class TableStatsView(APIView):
+    @swagger_auto_schema(
+        operation_description=(
+            "Size and statistics of the table: the estimated row count "
+            "(pg_class.reltuples, summed over partitions), table and index "
+            "size on disk, and the null fraction and estimated distinct "
+            "values of each field (pg_stats). Estimates are null until the "
+            "table was first analyzed. Results are cached for a short while."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "exact",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                description="Also count the rows, which scans the whole table",
+            ),
+        ],
+        responses={200: "Table statistics", 404: "Table not found"},
+    )
+    def get(self, request, id):
+        table_name = f"app_{id}"
+        try:
+            entry = registry.get(table_name)
+        except UnsupportedColumnType as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if entry is None:
+            return JsonResponse(
+                {"error": f"Table {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        exact = request.query_params.get("exact", "").lower() in ("1", "true")
+        stats = run_on_replica(
+            lambda using: table_stats(entry, exact, using),
+            pinned=exact and recently_written(table_name),
+        )
+        return JsonResponse(stats)
+
+
+class JobListView(APIView):
+    @swagger_auto_schema(
+        operation_description="List the latest background jobs",
+        manual_parameters=[
+            openapi.Parameter(
+                "status",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=[choice for choice, _ in Job.STATUS_CHOICES],
+            ),
+            openapi.Parameter("kind", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+        ],
+        responses={200: "Jobs, newest first"},
+    )
+    def get(self, request):
+        jobs = Job.objects.all()
+        for name in ("status", "kind"):
+            if name in request.query_params:
+                jobs = jobs.filter(**{name: request.query_params[name]})
+        return JsonResponse(
+            {"jobs": [job_response(job) for job in jobs[: settings.JOBS_LIST_LIMIT]]}
+        )
+
+
+class JobDetailView(APIView):
+    @swagger_auto_schema(
+        operation_description=(
+            "Status, progress and result (or error) of a background job"
+        ),
+        responses={200: "The job", 404: "Job not found"},
+    )
+    def get(self, request, id):
+        job = Job.objects.filter(id=id).first()
+        if job is None:
+            return JsonResponse(
+                {"error": f"Job {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return JsonResponse(job_response(job))
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Cancel a background job. Waiting jobs are cancelled at once; "
+            "running ones stop their current SQL statement and roll back."
+        ),
+        responses={
+            200: "Job cancelled or cancellation requested",
+            404: "Job not found",
+            409: "The job has already finished",
+        },
+    )
+    def delete(self, request, id):
+        job = cancel_job(id)
+        if job is None:
+            return JsonResponse(
+                {"error": f"Job {id} not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        if job.status in (Job.SUCCEEDED, Job.FAILED):
+            return JsonResponse(
+                {"error": f"Job {id} has already {job.status}", **job_response(job)},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return JsonResponse(job_response(job))
+
+
+class MetricsView(APIView):
+    @swagger_auto_schema(
+        operation_description=(
+            "Request latency, SQL, row and response size metrics of this "
+            "process in the Prometheus text format"
+        ),
+        responses={200: "Prometheus text exposition"},
+    )
+    def get(self, request):
+        return HttpResponse(
+            metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
@@ -0,0 +1,43 @@
+from django.db import connection
+
+# PostgreSQL accepts at most this many bind parameters in one statement
+MAX_QUERY_PARAMS = 65535
+
+
+def effective_chunk_size(chunk_size, column_count):
+    """Clamp ``chunk_size`` so that one INSERT stays under the bind limit."""
+    return max(1, min(chunk_size, MAX_QUERY_PARAMS // max(column_count, 1)))
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def insert_sql(table_name, columns, row_count):
+    """Return a multi-row INSERT of ``row_count`` rows with ``%s`` placeholders."""
+    qn = connection.ops.quote_name
+    if not columns:
+        return "INSERT INTO {} (id) VALUES {}".format(
+            qn(table_name), ", ".join(["(DEFAULT)"] * row_count)
+        )
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    return "INSERT INTO {} ({}) VALUES {}".format(
+        qn(table_name),
+        ", ".join(qn(column) for column in columns),
+        ", ".join([placeholders] * row_count),
+    )
+
+
+def insert_rows(table_name, columns, rows):
+    """Insert ``rows`` into ``table_name`` with a single multi-row INSERT.
+
+    ``rows`` are dicts; keys missing from a row are written as NULL.
+    Returns the number of inserted rows.
+    """
+    if not rows:
+        return 0
+    params = [row.get(column) for row in rows for column in columns]
+    with connection.cursor() as cursor:
+        cursor.execute(insert_sql(table_name, columns, len(rows)), params or None)
+    return len(rows)
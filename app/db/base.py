@@ -0,0 +1,43 @@
+"""PostgreSQL backend that keeps connections open in a per-process pool.
+
+Use it as ``ENGINE: "app.db"`` and configure it with a ``POOL`` dict in the
+database settings (see ``DEFAULT_POOL_OPTIONS``). Django still closes its
+connection at the end of every request and management command, but closing
+returns the connection to the pool instead of ending the session, so the
+next request skips the TCP connection and authentication.
+"""
+
+import atexit
+import functools
+
+from django.db.backends.postgresql import base
+
+from .creation import DatabaseCreation
+from .pool import close_pools, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        key = (
+            self.alias,
+            conn_params.get("dbname"),
+            repr(sorted(conn_params.items())),
+        )
+        self.pool = get_pool(
+            key,
+            self.settings_dict.get("POOL", {}),
+            functools.partial(
+                base.DatabaseWrapper.get_new_connection, self, conn_params
+            ),
+        )
+        return self.pool.getconn()
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
+
+
+atexit.register(close_pools)
@@ -0,0 +1,12 @@
+from django.db.backends.postgresql.creation import (
+    DatabaseCreation as BaseDatabaseCreation,
+)
+
+from .pool import close_pools
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # A database cannot be dropped while pooled sessions are connected to it
+        close_pools(database=test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
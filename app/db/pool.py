@@ -0,0 +1,271 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_OPTIONS = {
+    "MIN_SIZE": 1,
+    "MAX_SIZE": 10,
+    # Seconds an idle connection above MIN_SIZE is kept open
+    "MAX_IDLE": 300.0,
+    # Seconds a checkout waits for a free connection when the pool is full
+    "TIMEOUT": 30.0,
+    # Run SELECT 1 on connections idle for longer than this many seconds
+    # before handing them out; 0 checks on every checkout, at the cost of a
+    # round trip per request
+    "HEALTH_CHECK_AFTER": 10.0,
+}
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection became free within the pool timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of open psycopg2 connections to one database.
+
+    ``connect`` opens a new connection. Idle connections are handed out most
+    recently used first, so that the ones above ``min_size`` go idle and are
+    closed after ``max_idle`` seconds.
+    """
+
+    def __init__(
+        self,
+        connect,
+        min_size=1,
+        max_size=10,
+        max_idle=300.0,
+        timeout=30.0,
+        health_check_after=10.0,
+    ):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(
+                "Pool sizes must satisfy 0 <= MIN_SIZE <= MAX_SIZE and MAX_SIZE >= 1"
+            )
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        # (connection, released at), most recently released last
+        self._idle = deque()
+        # Open connections, idle or checked out
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._counters = dict.fromkeys(
+            (
+                "checkouts",
+                "connections_created",
+                "connections_closed",
+                "waits",
+                "timeouts",
+                "health_checks",
+                "health_check_failures",
+            ),
+            0,
+        )
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def getconn(self):
+        """Check out a connection, opening one or waiting if none is idle."""
+        started = time.monotonic()
+        waited = False
+        expired = []
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise psycopg2.OperationalError("The connection pool is closed")
+                expired.extend(self._expire_idle(time.monotonic()))
+                if self._idle:
+                    conn, released = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = released = None
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No database connection became free within {self.timeout}s "
+                        f"(pool size {self.max_size})"
+                    )
+                if not waited:
+                    waited = True
+                    self._counters["waits"] += 1
+                self._condition.wait(remaining)
+            if waited:
+                wait = time.monotonic() - started
+                self._wait_seconds += wait
+                self._max_wait_seconds = max(self._max_wait_seconds, wait)
+            self._counters["checkouts"] += 1
+        for stale in expired:
+            close_quietly(stale)
+
+        if conn is not None and time.monotonic() - released >= self.health_check_after:
+            if not self._check(conn):
+                # The slot is kept for the replacement opened below
+                with self._condition:
+                    self._counters["connections_closed"] += 1
+                close_quietly(conn)
+                conn = None
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._counters["connections_created"] += 1
+        return conn
+
+    def putconn(self, conn):
+        """Return a checked out connection; broken connections are discarded."""
+        if not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                conn.autocommit = True
+            except psycopg2.Error as e:
+                logger.error(f"Discarding a connection that could not be reset: {e}")
+                self.discard(conn)
+                return
+        if conn.closed or self._closed:
+            self.discard(conn)
+            return
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def discard(self, conn):
+        """Close a checked out connection and free its slot."""
+        self._close_connection(conn)
+
+    def prefill(self):
+        """Open connections until ``min_size`` are open."""
+        conns = []
+        try:
+            while True:
+                with self._condition:
+                    if self._size + len(conns) >= self.min_size:
+                        break
+                conns.append(self.getconn())
+        finally:
+            for conn in conns:
+                self.putconn(conn)
+
+    def close(self):
+        """Close idle connections; checked out ones are closed when returned."""
+        with self._condition:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._condition.notify_all()
+        for conn in idle:
+            self._close_connection(conn)
+
+    def stats(self):
+        with self._condition:
+            return {
+                **self._counters,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "wait_seconds": round(self._wait_seconds, 6),
+                "max_wait_seconds": round(self._max_wait_seconds, 6),
+            }
+
+    def _expire_idle(self, now):
+        """Pop idle connections past ``max_idle``, keeping ``min_size`` open.
+
+        Must be called with the lock held; the caller closes what is returned.
+        """
+        expired = []
+        while (
+            self._idle
+            and self._size - len(expired) > self.min_size
+            and now - self._idle[0][1] > self.max_idle
+        ):
+            expired.append(self._idle.popleft()[0])
+        # Their slots are freed right away; closing happens outside the lock
+        self._size -= len(expired)
+        self._counters["connections_closed"] += len(expired)
+        return expired
+
+    def _check(self, conn):
+        with self._condition:
+            self._counters["health_checks"] += 1
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except psycopg2.Error as e:
+            logger.error(f"Pooled connection failed its health check: {e}")
+            with self._condition:
+                self._counters["health_check_failures"] += 1
+            return False
+
+    def _close_connection(self, conn):
+        with self._condition:
+            self._size -= 1
+            self._counters["connections_closed"] += 1
+            self._condition.notify()
+        close_quietly(conn)
+
+
+def close_quietly(conn):
+    try:
+        conn.close()
+    except psycopg2.Error:
+        pass
+
+
+# Pools of this process, by database alias and connection parameters
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, options, connect):
+    """Return the pool for ``key``, creating it from ``options`` on first use."""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options = {**DEFAULT_POOL_OPTIONS, **options}
+            pool = _pools[key] = ConnectionPool(
+                connect,
+                min_size=options["MIN_SIZE"],
+                max_size=options["MAX_SIZE"],
+                max_idle=options["MAX_IDLE"],
+                timeout=options["TIMEOUT"],
+                health_check_after=options["HEALTH_CHECK_AFTER"],
+            )
+        return pool
+
+
+def pool_stats():
+    """Stats of every pool of this process, by ``alias/database``."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {f"{alias}/{database}": pool.stats() for (alias, database, _), pool in pools}
+
+
+def close_pools(database=None):
+    """Close the pools of ``database``, or all pools."""
+    with _pools_lock:
+        keys = [key for key in _pools if database is None or key[1] == database]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,145 @@
+"""Routing of reads to the read replicas in ``settings.DATABASE_REPLICAS``.
+
+Replicas are checked at most every ``REPLICA_CHECK_INTERVAL`` seconds per
+process. One that cannot be reached, or that replays the primary's WAL
+more than ``REPLICA_STICKY_SECONDS`` behind, is skipped until the next
+check, and reads fall back to the primary. The tables written recently are
+known from the rows cache, so replicas need a cache shared by all processes.
+"""
+
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, OperationalError, connections
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary; 0 when it has replayed
+# everything it received, as an idle primary makes the replay timestamp old
+LAG_SQL = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+# Cache backends whose entries only the process that wrote them sees
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+)
+
+# alias -> (monotonic time of the last check, usable)
+_health = {}
+_lock = threading.Lock()
+
+
+class ReplicaRouter:
+    """Keeps the ORM (the table catalog, Django's own tables) on the primary.
+
+    The catalog has to match the DDL that was just run, so it is never read
+    from a replica, and migrations only run on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+@checks.register(checks.Tags.caches)
+def check_replica_cache(app_configs, **kwargs):
+    """Refuse replicas when the writes of other processes cannot be seen.
+
+    A table written through another process would be read from a replica
+    that has not replayed the write yet.
+    """
+    backend = settings.CACHES[settings.ROWS_CACHE_ALIAS]["BACKEND"]
+    if not settings.DATABASE_REPLICAS or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        checks.Error(
+            "DB_REPLICAS needs a rows cache shared by all processes.",
+            hint="Point ROWS_CACHE_BACKEND and ROWS_CACHE_LOCATION at Redis or "
+            "another shared cache.",
+            id="app.E001",
+        )
+    ]
+
+
+def check_replica(alias):
+    """Return whether ``alias`` answers and is not lagging too far behind."""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = float(cursor.fetchone()[0] or 0)
+    except DatabaseError as e:
+        logger.warning(f"Replica {alias} is unavailable: {e}")
+        connections[alias].close()
+        return False
+    if lag > settings.REPLICA_STICKY_SECONDS:
+        logger.warning(f"Replica {alias} is {lag:.1f}s behind the primary")
+        return False
+    return True
+
+
+def replica_usable(alias):
+    now = time.monotonic()
+    with _lock:
+        checked = _health.get(alias)
+    if checked is not None and now - checked[0] < settings.REPLICA_CHECK_INTERVAL:
+        return checked[1]
+    usable = check_replica(alias)
+    with _lock:
+        _health[alias] = (now, usable)
+    return usable
+
+
+def mark_unavailable(alias, error):
+    logger.warning(f"Read on replica {alias} failed, using the primary: {error}")
+    connections[alias].close()
+    with _lock:
+        _health[alias] = (time.monotonic(), False)
+
+
+def reset_health():
+    with _lock:
+        _health.clear()
+
+
+def read_alias(pinned=False):
+    """Alias to read from: a usable replica, or the primary when ``pinned``.
+
+    Pinned reads (of tables written to moments ago) stay on the primary so
+    that clients see their own writes.
+    """
+    if pinned or not settings.DATABASE_REPLICAS:
+        return DEFAULT_DB_ALIAS
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if replica_usable(alias):
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+def run_on_replica(read, pinned=False):
+    """Return ``read(alias)`` run on a replica, or on the primary if it fails."""
+    alias = read_alias(pinned)
+    if alias == DEFAULT_DB_ALIAS:
+        return read(alias)
+    try:
+        return read(alias)
+    except OperationalError as e:
+        mark_unavailable(alias, e)
+        return read(DEFAULT_DB_ALIAS)
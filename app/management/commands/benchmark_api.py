@@ -0,0 +1,389 @@
+import json
+import platform
+import queue
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime, timezone
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+
+from app.api.synthetic import (
+    drop_table,
+    generate_table,
+    synthetic_fields,
+    synthetic_rows,
+)
+
+
+def int_list(raw):
+    return [int(value) for value in raw.split(",")]
+
+
+def describe(result):
+    size = f"{result['columns']} cols"
+    if result["rows"] is not None:
+        size += f", {result['rows']} rows"
+    return f"{result['operation']:<14} {size:<22}"
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+class InProcessTransport:
+    """Sends requests through Django's test client, without an HTTP server."""
+
+    def __init__(self):
+        self.client = Client(HTTP_HOST="localhost")
+
+    def request(self, method, path, data=None):
+        response = self.client.generic(
+            method,
+            path,
+            json.dumps(data) if data is not None else "",
+            content_type="application/json",
+        )
+        if response.streaming:
+            # Streamed bodies are produced while they are read
+            return response.status_code, b"".join(response.streaming_content)
+        return response.status_code, response.content
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpTransport:
+    """Sends requests to a running server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, data=None):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(data).encode() if data is not None else None,
+            headers={"Content-Type": "application/json"},
+            method=method,
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def close(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark create, alter, insert, bulk insert and read requests on "
+        "synthetic tables and write the results as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--columns",
+            type=int_list,
+            default=[10, 100],
+            help="Comma separated table widths",
+        )
+        parser.add_argument(
+            "--rows",
+            type=int_list,
+            default=[1000, 100000],
+            help="Comma separated row counts of the tables that are read",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=50, help="Requests per measurement"
+        )
+        parser.add_argument(
+            "--bulk-size", type=int, default=1000, help="Rows per bulk insert"
+        )
+        parser.add_argument(
+            "--page-size", type=int, default=100, help="Rows per page read"
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=1, help="Requests in flight"
+        )
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server; by default requests go through "
+            "Django's test client in this process",
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument(
+            "--baseline", help="Results file of an earlier run to compare against"
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the benchmark tables"
+        )
+
+    def handle(self, *args, **options):
+        if min(options["columns"]) < 1 or options["requests"] < 1:
+            raise CommandError("--columns and --requests must be positive")
+        self.options = options
+        self.prefix = f"bench{uuid.uuid4().hex[:8]}"
+        self.tables = []
+        results = []
+        try:
+            for columns in options["columns"]:
+                results.extend(self.run_writes(columns))
+                for rows in options["rows"]:
+                    results.extend(self.run_reads(columns, rows))
+        finally:
+            if not options["keep"]:
+                for table_id in self.tables:
+                    drop_table(table_id)
+
+        report = {"meta": self.meta(), "results": results}
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+        self.print_summary(results)
+        if options["baseline"]:
+            self.compare(results, options["baseline"])
+
+    def transport(self):
+        if self.options["url"]:
+            return HttpTransport(self.options["url"])
+        return InProcessTransport()
+
+    def measure(self, operation, requests, columns, rows=None, rows_per_request=1):
+        """Send ``requests`` ((method, path, data) tuples) and summarize them."""
+        pending = queue.Queue()
+        for request in requests:
+            pending.put(request)
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            transport = self.transport()
+            try:
+                while True:
+                    try:
+                        method, path, data = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    started = time.perf_counter()
+                    try:
+                        code, body = transport.request(method, path, data)
+                    except Exception as e:
+                        code, body = 599, repr(e).encode()
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies.append(elapsed)
+                        if code >= 400:
+                            errors.append(f"{code} {body[:200]!r}")
+            finally:
+                transport.close()
+
+        threads = [
+            threading.Thread(target=worker)
+            for _ in range(min(self.options["concurrency"], len(requests)))
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            self.stderr.write(f"{operation}: {len(errors)} failed, e.g. {errors[0]}")
+
+        latencies.sort()
+        return {
+            "operation": operation,
+            "columns": columns,
+            "rows": rows,
+            "requests": len(latencies),
+            "concurrency": len(threads),
+            "errors": len(errors),
+            "seconds": round(elapsed, 4),
+            "requests_per_second": round(len(latencies) / elapsed, 2),
+            "rows_per_second": round(len(latencies) * rows_per_request / elapsed, 2),
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 3),
+                "p50": round(percentile(latencies, 0.50) * 1000, 3),
+                "p90": round(percentile(latencies, 0.90) * 1000, 3),
+                "p99": round(percentile(latencies, 0.99) * 1000, 3),
+                "max": round(latencies[-1] * 1000, 3),
+            },
+        }
+
+    def run_writes(self, columns):
+        count = self.options["requests"]
+        fields = synthetic_fields(columns)
+        names = [f"{self.prefix}_c{columns}_{number}" for number in range(count)]
+        results = [
+            self.measure(
+                "create",
+                [
+                    ("POST", "/api/table", {"name": name, "fields": fields})
+                    for name in names
+                ],
+                columns,
+            )
+        ]
+        self.tables.extend(name.lower() for name in names)
+
+        table_id = names[0].lower()
+        results.append(
+            self.measure(
+                "alter",
+                [
+                    (
+                        "PUT",
+                        f"/api/table/{table_id}",
+                        {"fields": [{"name": f"extra{number}", "type": "number"}]},
+                    )
+                    for number in range(count)
+                ],
+                columns,
+            )
+        )
+
+        table_id = names[1 % count].lower()
+        results.append(
+            self.measure(
+                "insert",
+                [
+                    ("POST", f"/api/table/{table_id}/row", row)
+                    for row in synthetic_rows(fields, count)
+                ],
+                columns,
+            )
+        )
+
+        bulk_size = self.options["bulk_size"]
+        rows = list(synthetic_rows(fields, bulk_size, seed=1))
+        results.append(
+            self.measure(
+                "bulk_insert",
+                [("POST", f"/api/table/{table_id}/rows/bulk", rows)] * count,
+                columns,
+                rows=bulk_size,
+                rows_per_request=bulk_size,
+            )
+        )
+        return results
+
+    def run_reads(self, columns, rows):
+        count = self.options["requests"]
+        page_size = self.options["page_size"]
+        started = time.perf_counter()
+        table_id = generate_table(f"{self.prefix}_c{columns}_r{rows}", columns, rows)
+        self.tables.append(table_id)
+        self.stderr.write(
+            f"Seeded {rows} rows x {columns} columns in "
+            f"{time.perf_counter() - started:.1f}s"
+        )
+        path = f"/api/table/{table_id}/rows"
+        # Every read gets its own query string, which the response cache has
+        # not seen; ids are positive, so id__gt=-n does not change the rows
+        results = [
+            self.measure(
+                "read_page",
+                [
+                    ("GET", f"{path}?limit={page_size}&id__gt=-{number}", None)
+                    for number in range(count)
+                ],
+                columns,
+                rows,
+                rows_per_request=min(page_size, rows),
+            ),
+            self.measure(
+                "read_filtered",
+                [
+                    (
+                        "GET",
+                        f"{path}?limit={page_size}&field1__gt=0&order_by=-field1"
+                        f"&id__gt=-{number}",
+                        None,
+                    )
+                    for number in range(count)
+                ],
+                columns,
+                rows,
+            ),
+            # Whole-table reads are slow on large tables, so fewer are sent
+            self.measure(
+                "read_all",
+                [("GET", f"{path}?stream=ndjson", None)] * max(1, count // 10),
+                columns,
+                rows,
+                rows_per_request=rows,
+            ),
+        ]
+        return results
+
+    def meta(self):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "HEAD"], capture_output=True, text=True
+            ).stdout.strip()
+        except OSError:
+            commit = ""
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": commit or None,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "postgresql": connection.pg_version,
+            "target": self.options["url"] or "in-process",
+            "options": {
+                key: self.options[key]
+                for key in (
+                    "columns",
+                    "rows",
+                    "requests",
+                    "bulk_size",
+                    "page_size",
+                    "concurrency",
+                )
+            },
+        }
+
+    def print_summary(self, results):
+        for result in results:
+            latency = result["latency_ms"]
+            self.stderr.write(
+                f"{describe(result)} "
+                f"p50 {latency['p50']:>9} ms  p99 {latency['p99']:>9} ms  "
+                f"{result['requests_per_second']:>9} req/s"
+            )
+
+    def compare(self, results, baseline_path):
+        """Print the p50 latency change of each measurement against a baseline."""
+        try:
+            with open(baseline_path) as f:
+                baseline = json.load(f)["results"]
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read baseline {baseline_path}: {e}")
+
+        def key(result):
+            return result["operation"], result["columns"], result["rows"]
+
+        previous = {key(result): result for result in baseline}
+        for result in results:
+            before = previous.get(key(result))
+            if before is None:
+                continue
+            old = before["latency_ms"]["p50"]
+            new = result["latency_ms"]["p50"]
+            change = (new - old) / old * 100 if old else 0.0
+            self.stderr.write(
+                f"{describe(result)} p50 {old} -> {new} ms ({change:+.1f}%)"
+            )
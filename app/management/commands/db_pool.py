@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, utils
+
+from app.db.pool import pool_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Open the minimum number of pooled database connections, check them "
+        "and print the pool stats as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            pool = getattr(connection, "pool", None)
+            if pool is None:
+                raise CommandError(
+                    f"Database '{options['database']}' does not use the pooled backend"
+                )
+            pool.prefill()
+        except utils.DatabaseError as e:
+            raise CommandError(f"Database check failed: {e}")
+        finally:
+            connection.close()
+        self.stdout.write(json.dumps(pool_stats(), indent=2))
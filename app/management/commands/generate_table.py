@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import utils
+
+from app.api.synthetic import generate_table
+
+
+class Command(BaseCommand):
+    help = "Create a dynamic table filled with reproducible synthetic rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", help="Name of the new table")
+        parser.add_argument(
+            "--columns",
+            type=int,
+            default=10,
+            help="Number of fields, cycling through string, number and boolean",
+        )
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    def handle(self, *args, **options):
+        if options["columns"] < 1 or options["rows"] < 0:
+            raise CommandError("--columns must be positive and --rows not negative")
+        try:
+            table_id = generate_table(
+                options["name"], options["columns"], options["rows"], options["seed"]
+            )
+        except utils.DatabaseError as e:
+            raise CommandError(f"Generating the table failed: {e}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created table {table_id} with {options['columns']} fields "
+                f"and {options['rows']} rows"
+            )
+        )
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import utils
+
+from app.api.importer import IMPORT_FORMATS, ImportFailed, import_rows
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV or NDJSON file into a dynamic table with COPY FROM STDIN"
+
+    def add_arguments(self, parser):
+        parser.add_argument("table_id", help="Id of the dynamic table")
+        parser.add_argument("path", help="File to import")
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            help="File format, guessed from the file extension by default",
+        )
+        parser.add_argument(
+            "--create",
+            action="store_true",
+            help="Create the table from the header if it does not exist",
+        )
+        parser.add_argument(
+            "--on-error",
+            choices=["abort", "skip"],
+            default="abort",
+            help="Abort the whole import, or skip invalid rows",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.IMPORT_CHUNK_SIZE,
+            help="Rows per COPY round trip",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or (
+            "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+        )
+        try:
+            with open(path, "rb") as f:
+                report = import_rows(
+                    options["table_id"],
+                    f,
+                    file_format=file_format,
+                    create=options["create"],
+                    on_error=options["on_error"],
+                    chunk_size=options["chunk_size"],
+                )
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        except ImportFailed as e:
+            details = "".join(
+                f"\n  row {error['row']}: {'; '.join(error['errors'])}"
+                for error in e.errors
+            )
+            raise CommandError(f"{e}{details}")
+        except (UnicodeDecodeError, utils.DatabaseError) as e:
+            raise CommandError(f"Import failed: {e}")
+
+        for error in report["errors"]:
+            self.stderr.write(f"row {error['row']}: {'; '.join(error['errors'])}")
+        if report["ignored_columns"]:
+            self.stdout.write(
+                f"Ignored columns: {', '.join(report['ignored_columns'])}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {report['inserted']} of {report['rows']} rows into "
+                f"{report['table_id']} in {report['seconds']}s "
+                f"({report['rows_per_second']} rows/s)"
+            )
+        )
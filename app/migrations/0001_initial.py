@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogTable",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("db_table", models.CharField(max_length=255, unique=True)),
+                ("schema_version", models.PositiveIntegerField(default=1)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "catalog_table",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="CatalogColumn",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("data_type", models.CharField(max_length=255)),
+                ("position", models.PositiveIntegerField()),
+                (
+                    "table",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="columns",
+                        to="app.catalogtable",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "catalog_column",
+                "ordering": ["table", "position"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="catalogcolumn",
+            constraint=models.UniqueConstraint(
+                fields=("table", "name"), name="catalog_column_unique_name"
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+TABLES_SQL = (
+    "SELECT table_name FROM information_schema.tables "
+    "WHERE table_schema = 'public' AND table_type = 'BASE TABLE' "
+    "AND table_name LIKE 'app\\_%'"
+)
+COLUMNS_SQL = (
+    "SELECT column_name, data_type FROM information_schema.columns "
+    "WHERE table_schema = 'public' AND table_name = %s "
+    "ORDER BY ordinal_position"
+)
+
+
+def backfill_catalog(apps, schema_editor):
+    """Record the dynamic tables created before the catalog existed."""
+    CatalogTable = apps.get_model("app", "CatalogTable")
+    CatalogColumn = apps.get_model("app", "CatalogColumn")
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(TABLES_SQL)
+        db_tables = [row[0] for row in cursor.fetchall()]
+        for db_table in db_tables:
+            cursor.execute(COLUMNS_SQL, [db_table])
+            columns = cursor.fetchall()
+            table = CatalogTable.objects.create(
+                name=db_table[len("app_") :], db_table=db_table
+            )
+            CatalogColumn.objects.bulk_create(
+                CatalogColumn(
+                    table=table, name=name, data_type=data_type, position=position
+                )
+                for position, (name, data_type) in enumerate(columns, 1)
+            )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_catalog, migrations.RunPython.noop),
+    ]
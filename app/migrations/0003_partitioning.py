@@ -0,0 +1,88 @@
+from django.db import migrations, models
+
+# Creates the missing range partitions of ``parent`` starting at ``lows``
+# (multiples of ``step``). Bounds outside [min_value, max_value], the range
+# of the partition key's type, become MINVALUE / MAXVALUE. The advisory lock
+# is only taken when a partition is missing, so concurrent writers create
+# each partition once and writes into existing partitions never wait.
+ADD_RANGE_PARTITIONS_SQL = """
+CREATE FUNCTION tablebuilder_add_range_partitions(
+    parent text, step bigint, lows bigint[], min_value bigint, max_value bigint
+) RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE
+    low bigint;
+    part_name text;
+    created integer := 0;
+BEGIN
+    FOREACH low IN ARRAY lows LOOP
+        part_name := parent || '_p' || replace(low::text, '-', 'm');
+        CONTINUE WHEN to_regclass(quote_ident(part_name)) IS NOT NULL;
+        PERFORM pg_advisory_xact_lock(hashtext(parent));
+        CONTINUE WHEN to_regclass(quote_ident(part_name)) IS NOT NULL;
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%s) TO (%s)',
+            part_name,
+            parent,
+            CASE WHEN low <= min_value THEN 'MINVALUE' ELSE low::text END,
+            CASE WHEN low > max_value - step THEN 'MAXVALUE'
+                ELSE (low + step)::text END
+        );
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END
+$$;
+"""
+
+# Range partitions of ``parent`` on its identity ``id``: covers the ids the
+# next ``row_count`` rows will get, one spare interval for concurrent
+# writers, and any explicit ids in ``lows``.
+ADD_ID_PARTITIONS_SQL = """
+CREATE FUNCTION tablebuilder_add_id_partitions(
+    parent text, step bigint, row_count bigint, lows bigint[]
+) RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE
+    last_id bigint := COALESCE(
+        pg_sequence_last_value(pg_get_serial_sequence(quote_ident(parent), 'id')),
+        0
+    );
+BEGIN
+    RETURN tablebuilder_add_range_partitions(
+        parent,
+        step,
+        lows || ARRAY(
+            SELECT generate_series(
+                last_id / step * step, (last_id + row_count) / step * step + step, step
+            )
+        ),
+        -9223372036854775808,
+        9223372036854775807
+    );
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0002_backfill_catalog"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="catalogtable",
+            name="partitioning",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunSQL(
+            ADD_RANGE_PARTITIONS_SQL,
+            "DROP FUNCTION tablebuilder_add_range_partitions("
+            "text, bigint, bigint[], bigint, bigint)",
+        ),
+        migrations.RunSQL(
+            ADD_ID_PARTITIONS_SQL,
+            "DROP FUNCTION tablebuilder_add_id_partitions("
+            "text, bigint, bigint, bigint[])",
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0004_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="catalogtable",
+            name="write_buffer",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0005_write_buffer"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="catalogtable",
+            name="search",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
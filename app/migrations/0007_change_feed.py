@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+# Stamps an updated row with the id of the transaction updating it; inserted
+# rows get it from the column default.
+TOUCH_ROW_SQL = """
+CREATE FUNCTION tablebuilder_touch_row() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW._xid := pg_current_xact_id();
+    RETURN NEW;
+END
+$$;
+"""
+
+# Tells the listeners of the change feed that a table was written. The
+# notification is delivered when the transaction commits, once per table.
+NOTIFY_CHANGE_SQL = """
+CREATE FUNCTION tablebuilder_notify_change() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('tablebuilder_changes', TG_TABLE_NAME);
+    RETURN NULL;
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0006_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="catalogtable",
+            name="change_feed",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunSQL(TOUCH_ROW_SQL, "DROP FUNCTION tablebuilder_touch_row()"),
+        migrations.RunSQL(
+            NOTIFY_CHANGE_SQL, "DROP FUNCTION tablebuilder_notify_change()"
+        ),
+    ]
@@ -1,2 +1,110 @@
+import uuid
+
 from django.db import models
 
+
+class CatalogTable(models.Model):
+    """A dynamic table created through the API.
+
+    The catalog is written in the same transaction as the DDL that creates or
+    alters the table, so it always matches the database schema.
+    """
+
+    # Table id used in the API, e.g. "dynamictable_123"
+    name = models.CharField(max_length=255, unique=True)
+    db_table = models.CharField(max_length=255, unique=True)
+    # Bumped every time columns are added
+    schema_version = models.PositiveIntegerField(default=1)
+    # {"type": "hash", "column": ..., "partitions": n} or
+    # {"type": "range", "column": ..., "interval": n}; null for plain tables
+    partitioning = models.JSONField(null=True, blank=True)
+    # {"max_rows": n, "max_delay_ms": n, "ack": "enqueue" | "flush"} when
+    # single-row inserts are buffered (app.api.buffers); null otherwise
+    write_buffer = models.JSONField(null=True, blank=True)
+    # {"fields": [...], "config": ...} when the string fields are indexed for
+    # full-text search (app.api.search); null otherwise
+    search = models.JSONField(null=True, blank=True)
+    # Whether rows carry the transaction id that last wrote them and the
+    # table notifies writes, for the change feed (app.api.changes)
+    change_feed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Dynamic tables are named app_<id>, so the catalog stays out of that
+        db_table = "catalog_table"
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class CatalogColumn(models.Model):
+    """A column of a dynamic table, with its information_schema data type."""
+
+    table = models.ForeignKey(
+        CatalogTable, on_delete=models.CASCADE, related_name="columns"
+    )
+    name = models.CharField(max_length=255)
+    data_type = models.CharField(max_length=255)
+    # 1-based, in the order of the table's columns
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = "catalog_column"
+        ordering = ["table", "position"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["table", "name"], name="catalog_column_unique_name"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.table.name}.{self.name}"
+
+
+class Job(models.Model):
+    """A background operation run by the in-process executor (app.api.jobs).
+
+    The row is the job's only shared state, so any process can report on it
+    or cancel it, whichever process runs it.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+        (CANCELLED, "Cancelled"),
+    ]
+    FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    params = models.JSONField(default=dict)
+    # {"done": n, "total": n or null}, reported by the running job
+    progress = models.JSONField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    # "<host>:<pid>" of the process running the job
+    worker = models.CharField(max_length=255, blank=True)
+    # Server process of the job's database connection, for pg_cancel_backend
+    backend_pid = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "job"
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "kind"], name="job_status_kind")]
+
+    def __str__(self):
+        return f"{self.kind} {self.id} ({self.status})"
@@ -0,0 +1,22 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def create_table(api_client):
+    """Create a dynamic table through the API and return its id."""
+
+    def _create_table(name, fields):
+        response = api_client.post(
+            reverse("create-table"), {"name": name, "fields": fields}, format="json"
+        )
+        assert response.status_code == 201
+        return response.json()["table_id"]
+
+    return _create_table
@@ -0,0 +1,111 @@
+import pytest
+from django.urls import reverse
+
+from app.api.aggregates import parse_metrics
+from app.api.queries import InvalidQuery
+
+COLUMNS = {
+    "id": "bigint",
+    "field1": "character varying",
+    "field2": "integer",
+    "field3": "boolean",
+}
+FIELDS = [
+    {"name": "field1", "type": "string"},
+    {"name": "field2", "type": "number"},
+    {"name": "field3", "type": "boolean"},
+]
+ROWS = [
+    {"field1": "a", "field2": 1, "field3": True},
+    {"field1": "a", "field2": 3, "field3": False},
+    {"field1": "b", "field2": 10, "field3": True},
+    {"field1": "b", "field3": True},
+    {"field2": 7},
+]
+
+
+def test_parse_metrics():
+    assert parse_metrics(None, COLUMNS) == [("count", "")]
+    assert parse_metrics("count,sum:field2,count:field1", COLUMNS) == [
+        ("count", ""),
+        ("sum", "field2"),
+        ("count", "field1"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "raw", ["median:field2", "sum:field1", "avg", "max:unknown", "count,count"]
+)
+def test_parse_metrics_rejects_invalid_metrics(raw):
+    with pytest.raises(InvalidQuery):
+        parse_metrics(raw, COLUMNS)
+
+
+@pytest.fixture
+def table_id(api_client, create_table):
+    table_id = create_table("Aggregated", FIELDS)
+    url = reverse("add-rows", kwargs={"id": table_id})
+    assert api_client.post(url, ROWS, format="json").status_code == 201
+    return table_id
+
+
+@pytest.mark.django_db
+def test_aggregate_whole_table(api_client, table_id):
+    url = reverse("aggregate-rows", kwargs={"id": table_id})
+    response = api_client.get(
+        url,
+        {"metrics": "count,count:field2,sum:field2,avg:field2,min:field2,max:field2"},
+    )
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {
+            "count": 5,
+            "count_field2": 4,
+            "sum_field2": 21,
+            "avg_field2": 5.25,
+            "min_field2": 1,
+            "max_field2": 10,
+        }
+    ]
+
+
+@pytest.mark.django_db
+def test_aggregate_group_by_with_filters(api_client, table_id):
+    url = reverse("aggregate-rows", kwargs={"id": table_id})
+    response = api_client.get(
+        url, {"metrics": "count,sum:field2", "group_by": "field1", "field3": "true"}
+    )
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"field1": "a", "count": 1, "sum_field2": 1},
+        {"field1": "b", "count": 2, "sum_field2": 10},
+    ]
+
+    response = api_client.get(url, {"group_by": "field1,field3"})
+    assert response.json()["results"] == [
+        {"field1": "a", "field3": False, "count": 1},
+        {"field1": "a", "field3": True, "count": 1},
+        {"field1": "b", "field3": True, "count": 2},
+        {"field1": None, "field3": None, "count": 1},
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"group_by": "field2"},
+        {"group_by": "unknown"},
+        {"metrics": "sum:field3"},
+        {"unknown": "1"},
+    ],
+)
+def test_aggregate_rejects_invalid_parameters(api_client, table_id, params):
+    url = reverse("aggregate-rows", kwargs={"id": table_id})
+    assert api_client.get(url, params).status_code == 400
+
+
+@pytest.mark.django_db
+def test_aggregate_missing_table(api_client):
+    url = reverse("aggregate-rows", kwargs={"id": "missing"})
+    assert api_client.get(url).status_code == 404
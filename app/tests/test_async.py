@@ -0,0 +1,86 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+
+from app.api.async_db import close_pool, numbered
+
+FIELDS = [
+    {"name": "field1", "type": "string"},
+    {"name": "field2", "type": "number"},
+]
+
+
+def test_numbered_placeholders():
+    assert numbered("SELECT %s, %s") == "SELECT $1, $2"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_endpoints():
+    @async_to_sync
+    async def run():
+        client = AsyncClient()
+        try:
+            response = await client.post(
+                reverse("async-create-table"),
+                {"name": "AsyncTable", "fields": FIELDS},
+                content_type="application/json",
+            )
+            assert response.status_code == 201
+            table_id = response.json()["table_id"]
+
+            response = await client.post(
+                reverse("async-create-table"),
+                {"name": "AsyncTable", "fields": FIELDS},
+                content_type="application/json",
+            )
+            assert response.status_code == 409
+
+            response = await client.put(
+                reverse("async-update-table", kwargs={"id": table_id}),
+                {"fields": [{"name": "field3", "type": "boolean"}]},
+                content_type="application/json",
+            )
+            assert response.status_code == 200
+            assert response.json()["added"] == ["field3"]
+
+            row_url = reverse("async-add-row", kwargs={"id": table_id})
+            for number in range(3):
+                response = await client.post(
+                    row_url,
+                    {"field1": f"row {number}", "field2": number, "field3": True},
+                    content_type="application/json",
+                )
+                assert response.status_code == 201
+            response = await client.post(
+                row_url, {"field2": "not a number"}, content_type="application/json"
+            )
+            assert response.status_code == 400
+
+            rows_url = reverse("async-get-rows", kwargs={"id": table_id})
+            response = await client.get(
+                rows_url, {"field2__gte": 1, "order_by": "-field2"}
+            )
+            assert response.status_code == 200
+            assert [row["field2"] for row in response.json()] == [2, 1]
+            # An empty result still knows its columns
+            response = await client.get(rows_url, {"field2__gt": 5, "format": "arrays"})
+            assert response.json() == {
+                "columns": ["id", "field1", "field2", "field3"],
+                "rows": [],
+            }
+
+            page = (await client.get(rows_url, {"limit": 2})).json()
+            assert [row["field1"] for row in page["results"]] == ["row 0", "row 1"]
+            page = (
+                await client.get(rows_url, {"limit": 2, "after": page["next"]})
+            ).json()
+            assert [row["field1"] for row in page["results"]] == ["row 2"]
+            assert page["next"] is None
+
+            missing_url = reverse("async-get-rows", kwargs={"id": "missing"})
+            assert (await client.get(missing_url)).status_code == 404
+        finally:
+            await close_pool()
+
+    run()
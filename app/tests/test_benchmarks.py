@@ -0,0 +1,71 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from app.api.synthetic import synthetic_fields, synthetic_rows
+
+
+def test_synthetic_rows_are_reproducible():
+    fields = synthetic_fields(4)
+    assert [field["type"] for field in fields] == [
+        "string",
+        "number",
+        "boolean",
+        "string",
+    ]
+    assert list(synthetic_rows(fields, 5, seed=3)) == list(
+        synthetic_rows(fields, 5, seed=3)
+    )
+
+
+@pytest.mark.django_db
+def test_generate_table_command():
+    call_command("generate_table", "Synthetic", columns=7, rows=250)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM app_synthetic")
+        assert cursor.fetchone()[0] == 250
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_command_writes_results(tmp_path):
+    output = tmp_path / "results.json"
+    call_command(
+        "benchmark_api",
+        columns=[3],
+        rows=[20],
+        requests=3,
+        bulk_size=10,
+        output=str(output),
+    )
+    report = json.loads(output.read_text())
+    assert report["meta"]["options"]["requests"] == 3
+    results = report["results"]
+    assert [result["operation"] for result in results] == [
+        "create",
+        "alter",
+        "insert",
+        "bulk_insert",
+        "read_page",
+        "read_filtered",
+        "read_all",
+    ]
+    assert all(result["errors"] == 0 for result in results)
+    assert results[0]["latency_ms"]["p50"] > 0
+
+    call_command(
+        "benchmark_api",
+        columns=[3],
+        rows=[20],
+        requests=2,
+        bulk_size=10,
+        output=str(tmp_path / "second.json"),
+        baseline=str(output),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            "WHERE table_name LIKE 'app_bench%'"
+        )
+        assert cursor.fetchone()[0] == 0
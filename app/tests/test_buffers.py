@@ -0,0 +1,260 @@
+import os
+import subprocess
+import sys
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction, utils
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app.api.buffers import (
+    _STOP,
+    InvalidBuffer,
+    WriteBuffer,
+    buffer_stats,
+    close_buffer,
+    parse_buffer,
+)
+from app.api.cache import bump_options_version
+from app.models import CatalogTable
+
+FIELDS = [{"name": "field1", "type": "string"}, {"name": "field2", "type": "number"}]
+
+
+@pytest.fixture
+def buffered_table(api_client, create_table):
+    """Create a table with a write buffer and flush it when the test ends."""
+    tables = []
+
+    def _create(**options):
+        table_id = create_table(f"Buffered{uuid.uuid4().hex[:8]}", FIELDS)
+        response = api_client.put(
+            reverse("write-buffer", kwargs={"id": table_id}), options, format="json"
+        )
+        assert response.status_code == 200
+        tables.append(table_id)
+        return table_id
+
+    yield _create
+    for table_id in tables:
+        close_buffer(f"app_{table_id}")
+
+
+@pytest.fixture
+def shared_rows_cache(settings):
+    """Keep the rows cache in the test database, where other processes see it.
+
+    Returns the environment that points another process at the same cache.
+    """
+    table = f"rows_cache_{uuid.uuid4().hex[:8]}"
+    call_command("createcachetable", table)
+    backend = "django.core.cache.backends.db.DatabaseCache"
+    settings.CACHES = {
+        **settings.CACHES,
+        "rows": {"BACKEND": backend, "LOCATION": table},
+    }
+    yield {"ROWS_CACHE_BACKEND": backend, "ROWS_CACHE_LOCATION": table}
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {table}")
+
+
+def run_in_another_process(code, env):
+    """Run ``code`` in a new Django process on the test database."""
+    env = {**os.environ, **env, "POSTGRES_DB": connection.settings_dict["NAME"]}
+    subprocess.run(
+        [sys.executable, "manage.py", "shell", "-c", code],
+        cwd=Path(__file__).resolve().parents[2],
+        env=env,
+        check=True,
+        capture_output=True,
+    )
+
+
+def count_rows(table_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM "app_{table_id}"')
+        return cursor.fetchone()[0]
+
+
+def test_parse_buffer(settings):
+    settings.WRITE_BUFFER_MAX_ROWS = 100
+    assert parse_buffer({}) == {"max_rows": 100, "max_delay_ms": 50, "ack": "enqueue"}
+    assert parse_buffer({"max_rows": 10, "max_delay_ms": 0, "ack": "flush"}) == {
+        "max_rows": 10,
+        "max_delay_ms": 0,
+        "ack": "flush",
+    }
+    for options in (
+        [],
+        {"max_rows": 0},
+        {"max_rows": "10"},
+        {"max_delay_ms": True},
+        {"max_delay_ms": 10**6},
+        {"ack": "never"},
+    ):
+        with pytest.raises(InvalidBuffer):
+            parse_buffer(options)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rows_are_written_in_batches(api_client, buffered_table):
+    table_id = buffered_table(max_rows=20, max_delay_ms=200, ack="flush")
+    url = reverse("add-row", kwargs={"id": table_id})
+
+    def add(number):
+        try:
+            return APIClient().post(url, {"field2": number}, format="json").status_code
+        finally:
+            # The test client keeps the worker's connection checked out
+            connection.close()
+
+    with ThreadPoolExecutor(20) as pool:
+        statuses = list(pool.map(add, range(40)))
+    assert statuses == [201] * 40
+    # Acknowledged rows are committed
+    assert count_rows(table_id) == 40
+    stats = buffer_stats()[f"app_{table_id}"]
+    assert stats["flushed_rows"] == 40
+    assert stats["flushes"] < 40
+
+    response = api_client.get(reverse("write-buffer", kwargs={"id": table_id}))
+    assert response.json()["write_buffer"]["ack"] == "flush"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_enqueue_ack_and_flush_when_disabled(api_client, buffered_table):
+    table_id = buffered_table(max_rows=1000, max_delay_ms=60000)
+    url = reverse("add-row", kwargs={"id": table_id})
+    for number in range(5):
+        response = api_client.post(url, {"field2": number}, format="json")
+        assert response.status_code == 202
+    assert count_rows(table_id) == 0
+
+    response = api_client.delete(reverse("write-buffer", kwargs={"id": table_id}))
+    assert response.status_code == 200
+    assert count_rows(table_id) == 5
+    # Without the buffer rows are written by the request again
+    assert api_client.post(url, {"field2": 5}, format="json").status_code == 201
+    assert count_rows(table_id) == 6
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rejected_row_fails_alone(api_client, buffered_table):
+    table_id = buffered_table(max_rows=3, max_delay_ms=1000, ack="flush")
+    url = reverse("add-row", kwargs={"id": table_id})
+    rows = [{"id": 1, "field2": 1}, {"id": 1, "field2": 2}, {"id": 2, "field2": 3}]
+
+    def add(row):
+        try:
+            return APIClient().post(url, row, format="json")
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(3) as pool:
+        responses = list(pool.map(add, rows))
+    assert sorted(response.status_code for response in responses) == [201, 201, 400]
+    assert count_rows(table_id) == 2
+    assert buffer_stats()[f"app_{table_id}"]["failed_rows"] == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_full_buffer_pushes_back(api_client, buffered_table, settings):
+    settings.WRITE_BUFFER_CAPACITY = 2
+    settings.WRITE_BUFFER_PUT_TIMEOUT_MS = 10
+    table_id = buffered_table(max_rows=1, max_delay_ms=0)
+    url = reverse("add-row", kwargs={"id": table_id})
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # Holds up the flusher, so queued rows pile up
+            cursor.execute(f'LOCK TABLE "app_{table_id}"')
+        statuses = [
+            api_client.post(url, {"field2": number}, format="json").status_code
+            for number in range(6)
+        ]
+    assert statuses[:3] == [202, 202, 202]
+    assert statuses[-1] == 503
+    close_buffer(f"app_{table_id}")
+    assert count_rows(table_id) == statuses.count(202)
+
+
+@pytest.mark.django_db
+def test_buffer_options_are_validated(api_client, create_table):
+    table_id = create_table("BufferOptions", FIELDS)
+    url = reverse("write-buffer", kwargs={"id": table_id})
+    response = api_client.put(url, {"ack": "sometimes"}, format="json")
+    assert response.status_code == 400
+    missing = reverse("write-buffer", kwargs={"id": "missing"})
+    assert api_client.put(missing, {}, format="json").status_code == 404
+    response = api_client.post(
+        f"{reverse('add-row', kwargs={'id': table_id})}?ack=flush",
+        {"field2": 1},
+        format="json",
+    )
+    # ack is ignored for tables without a buffer
+    assert response.status_code == 201
+
+
+@pytest.mark.django_db(transaction=True)
+def test_flush_ack_wait_is_bounded(api_client, buffered_table, settings):
+    settings.WRITE_BUFFER_ACK_TIMEOUT_MS = 100
+    table_id = buffered_table(max_rows=1, max_delay_ms=0, ack="flush")
+    url = reverse("add-row", kwargs={"id": table_id})
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE "app_{table_id}"')
+        response = api_client.post(url, {"field2": 1}, format="json")
+    assert response.status_code == 202
+    close_buffer(f"app_{table_id}")
+    assert count_rows(table_id) == 1
+
+
+@pytest.mark.django_db
+def test_failed_flush_on_close_fails_the_leftover_rows():
+    buffer = WriteBuffer("app_missing", parse_buffer({}), capacity=10)
+    # Rows left behind by a flusher that already stopped
+    buffer.queue.put(_STOP)
+    buffer._thread.join()
+    future = Future()
+    buffer.queue.put(({"field2": 1}, future))
+
+    buffer.close()
+    assert isinstance(future.exception(timeout=0), utils.ProgrammingError)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_options_changed_by_another_process(api_client, buffered_table):
+    table_id = buffered_table(max_rows=1000, max_delay_ms=60000)
+    url = reverse("add-row", kwargs={"id": table_id})
+    assert api_client.post(url, {"field2": 1}, format="json").status_code == 202
+
+    # What the DELETE of another process does to the shared state
+    CatalogTable.objects.filter(db_table=f"app_{table_id}").update(write_buffer=None)
+    bump_options_version(f"app_{table_id}")
+    assert api_client.post(url, {"field2": 2}, format="json").status_code == 201
+    # The rows this process had queued were flushed with its buffer
+    assert count_rows(table_id) == 2
+    assert f"app_{table_id}" not in buffer_stats()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_buffer_turned_off_in_another_process(
+    api_client, buffered_table, shared_rows_cache
+):
+    table_id = buffered_table(max_rows=1000, max_delay_ms=60000)
+    url = reverse("add-row", kwargs={"id": table_id})
+    assert api_client.post(url, {"field2": 1}, format="json").status_code == 202
+
+    run_in_another_process(
+        "from django.test import Client; "
+        f"response = Client(HTTP_HOST='localhost').delete('/api/table/{table_id}/buffer'); "
+        "assert response.status_code == 200, response.content",
+        shared_rows_cache,
+    )
+    assert api_client.post(url, {"field2": 2}, format="json").status_code == 201
+    assert count_rows(table_id) == 2
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+FIELDS = [
+    {"name": "field1", "type": "string"},
+    {"name": "field2", "type": "number"},
+    {"name": "field3", "type": "boolean"},
+]
+
+
+@pytest.mark.django_db
+def test_bulk_add_rows_json(api_client, create_table):
+    table_id = create_table("BulkTable", FIELDS)
+    url = reverse("add-rows", kwargs={"id": table_id})
+    rows = [{"field1": f"row {i}", "field2": i} for i in range(25)]
+    rows.append({"field3": True})
+
+    response = api_client.post(f"{url}?chunk_size=10", rows, format="json")
+    assert response.status_code == 201
+    body = response.json()
+    assert body["received"] == 26
+    assert body["inserted"] == 26
+    assert body["failed"] == 0
+    assert set(body["timings"]) == {"validate_ms", "insert_ms", "total_ms"}
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT field1, field2, field3 FROM app_{table_id} ORDER BY id")
+        stored = cursor.fetchall()
+    assert len(stored) == 26
+    assert stored[0] == ("row 0", 0, None)
+    assert stored[-1] == (None, None, True)
+
+
+@pytest.mark.django_db
+def test_bulk_add_rows_ndjson(api_client, create_table):
+    table_id = create_table("BulkNdjson", FIELDS)
+    url = reverse("add-rows", kwargs={"id": table_id})
+    body = "\n".join(json.dumps({"field2": i}) for i in range(3)) + "\n"
+
+    response = api_client.post(url, body, content_type="application/x-ndjson")
+    assert response.status_code == 201
+    assert response.json()["inserted"] == 3
+
+
+@pytest.mark.django_db
+def test_bulk_add_rows_abort_writes_nothing(api_client, create_table):
+    table_id = create_table("BulkAbort", FIELDS)
+    url = reverse("add-rows", kwargs={"id": table_id})
+    rows = [{"field2": 1}, {"field2": "two"}, {"unknown": 3}]
+
+    response = api_client.post(url, rows, format="json")
+    assert response.status_code == 400
+    errors = response.json()["errors"]
+    assert [error["index"] for error in errors] == [1, 2]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM app_{table_id}")
+        assert cursor.fetchone()[0] == 0
+
+
+@pytest.mark.django_db
+def test_bulk_add_rows_skip_reports_errors(api_client, create_table):
+    table_id = create_table("BulkSkip", FIELDS)
+    url = reverse("add-rows", kwargs={"id": table_id})
+    rows = [{"field2": 1}, {"field2": 2**40}, {"field3": "yes"}, {"field2": 4}]
+
+    response = api_client.post(f"{url}?on_error=skip", rows, format="json")
+    assert response.status_code == 201
+    body = response.json()
+    assert body["inserted"] == 2
+    assert body["failed"] == 2
+    assert [error["index"] for error in body["errors"]] == [1, 2]
+
+
+@pytest.mark.django_db
+def test_bulk_add_rows_missing_table(api_client):
+    url = reverse("add-rows", kwargs={"id": "missingtable"})
+    response = api_client.post(url, [{"field1": "a"}], format="json")
+    assert response.status_code == 404
@@ -0,0 +1,104 @@
+import pytest
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import reverse
+
+FIELDS = [{"name": "field1", "type": "string"}, {"name": "field2", "type": "number"}]
+
+
+@pytest.fixture(autouse=True)
+def clear_rows_cache(settings):
+    caches[settings.ROWS_CACHE_ALIAS].clear()
+
+
+@pytest.mark.django_db
+def test_if_none_match_returns_not_modified(api_client, create_table):
+    table_id = create_table("Cached", FIELDS)
+    api_client.post(
+        reverse("add-row", kwargs={"id": table_id}),
+        {"field1": "a", "field2": 1},
+        format="json",
+    )
+    url = reverse("get-rows", kwargs={"id": table_id})
+
+    response = api_client.get(url, {"limit": 10})
+    etag = response["ETag"]
+    assert response.status_code == 200
+
+    response = api_client.get(url, {"limit": 10}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    assert response.content == b""
+
+    # Other parameters read other rows
+    assert api_client.get(url, {"limit": 5})["ETag"] != etag
+
+
+@pytest.mark.django_db(transaction=True)
+def test_writes_change_the_etag(api_client, create_table):
+    table_id = create_table("Versioned", FIELDS)
+    url = reverse("get-rows", kwargs={"id": table_id})
+    etags = [api_client.get(url)["ETag"]]
+
+    api_client.post(
+        reverse("add-row", kwargs={"id": table_id}),
+        {"field1": "a", "field2": 1},
+        format="json",
+    )
+    etags.append(api_client.get(url)["ETag"])
+    api_client.post(
+        reverse("add-rows", kwargs={"id": table_id}),
+        [{"field1": "b", "field2": 2}],
+        format="json",
+    )
+    etags.append(api_client.get(url)["ETag"])
+    api_client.put(
+        reverse("update-table", kwargs={"id": table_id}),
+        {"fields": [{"name": "field3", "type": "boolean"}]},
+        format="json",
+    )
+    response = api_client.get(url)
+    etags.append(response["ETag"])
+
+    assert len(set(etags)) == 4
+    assert [row["field1"] for row in response.json()] == ["a", "b"]
+    assert response.json()[0]["field3"] is None
+
+
+@pytest.mark.django_db
+def test_repeated_reads_are_served_from_the_cache(
+    api_client, create_table, django_assert_num_queries
+):
+    table_id = create_table("Repeated", FIELDS)
+    api_client.post(
+        reverse("add-row", kwargs={"id": table_id}),
+        {"field1": "a", "field2": 1},
+        format="json",
+    )
+    url = reverse("get-rows", kwargs={"id": table_id})
+    first = api_client.get(url, {"field2": 1})
+
+    with django_assert_num_queries(0):
+        second = api_client.get(url, {"field2": 1})
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second["ETag"] == first["ETag"]
+
+
+@pytest.mark.django_db
+def test_large_responses_are_not_cached(
+    api_client, create_table, django_assert_num_queries
+):
+    table_id = create_table("Large", FIELDS)
+    api_client.post(
+        reverse("add-row", kwargs={"id": table_id}),
+        {"field1": "a" * 100, "field2": 1},
+        format="json",
+    )
+    url = reverse("get-rows", kwargs={"id": table_id})
+
+    with override_settings(ROWS_CACHE_MAX_BYTES=50):
+        api_client.get(url)
+        with django_assert_num_queries(1):
+            response = api_client.get(url)
+    assert response.json()[0]["field1"] == "a" * 100
@@ -0,0 +1,101 @@
+import importlib
+
+import pytest
+from django.apps import apps
+from django.db import connection
+from django.urls import reverse
+
+from app.api.registry import registry
+from app.models import CatalogTable
+
+FIELDS = [{"name": "field1", "type": "string"}, {"name": "field2", "type": "number"}]
+
+
+def catalog_columns(table_id):
+    table = CatalogTable.objects.get(name=table_id)
+    return [(column.name, column.data_type) for column in table.columns.all()]
+
+
+@pytest.mark.django_db
+def test_create_and_update_maintain_the_catalog(api_client, create_table):
+    table_id = create_table("Catalogued", FIELDS)
+    table = CatalogTable.objects.get(name=table_id)
+    assert table.db_table == "app_catalogued"
+    assert table.schema_version == 1
+    assert catalog_columns(table_id) == [
+        ("id", "bigint"),
+        ("field1", "character varying"),
+        ("field2", "integer"),
+    ]
+
+    url = reverse("update-table", kwargs={"id": table_id})
+    response = api_client.put(
+        url, {"fields": [{"name": "field3", "type": "boolean"}]}, format="json"
+    )
+    assert response.status_code == 200
+    table.refresh_from_db()
+    assert table.schema_version == 2
+    assert catalog_columns(table_id)[-1] == ("field3", "boolean")
+    assert [column.position for column in table.columns.all()] == [1, 2, 3, 4]
+
+
+@pytest.mark.django_db
+def test_failed_ddl_leaves_the_catalog_unchanged(api_client, create_table):
+    table_id = create_table("Unchanged", FIELDS)
+    response = api_client.post(
+        reverse("create-table"), {"name": "Unchanged", "fields": FIELDS}, format="json"
+    )
+    assert response.status_code == 409
+    assert CatalogTable.objects.filter(name=table_id).count() == 1
+
+    with connection.cursor() as cursor:
+        # A column the catalog does not know about makes the ALTER fail
+        cursor.execute("ALTER TABLE app_unchanged ADD COLUMN field3 integer")
+    url = reverse("update-table", kwargs={"id": table_id})
+    response = api_client.put(
+        url, {"fields": [{"name": "field3", "type": "boolean"}]}, format="json"
+    )
+    assert response.status_code == 400
+    assert CatalogTable.objects.get(name=table_id).schema_version == 1
+    assert len(catalog_columns(table_id)) == 3
+
+
+@pytest.mark.django_db
+def test_lookups_read_the_catalog(api_client, create_table, django_assert_num_queries):
+    table_id = create_table("LookedUp", FIELDS)
+    registry.clear()
+    url = reverse("get-rows", kwargs={"id": table_id})
+    with django_assert_num_queries(2) as captured:
+        assert api_client.get(url, {"fields": "field1"}).status_code == 200
+    assert "catalog_column" in captured[0]["sql"]
+    assert not any("information_schema" in query["sql"] for query in captured)
+
+
+@pytest.mark.django_db
+def test_list_tables(api_client, create_table, django_assert_num_queries):
+    create_table("Second", FIELDS)
+    create_table("First", FIELDS[:1])
+    with django_assert_num_queries(2):
+        response = api_client.get(reverse("list-tables"))
+    assert response.status_code == 200
+    tables = response.json()["tables"]
+    assert [table["table_id"] for table in tables] == ["first", "second"]
+    assert tables[0]["columns"] == [
+        {"name": "id", "type": "number"},
+        {"name": "field1", "type": "string"},
+    ]
+    assert tables[0]["schema_version"] == 1
+    assert tables[0]["created_at"]
+
+
+@pytest.mark.django_db
+def test_backfill_records_existing_tables():
+    migration = importlib.import_module("app.migrations.0002_backfill_catalog")
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE TABLE app_legacy (id bigserial, title varchar(255))")
+    with connection.schema_editor() as schema_editor:
+        migration.backfill_catalog(apps, schema_editor)
+    assert catalog_columns("legacy") == [
+        ("id", "bigint"),
+        ("title", "character varying"),
+    ]
@@ -0,0 +1,210 @@
+import threading
+import time
+import uuid
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+from app.api.cache import bump_options_version
+from app.api.changes import (
+    change_column_sql,
+    change_trigger_sql,
+    enable_change_feed,
+    encode_after,
+    listener,
+    parse_after,
+)
+from app.api.pagination import InvalidCursor, encode_cursor
+from app.api.registry import registry
+
+FIELDS = [
+    {"name": "title", "type": "string"},
+    {"name": "votes", "type": "number"},
+]
+
+
+@pytest.fixture(autouse=True)
+def stop_listener():
+    """Close the listener's connection, so the test database can be dropped."""
+    yield
+    listener.stop()
+
+
+@pytest.fixture
+def feed_table(api_client):
+    def _create(**options):
+        response = api_client.post(
+            reverse("create-table"),
+            {
+                "name": f"Feed{uuid.uuid4().hex[:8]}",
+                "fields": FIELDS,
+                "change_feed": True,
+                **options,
+            },
+            format="json",
+        )
+        assert response.status_code == 201, response.json()
+        return response.json()["table_id"]
+
+    return _create
+
+
+def add_rows(api_client, table_id, rows):
+    response = api_client.post(
+        reverse("add-rows", kwargs={"id": table_id}), rows, format="json"
+    )
+    assert response.status_code == 201
+
+
+def changes(api_client, table_id, **params):
+    return api_client.get(reverse("changes", kwargs={"id": table_id}), params)
+
+
+def test_parse_after():
+    assert parse_after(encode_after("42", 7)) == ("42", 7)
+    assert parse_after(encode_after("42")) == ("42", None)
+    for position in ({"x": 42}, {"x": "-1"}, {"x": "42", "i": "7"}, {"i": 7}):
+        with pytest.raises(InvalidCursor):
+            parse_after(encode_cursor(position))
+    with pytest.raises(InvalidCursor):
+        parse_after("not a cursor")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_feed_returns_rows_after_the_cursor(api_client, feed_table):
+    table_id = feed_table()
+    add_rows(api_client, table_id, [{"title": "a", "votes": 1}])
+    add_rows(api_client, table_id, [{"title": "b", "votes": 2}])
+    add_rows(api_client, table_id, [{"title": "c", "votes": 3}])
+
+    page = changes(api_client, table_id, limit=2).json()
+    # The change column is internal
+    assert [set(row) for row in page["changes"]] == [{"id", "title", "votes"}] * 2
+    assert [row["title"] for row in page["changes"]] == ["a", "b"]
+    assert page["more"] is True
+    page = changes(api_client, table_id, limit=2, after=page["cursor"]).json()
+    assert [row["title"] for row in page["changes"]] == ["c"]
+    assert page["more"] is False
+
+    empty = changes(api_client, table_id, after=page["cursor"]).json()
+    assert empty["changes"] == [] and empty["more"] is False
+
+    # An update moves the row to the end of the feed
+    with connection.cursor() as cursor:
+        cursor.execute(f"UPDATE app_{table_id} SET votes = 10 WHERE title = 'a'")
+    add_rows(api_client, table_id, [{"title": "d", "votes": 4}])
+    page = changes(api_client, table_id, after=empty["cursor"]).json()
+    assert [(row["title"], row["votes"]) for row in page["changes"]] == [
+        ("a", 10),
+        ("d", 4),
+    ]
+
+    # Starting from now skips the rows already written
+    now = changes(api_client, table_id, after="now").json()
+    assert now["changes"] == []
+    add_rows(api_client, table_id, [{"title": "e", "votes": 5}])
+    page = changes(api_client, table_id, after=now["cursor"]).json()
+    assert [row["title"] for row in page["changes"]] == ["e"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_long_poll_wakes_on_new_rows(api_client, feed_table):
+    table_id = feed_table()
+    cursor = changes(api_client, table_id, after="now").json()["cursor"]
+
+    def insert():
+        try:
+            add_rows(api_client, table_id, [{"title": "late", "votes": 1}])
+        finally:
+            connection.close()
+
+    timer = threading.Timer(0.5, insert)
+    timer.start()
+    started = time.monotonic()
+    response = changes(api_client, table_id, after=cursor, wait=10)
+    timer.join()
+    assert response.status_code == 200
+    assert [row["title"] for row in response.json()["changes"]] == ["late"]
+    assert time.monotonic() - started < 5
+
+    # Nothing arrives: the wait runs out with an empty page
+    started = time.monotonic()
+    page = changes(api_client, table_id, after=response.json()["cursor"], wait=0.3)
+    assert page.json()["changes"] == []
+    assert time.monotonic() - started >= 0.3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_enable_feed_on_existing_table(api_client, create_table):
+    table_id = create_table(f"NoFeed{uuid.uuid4().hex[:8]}", FIELDS)
+    add_rows(api_client, table_id, [{"title": "old", "votes": 1}])
+    response = changes(api_client, table_id)
+    assert response.status_code == 400
+    assert "no change feed" in response.json()["error"]
+
+    url = reverse("changes", kwargs={"id": table_id})
+    response = api_client.put(url)
+    assert response.status_code == 200
+    assert response.json()["change_feed"] is True
+    assert api_client.put(url).json() == {"change_feed": True, "lock_held_ms": 0.0}
+
+    add_rows(api_client, table_id, [{"title": "new", "votes": 2}])
+    page = changes(api_client, table_id).json()
+    assert [row["title"] for row in page["changes"]] == ["old", "new"]
+    tables = api_client.get(reverse("list-tables")).json()["tables"]
+    assert [t["change_feed"] for t in tables if t["table_id"] == table_id] == [True]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_enabling_the_feed_again_after_a_failure(api_client, create_table):
+    table_id = create_table(f"HalfFeed{uuid.uuid4().hex[:8]}", FIELDS)
+    add_rows(api_client, table_id, [{"title": "old", "votes": 1}])
+    # As left by an index build that failed: column and triggers, no index
+    with connection.cursor() as cursor:
+        cursor.execute(change_column_sql(f"app_{table_id}"))
+        for statement in change_trigger_sql(f"app_{table_id}"):
+            cursor.execute(statement)
+
+    response = api_client.put(reverse("changes", kwargs={"id": table_id}))
+    assert response.status_code == 200
+    page = changes(api_client, table_id).json()
+    assert [row["title"] for row in page["changes"]] == ["old"]
+    indexes = api_client.get(reverse("indexes", kwargs={"id": table_id})).json()
+    assert ["_xid", "id"] in [index["fields"] for index in indexes["indexes"]]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_feed_of_partitioned_table(api_client, feed_table):
+    table_id = feed_table(partition={"type": "hash", "partitions": 2})
+    add_rows(api_client, table_id, [{"title": str(n), "votes": n} for n in range(6)])
+    page = changes(api_client, table_id, limit=4).json()
+    rest = changes(api_client, table_id, after=page["cursor"]).json()
+    votes = [row["votes"] for row in page["changes"] + rest["changes"]]
+    assert sorted(votes) == list(range(6))
+
+
+@pytest.mark.django_db
+def test_invalid_feed_requests(api_client, feed_table):
+    table_id = feed_table()
+    for params in ({"after": "bogus"}, {"wait": "soon"}, {"wait": 600}, {"limit": 0}):
+        assert changes(api_client, table_id, **params).status_code == 400
+    assert changes(api_client, "missing").status_code == 404
+
+    response = api_client.post(
+        reverse("create-table"),
+        {"name": "BadFeed", "fields": FIELDS, "change_feed": "yes"},
+        format="json",
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_feed_enabled_by_another_process(api_client, create_table):
+    table_id = create_table(f"FeedElsewhere{uuid.uuid4().hex[:8]}", FIELDS)
+    assert changes(api_client, table_id).status_code == 400
+
+    # What the PUT of another process does, leaving this registry untouched
+    enable_change_feed(registry.get(f"app_{table_id}"), 1000)
+    bump_options_version(f"app_{table_id}")
+    assert changes(api_client, table_id).status_code == 200
@@ -0,0 +1,158 @@
+import pytest
+from django.http import QueryDict
+from django.urls import reverse
+
+from app.api.formats import (
+    UnknownFormat,
+    decode_columnar,
+    encode_columnar,
+    negotiate_format,
+)
+
+TYPES = {
+    "id": "bigint",
+    "field1": "character varying",
+    "field2": "integer",
+    "field3": "boolean",
+}
+
+
+@pytest.mark.parametrize(
+    "query,accept,expected",
+    [
+        ("", None, "objects"),
+        ("", "text/html, */*;q=0.8", "objects"),
+        ("", "application/vnd.tablebuilder.columnar", "binary"),
+        (
+            "",
+            "application/json;q=0.5, application/vnd.tablebuilder.arrays+json",
+            "arrays",
+        ),
+        ("", "*/*, application/vnd.tablebuilder.columns+json", "columns"),
+        ("", "application/vnd.tablebuilder.columnar;q=0", "objects"),
+        ("format=arrays", "application/vnd.tablebuilder.columnar", "arrays"),
+    ],
+)
+def test_negotiate_format(query, accept, expected):
+    assert negotiate_format(QueryDict(query), accept) == expected
+
+
+def test_negotiate_unknown_format():
+    with pytest.raises(UnknownFormat):
+        negotiate_format(QueryDict("format=xml"), None)
+
+
+def test_columnar_round_trip():
+    columns = ["id", "field1", "field2", "field3"]
+    rows = [
+        (1, "zürich", 5, True),
+        (2, None, None, None),
+        (3, "", -(2**31), False),
+    ]
+    content = encode_columnar(columns, rows, TYPES, {"next": None})
+    header, data = decode_columnar(content)
+    assert header["rows"] == 3 and header["next"] is None
+    assert [column["type"] for column in header["columns"]] == [
+        "int64",
+        "string",
+        "int32",
+        "bool",
+    ]
+    assert data == {
+        column: [row[index] for row in rows] for index, column in enumerate(columns)
+    }
+
+    header, data = decode_columnar(encode_columnar(columns, [], TYPES))
+    assert header["rows"] == 0 and data == {column: [] for column in columns}
+
+
+@pytest.fixture
+def format_table(api_client, create_table):
+    table_id = create_table(
+        "FormatTable",
+        [
+            {"name": "field1", "type": "string"},
+            {"name": "field2", "type": "number"},
+        ],
+    )
+    rows = [
+        {"field1": "a", "field2": 1},
+        {"field1": None, "field2": 2},
+        {"field1": "c", "field2": None},
+    ]
+    url = reverse("add-rows", kwargs={"id": table_id})
+    assert api_client.post(url, rows, format="json").status_code == 201
+    return table_id
+
+
+@pytest.mark.django_db
+def test_get_rows_formats(api_client, format_table):
+    url = reverse("get-rows", kwargs={"id": format_table})
+    params = {"fields": "field1,field2", "order_by": "id"}
+    objects = api_client.get(url, params).json()
+    assert objects[1] == {"field1": None, "field2": 2}
+
+    response = api_client.get(url, {**params, "format": "columns"})
+    assert response["Content-Type"] == "application/vnd.tablebuilder.columns+json"
+    assert response.json() == {
+        "columns": ["field1", "field2"],
+        "data": {"field1": ["a", None, "c"], "field2": [1, 2, None]},
+    }
+
+    response = api_client.get(
+        url, params, HTTP_ACCEPT="application/vnd.tablebuilder.arrays+json"
+    )
+    assert response.json() == {
+        "columns": ["field1", "field2"],
+        "rows": [["a", 1], [None, 2], ["c", None]],
+    }
+    assert "Accept" in response["Vary"]
+
+    response = api_client.get(url, {**params, "format": "binary"})
+    header, data = decode_columnar(response.content)
+    assert header["rows"] == 3
+    assert data == {"field1": ["a", None, "c"], "field2": [1, 2, None]}
+
+    assert api_client.get(url, {"format": "xml"}).status_code == 400
+    response = api_client.get(url, {"format": "arrays", "stream": "ndjson"})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("row_format", ["columns", "arrays", "binary"])
+def test_get_rows_formats_pages(api_client, format_table, row_format):
+    url = reverse("get-rows", kwargs={"id": format_table})
+    params = {"fields": "field1", "order_by": "-field2", "format": row_format}
+    seen = []
+    response = api_client.get(url, {**params, "limit": 2})
+    while True:
+        if row_format == "binary":
+            page, data = decode_columnar(response.content)
+            assert list(data) == ["field1"]
+            seen.extend(data["field1"])
+        else:
+            page = response.json()
+            assert page["columns"] == ["field1"]
+            if row_format == "columns":
+                seen.extend(page["data"]["field1"])
+            else:
+                seen.extend(row[0] for row in page["rows"])
+        if page["next"] is None:
+            break
+        response = api_client.get(url, {**params, "limit": 2, "after": page["next"]})
+    expected = api_client.get(url, {"fields": "field1", "order_by": "-field2"})
+    assert seen == [row["field1"] for row in expected.json()]
+
+
+@pytest.mark.django_db
+def test_etag_depends_on_the_accepted_format(api_client, format_table):
+    url = reverse("get-rows", kwargs={"id": format_table})
+    etag = api_client.get(url)["ETag"]
+    response = api_client.get(
+        url,
+        HTTP_ACCEPT="application/vnd.tablebuilder.columnar",
+        HTTP_IF_NONE_MATCH=etag,
+    )
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert response["Content-Type"] == "application/vnd.tablebuilder.columnar"
@@ -0,0 +1,151 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.urls import reverse
+
+from app.api.importer import coerce_text, copy_field, infer_field_type
+
+FIELDS = [
+    {"name": "field1", "type": "string"},
+    {"name": "field2", "type": "number"},
+    {"name": "field3", "type": "boolean"},
+]
+
+
+def fetch_rows(table_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT field1, field2, field3 FROM app_{table_id} ORDER BY id")
+        return cursor.fetchall()
+
+
+def test_coerce_text():
+    assert coerce_text("integer", " 42 ") == 42
+    assert coerce_text("integer", "") is None
+    assert coerce_text("boolean", "Yes") is True
+    assert coerce_text("character varying", "") is None
+    with pytest.raises(ValueError):
+        coerce_text("integer", "4.5")
+    with pytest.raises(ValueError):
+        coerce_text("integer", str(2**40))
+
+
+def test_infer_field_type():
+    assert infer_field_type(["1", "", "-3"]) == "number"
+    assert infer_field_type(["true", "no"]) == "boolean"
+    assert infer_field_type(["1", "x"]) == "string"
+    assert infer_field_type([True, None]) == "boolean"
+    assert infer_field_type([]) == "string"
+
+
+def test_copy_field_quotes_strings():
+    assert copy_field(None) == ""
+    assert copy_field("") == '""'
+    assert copy_field('say "hi"') == '"say ""hi"""'
+    assert copy_field(False) == "f"
+
+
+@pytest.mark.django_db
+def test_import_csv_upload(api_client, create_table):
+    table_id = create_table("ImportCsv", FIELDS)
+    content = b'field2,field1,extra,field3\n1,"a, b",x,true\n2,,y,\n'
+    upload = SimpleUploadedFile("rows.csv", content, content_type="text/csv")
+
+    url = reverse("import-rows", kwargs={"id": table_id})
+    response = api_client.post(url, {"file": upload}, format="multipart")
+    assert response.status_code == 201
+    report = response.json()
+    assert report["inserted"] == 2
+    assert report["ignored_columns"] == ["extra"]
+    assert fetch_rows(table_id) == [("a, b", 1, True), (None, 2, None)]
+
+
+@pytest.mark.django_db
+def test_import_ndjson_body(api_client, create_table):
+    table_id = create_table("ImportNdjson", FIELDS)
+    body = '{"field1": "a", "field3": false}\n\n{"field2": 7}\n'
+
+    url = reverse("import-rows", kwargs={"id": table_id})
+    response = api_client.post(url, body, content_type="application/x-ndjson")
+    assert response.status_code == 201
+    assert fetch_rows(table_id) == [("a", None, False), (None, 7, None)]
+
+
+@pytest.mark.django_db
+def test_import_invalid_row_aborts(api_client, create_table):
+    table_id = create_table("ImportAbort", FIELDS)
+    url = reverse("import-rows", kwargs={"id": table_id})
+    body = "field2\n1\nnot a number\n"
+
+    response = api_client.post(url, body, content_type="text/csv")
+    assert response.status_code == 400
+    assert response.json()["errors"][0]["row"] == 2
+    assert fetch_rows(table_id) == []
+
+    response = api_client.post(f"{url}?on_error=skip", body, content_type="text/csv")
+    assert response.status_code == 201
+    assert response.json()["failed"] == 1
+    assert fetch_rows(table_id) == [(None, 1, None)]
+
+
+@pytest.mark.django_db
+def test_import_creates_table(api_client):
+    url = reverse("import-rows", kwargs={"id": "ImportCreated"})
+    body = "field1,field2,field3\nx,1,yes\ny,2,no\n"
+
+    response = api_client.post(url, body, content_type="text/csv")
+    assert response.status_code == 404
+
+    response = api_client.post(f"{url}?create=true", body, content_type="text/csv")
+    assert response.status_code == 201
+    assert response.json()["created"] is True
+    assert fetch_rows("importcreated") == [("x", 1, True), ("y", 2, False)]
+
+
+@pytest.mark.django_db
+def test_import_rows_command(tmp_path, create_table):
+    table_id = create_table("ImportCommand", FIELDS)
+    path = tmp_path / "rows.csv"
+    path.write_text("field1,field2\na,1\nb,2\nc,3\n")
+
+    call_command("import_rows", table_id, str(path), "--chunk-size", "2")
+    assert [row[1] for row in fetch_rows(table_id)] == [1, 2, 3]
+
+    with pytest.raises(CommandError):
+        call_command("import_rows", "missingtable", str(path))
+
+
+@pytest.mark.django_db
+def test_import_duplicates_into_unique_index(api_client, create_table):
+    table_id = create_table("ImportUnique", FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE UNIQUE INDEX ON app_{table_id} (field2)")
+    url = reverse("import-rows", kwargs={"id": table_id})
+    body = "field1,field2\na,1\nb,2\nc,1\n"
+
+    response = api_client.post(url, body, content_type="text/csv")
+    assert response.status_code == 400
+    assert fetch_rows(table_id) == []
+
+    response = api_client.post(f"{url}?on_error=skip", body, content_type="text/csv")
+    assert response.status_code == 201
+    assert response.json()["failed"] == 1
+    assert response.json()["errors"][0]["row"] == 3
+    assert fetch_rows(table_id) == [("a", 1, None), ("b", 2, None)]
+
+    url = reverse("import-rows", kwargs={"id": "ImportDuplicateHeader"})
+    response = api_client.post(
+        f"{url}?create=true", "a,a\n1,2\n", content_type="text/csv"
+    )
+    assert response.status_code == 400
+    assert "Duplicate column 'a'" in response.json()["error"]
+
+
+@pytest.mark.django_db
+def test_import_rejects_reserved_field_names(api_client):
+    url = reverse("import-rows", kwargs={"id": "ImportReserved"})
+    response = api_client.post(
+        f"{url}?create=true", "_x,field1\n1,a\n", content_type="text/csv"
+    )
+    assert response.status_code == 400
+    assert "reserved" in response.json()["error"]
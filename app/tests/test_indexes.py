@@ -0,0 +1,93 @@
+import pytest
+from django.urls import reverse
+
+from app.api.indexes import MAX_NAME_LENGTH, index_name
+
+FIELDS = [
+    {"name": "field1", "type": "string"},
+    {"name": "field2", "type": "number"},
+]
+
+
+def test_index_name_fits_identifier_limit():
+    assert index_name("app_t", ["field1", "field2"]) == "app_t_field1_field2_idx"
+    long_name = index_name("app_t", ["f" * 40, "g" * 40], unique=True)
+    assert len(long_name) == MAX_NAME_LENGTH
+    assert long_name != index_name("app_t", ["f" * 40, "g" * 41], unique=True)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_create_list_and_drop_index(api_client, create_table):
+    table_id = create_table("IndexedTable", FIELDS)
+    url = reverse("indexes", kwargs={"id": table_id})
+
+    response = api_client.post(url, {"fields": ["field1", "field2"]}, format="json")
+    assert response.status_code == 201
+    index = response.json()["index"]
+    assert index["name"] == f"app_{table_id}_field1_field2_idx"
+    assert index["fields"] == ["field1", "field2"]
+    assert index["valid"] is True
+    assert index["size_bytes"] > 0
+
+    indexes = api_client.get(url).json()["indexes"]
+    assert [index["primary"] for index in indexes].count(True) == 1
+    assert index["name"] in [index["name"] for index in indexes]
+
+    response = api_client.post(url, {"fields": ["field1", "field2"]}, format="json")
+    assert response.status_code == 409
+
+    detail_url = reverse("index-detail", kwargs={"id": table_id, "name": index["name"]})
+    assert api_client.delete(detail_url).status_code == 200
+    assert api_client.delete(detail_url).status_code == 404
+    assert len(api_client.get(url).json()["indexes"]) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unique_index_on_duplicates_is_cleaned_up(api_client, create_table):
+    table_id = create_table("IndexedDuplicates", FIELDS)
+    rows_url = reverse("add-rows", kwargs={"id": table_id})
+    api_client.post(rows_url, [{"field2": 1}, {"field2": 1}], format="json")
+
+    url = reverse("indexes", kwargs={"id": table_id})
+    response = api_client.post(
+        url, {"fields": ["field2"], "unique": True}, format="json"
+    )
+    assert response.status_code == 409
+    assert len(api_client.get(url).json()["indexes"]) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_index_rejects_invalid_input(api_client, create_table):
+    table_id = create_table("IndexedInvalid", FIELDS)
+    url = reverse("indexes", kwargs={"id": table_id})
+    assert api_client.post(url, {"fields": ["nope"]}, format="json").status_code == 400
+    assert api_client.post(url, {"fields": []}, format="json").status_code == 400
+
+    primary = api_client.get(url).json()["indexes"][0]["name"]
+    detail_url = reverse("index-detail", kwargs={"id": table_id, "name": primary})
+    assert api_client.delete(detail_url).status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_internal_indexes_cannot_be_dropped(api_client):
+    response = api_client.post(
+        reverse("create-table"),
+        {
+            "name": "IndexedInternal",
+            "fields": FIELDS,
+            "partition": {"type": "hash", "column": "field2", "partitions": 2},
+            "change_feed": True,
+        },
+        format="json",
+    )
+    table_id = response.json()["table_id"]
+    url = reverse("indexes", kwargs={"id": table_id})
+    names = [index["name"] for index in api_client.get(url).json()["indexes"]]
+    assert f"app_{table_id}_id" in names
+    for name in names:
+        detail_url = reverse("index-detail", kwargs={"id": table_id, "name": name})
+        assert api_client.delete(detail_url).status_code == 400
+    assert len(api_client.get(url).json()["indexes"]) == len(names)
+
+    response = api_client.post(url, {"fields": ["field1"], "name": 5}, format="json")
+    assert response.status_code == 400
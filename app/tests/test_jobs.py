@@ -0,0 +1,218 @@
+import os
+import threading
+import time
+import uuid
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.urls import reverse
+
+from app.api.jobs import (
+    JOB_KINDS,
+    JobExecutor,
+    cancel_job,
+    executor,
+    job_kind,
+    run_job,
+)
+from app.models import Job
+
+FIELDS = [{"name": "field1", "type": "string"}, {"name": "field2", "type": "number"}]
+
+jobs_db = pytest.mark.django_db(transaction=True, databases=["default", "jobs"])
+
+
+@pytest.fixture
+def test_kinds():
+    """Job kinds that block until released, or sleep in the database."""
+    release = threading.Event()
+    started = []
+
+    @job_kind("test_block")
+    def block(context, number):
+        started.append(number)
+        assert release.wait(10)
+        return {"number": number}
+
+    @job_kind("test_sleep")
+    def sleep(context):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_sleep(30)")
+
+    yield release, started
+    release.set()
+    JOB_KINDS.pop("test_block")
+    JOB_KINDS.pop("test_sleep")
+
+
+def wait_for_status(job_id, status, timeout=10):
+    deadline = time.monotonic() + timeout
+    while Job.objects.get(id=job_id).status != status:
+        assert time.monotonic() < deadline, f"job did not become {status}"
+        time.sleep(0.02)
+
+
+@jobs_db
+def test_create_table_in_background(api_client):
+    name = f"JobTable{uuid.uuid4().hex[:8]}"
+    response = api_client.post(
+        f"{reverse('create-table')}?background=true",
+        {"name": name, "fields": FIELDS},
+        format="json",
+    )
+    assert response.status_code == 202
+    body = response.json()
+    assert body["url"] == reverse("job-detail", kwargs={"id": body["job_id"]})
+
+    job = executor.wait(uuid.UUID(body["job_id"]), timeout=10)
+    assert job.status == Job.SUCCEEDED
+    detail = api_client.get(body["url"]).json()
+    assert detail["kind"] == "create_table"
+    assert detail["result"] == {"table_id": name.lower()}
+    assert detail["started_at"] and detail["finished_at"]
+
+    # The same table again fails in the job, not in the request
+    response = api_client.post(
+        f"{reverse('create-table')}?background=true",
+        {"name": name, "fields": FIELDS},
+        format="json",
+    )
+    job = executor.wait(uuid.UUID(response.json()["job_id"]), timeout=10)
+    assert job.status == Job.FAILED
+    assert "already exists" in job.error
+
+
+@jobs_db
+def test_background_requests_are_validated_first(api_client, create_table):
+    table_id = create_table(f"JobChecks{uuid.uuid4().hex[:8]}", FIELDS)
+    response = api_client.put(
+        f"{reverse('update-table', kwargs={'id': table_id})}?background=true",
+        {"fields": [{"name": "field1", "type": "string"}]},
+        format="json",
+    )
+    assert response.status_code == 400
+    response = api_client.post(
+        f"{reverse('indexes', kwargs={'id': table_id})}?background=1",
+        {"fields": ["missing"]},
+        format="json",
+    )
+    assert response.status_code == 400
+    assert not Job.objects.exists()
+
+
+@jobs_db
+def test_import_and_index_in_background(api_client, create_table, settings):
+    settings.JOBS_PROGRESS_INTERVAL = 0
+    table_id = create_table(f"JobImport{uuid.uuid4().hex[:8]}", FIELDS)
+    content = b"field1,field2\n" + b"".join(
+        f"row{number},{number}\n".encode() for number in range(50)
+    )
+    upload = SimpleUploadedFile("rows.csv", content, content_type="text/csv")
+    response = api_client.post(
+        f"{reverse('import-rows', kwargs={'id': table_id})}?background=true"
+        "&chunk_size=20",
+        {"file": upload},
+        format="multipart",
+    )
+    assert response.status_code == 202
+    job = executor.wait(uuid.UUID(response.json()["job_id"]), timeout=10)
+    assert job.status == Job.SUCCEEDED
+    assert job.result["inserted"] == 50
+    assert job.progress == {"done": 50, "total": None}
+    # The upload is removed once imported
+    assert not os.path.exists(job.params["path"])
+
+    response = api_client.post(
+        f"{reverse('indexes', kwargs={'id': table_id})}?background=true",
+        {"fields": ["field2"]},
+        format="json",
+    )
+    assert response.status_code == 202
+    job = executor.wait(uuid.UUID(response.json()["job_id"]), timeout=10)
+    assert job.status == Job.SUCCEEDED
+    assert job.result["index"]["fields"] == ["field2"]
+
+
+@jobs_db
+def test_kind_limit_and_cancelling_waiting_job(test_kinds):
+    release, started = test_kinds
+    jobs = JobExecutor(max_workers=4, kind_limits={"test_block": 1})
+    try:
+        first = jobs.submit("test_block", {"number": 1})
+        second = jobs.submit("test_block", {"number": 2})
+        third = jobs.submit("test_block", {"number": 3})
+        wait_for_status(first.id, Job.RUNNING)
+        while not started:
+            time.sleep(0.01)
+        assert started == [1]
+        assert jobs.stats() == {"running": 1, "waiting": 2}
+        assert Job.objects.get(id=second.id).status == Job.QUEUED
+
+        assert cancel_job(second.id).status == Job.CANCELLED
+        release.set()
+        assert jobs.wait(third.id, timeout=10).result == {"number": 3}
+        assert jobs.wait(first.id, timeout=10).status == Job.SUCCEEDED
+        # The cancelled job was skipped
+        assert started == [1, 3]
+        assert Job.objects.get(id=second.id).started_at is None
+    finally:
+        jobs.shutdown()
+
+
+@jobs_db
+def test_uploads_of_cancelled_imports_are_removed(tmp_path):
+    # Import jobs never start in this executor
+    jobs = JobExecutor(max_workers=1, kind_limits={"import_rows": 0})
+    paths = [tmp_path / "cancelled.csv", tmp_path / "skipped.csv"]
+    for path in paths:
+        path.write_bytes(b"field1\nrow\n")
+    try:
+        cancelled = jobs.submit("import_rows", {"table_id": "x", "path": str(paths[0])})
+        assert cancel_job(cancelled.id).status == Job.CANCELLED
+        assert not paths[0].exists()
+
+        # Cancelled by a process that cannot reach the file, then skipped
+        skipped = jobs.submit("import_rows", {"table_id": "x", "path": str(paths[1])})
+        Job.objects.filter(id=skipped.id).update(status=Job.CANCELLED)
+        run_job(skipped.id)
+        assert not paths[1].exists()
+        assert Job.objects.get(id=skipped.id).started_at is None
+    finally:
+        jobs.shutdown()
+
+
+@jobs_db
+def test_cancel_running_job(api_client, test_kinds):
+    job = executor.submit("test_sleep", {})
+    wait_for_status(job.id, Job.RUNNING)
+    url = reverse("job-detail", kwargs={"id": job.id})
+    response = api_client.delete(url)
+    assert response.status_code == 200
+    assert response.json()["cancel_requested"] is True
+
+    started = time.monotonic()
+    job = executor.wait(job.id, timeout=10)
+    # pg_sleep was cancelled rather than waited for
+    assert time.monotonic() - started < 10
+    assert job.status == Job.CANCELLED
+    assert api_client.delete(url).status_code == 200
+
+    jobs = api_client.get(reverse("jobs"), {"kind": "test_sleep"}).json()["jobs"]
+    assert [job["status"] for job in jobs] == [Job.CANCELLED]
+
+
+@pytest.mark.django_db
+def test_job_list_limit(api_client, settings):
+    settings.JOBS_LIST_LIMIT = 2
+    for number in range(3):
+        Job.objects.create(kind="test_listed", params={"number": number})
+    jobs = api_client.get(reverse("jobs"), {"kind": "test_listed"}).json()["jobs"]
+    assert len(jobs) == 2
+
+
+@jobs_db
+def test_unknown_job(api_client):
+    url = reverse("job-detail", kwargs={"id": uuid.uuid4()})
+    assert api_client.get(url).status_code == 404
+    assert api_client.delete(url).status_code == 404
@@ -0,0 +1,124 @@
+import logging
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from app.api.async_db import close_pool
+from app.api.metrics import Counter, Histogram, MetricsRegistry
+
+
+def sample(text, name):
+    """Value of the sample line starting with ``name`` (including labels)."""
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    latency = registry.register(
+        Histogram("latency_seconds", "Latency.", ("endpoint",), buckets=(0.1, 1))
+    )
+    requests = registry.register(Counter("requests_total", "Requests.", ("path",)))
+    latency.observe(0.05, endpoint="rows")
+    latency.observe(0.5, endpoint="rows")
+    requests.inc(path='a"b')
+
+    text = registry.render()
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{endpoint="rows",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{endpoint="rows",le="1"} 2' in text
+    assert 'latency_seconds_bucket{endpoint="rows",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{endpoint="rows"} 2' in text
+    assert 'latency_seconds_sum{endpoint="rows"} 0.55' in text
+    assert 'requests_total{path="a\\"b"} 1' in text
+
+
+@pytest.mark.django_db
+def test_api_requests_are_measured(api_client, create_table):
+    table_id = create_table("Measured", [{"name": "field1", "type": "string"}])
+    before = api_client.get(reverse("metrics")).content.decode()
+
+    add_url = reverse("add-row", kwargs={"id": table_id})
+    for value in ("a", "b", "c"):
+        api_client.post(add_url, {"field1": value}, format="json")
+    rows_url = reverse("get-rows", kwargs={"id": table_id})
+    api_client.get(rows_url, {"limit": 2})
+    b"".join(api_client.get(rows_url, {"stream": "ndjson"}).streaming_content)
+
+    response = api_client.get(reverse("metrics"))
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
+    after = response.content.decode()
+
+    def delta(name):
+        return sample(after, name) - sample(before, name)
+
+    assert (
+        delta(
+            'tablebuilder_request_duration_seconds_count{endpoint="add-row",'
+            'method="POST",status="201"}'
+        )
+        == 3
+    )
+    assert delta('tablebuilder_db_queries_total{endpoint="add-row"}') >= 3
+    assert delta('tablebuilder_db_query_seconds_total{endpoint="add-row"}') > 0
+    # Two rows of the page and three streamed ones
+    assert delta('tablebuilder_rows_returned_total{endpoint="get-rows"}') == 5
+    assert delta('tablebuilder_response_bytes_sum{endpoint="get-rows"}') > 0
+    assert 'tablebuilder_db_pool{pool="default/' in after
+    # Counts that only increase are counters
+    assert "# TYPE tablebuilder_model_registry_lookups_total counter" in after
+    assert 'tablebuilder_model_registry_lookups_total{result="hit"}' in after
+    assert "# TYPE tablebuilder_db_pool_events_total counter" in after
+    assert 'tablebuilder_db_pool_events_total{pool="default/' in after
+    assert 'stat="checkouts"' not in after
+
+
+@pytest.mark.django_db
+@override_settings(SLOW_REQUEST_MS=0.001)
+def test_slow_requests_are_logged_with_their_sql(api_client, create_table, caplog):
+    table_id = create_table("SlowLogged", [{"name": "field1", "type": "string"}])
+    with caplog.at_level(logging.WARNING, logger="app.api.middleware"):
+        api_client.get(reverse("get-rows", kwargs={"id": table_id}))
+    message = caplog.records[-1].getMessage()
+    assert message.startswith(f"Slow request GET /api/table/{table_id}/rows")
+    assert f'SELECT "id", "field1" FROM "app_{table_id}"' in message
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_requests_are_measured(api_client, create_table, caplog):
+    table_id = create_table("AsyncMeasured", [{"name": "field1", "type": "string"}])
+    before = api_client.get(reverse("metrics")).content.decode()
+
+    @async_to_sync
+    async def run():
+        client = AsyncClient()
+        try:
+            response = await client.post(
+                reverse("async-add-row", kwargs={"id": table_id}),
+                {"field1": "a"},
+                content_type="application/json",
+            )
+            assert response.status_code == 201
+            response = await client.get(reverse("get-rows", kwargs={"id": table_id}))
+            assert response.status_code == 200
+        finally:
+            await close_pool()
+
+    with caplog.at_level(logging.DEBUG, logger="django.request"):
+        run()
+    # The async views stay on the event loop
+    assert not any("adapted" in record.getMessage() for record in caplog.records)
+    after = api_client.get(reverse("metrics")).content.decode()
+
+    def delta(name):
+        return sample(after, name) - sample(before, name)
+
+    # asyncpg queries, and those of sync views run from the event loop
+    assert delta('tablebuilder_db_queries_total{endpoint="async-add-row"}') >= 1
+    assert delta('tablebuilder_db_query_seconds_total{endpoint="async-add-row"}') > 0
+    assert delta('tablebuilder_db_queries_total{endpoint="get-rows"}') >= 1
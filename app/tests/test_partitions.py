@@ -0,0 +1,271 @@
+import uuid
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app.api.async_db import close_pool
+from app.api.schema import InvalidPartitioning, parse_partitioning
+from app.models import CatalogTable
+
+FIELDS = [{"name": "field1", "type": "string"}, {"name": "field2", "type": "number"}]
+
+
+@pytest.fixture
+def create_partitioned(api_client):
+    def _create(name, partition, fields=FIELDS):
+        response = api_client.post(
+            reverse("create-table"),
+            {"name": name, "fields": fields, "partition": partition},
+            format="json",
+        )
+        assert response.status_code == 201, response.json()
+        return response.json()["table_id"]
+
+    return _create
+
+
+def partition_names(api_client, table_id):
+    response = api_client.get(reverse("partitions", kwargs={"id": table_id}))
+    assert response.status_code == 200
+    return [partition["name"] for partition in response.json()["partitions"]]
+
+
+def test_parse_partitioning():
+    assert parse_partitioning(None, FIELDS) is None
+    assert parse_partitioning({"type": "hash"}, FIELDS) == {
+        "type": "hash",
+        "column": "id",
+        "partitions": 8,
+    }
+    assert parse_partitioning(
+        {"type": "range", "column": "field2", "interval": 100}, FIELDS
+    ) == {"type": "range", "column": "field2", "interval": 100}
+    for partition in (
+        {"type": "list"},
+        {"type": "range", "column": "field1"},
+        {"type": "range", "column": "missing"},
+        {"type": "range", "interval": 0},
+        {"type": "hash", "partitions": True},
+        ["hash"],
+    ):
+        with pytest.raises(InvalidPartitioning):
+            parse_partitioning(partition, FIELDS)
+
+
+@pytest.mark.django_db
+def test_invalid_partition_option_is_rejected(api_client):
+    response = api_client.post(
+        reverse("create-table"),
+        {
+            "name": "BadPartitions",
+            "fields": FIELDS,
+            "partition": {"type": "range", "column": "field1"},
+        },
+        format="json",
+    )
+    assert response.status_code == 400
+    assert "field1" in response.json()["error"]
+    assert not CatalogTable.objects.filter(name="badpartitions").exists()
+
+
+@pytest.mark.django_db
+def test_range_partitions_on_a_number_column(api_client, create_partitioned):
+    table_id = create_partitioned(
+        "RangeByValue", {"type": "range", "column": "field2", "interval": 100}
+    )
+    assert CatalogTable.objects.get(name=table_id).partitioning == {
+        "type": "range",
+        "column": "field2",
+        "interval": 100,
+    }
+    assert partition_names(api_client, table_id) == ["app_rangebyvalue_null"]
+
+    response = api_client.post(
+        reverse("add-row", kwargs={"id": table_id}),
+        {"field1": "a", "field2": 5},
+        format="json",
+    )
+    assert response.status_code == 201
+    rows = [
+        {"field1": "b", "field2": 150},
+        {"field1": "c", "field2": -1},
+        {"field1": "d"},
+    ]
+    response = api_client.post(
+        reverse("add-rows", kwargs={"id": table_id}), rows, format="json"
+    )
+    assert response.status_code == 201
+    assert response.json()["inserted"] == 3
+
+    partitions = api_client.get(reverse("partitions", kwargs={"id": table_id})).json()
+    assert [
+        (p["name"], p.get("from"), p.get("to")) for p in partitions["partitions"]
+    ] == [
+        ("app_rangebyvalue_pm100", -100, 0),
+        ("app_rangebyvalue_p0", 0, 100),
+        ("app_rangebyvalue_p100", 100, 200),
+        ("app_rangebyvalue_null", None, None),
+    ]
+
+    response = api_client.get(
+        reverse("get-rows", kwargs={"id": table_id}), {"field2": 150}
+    )
+    assert [row["field1"] for row in response.json()] == ["b"]
+    response = api_client.get(reverse("get-rows", kwargs={"id": table_id}))
+    assert sorted(row["field1"] for row in response.json()) == ["a", "b", "c", "d"]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "EXPLAIN SELECT * FROM app_rangebyvalue WHERE field2 BETWEEN 120 AND 130"
+        )
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+    # Pruning leaves only the partition that can hold the values
+    assert "app_rangebyvalue_p100" in plan
+    assert "app_rangebyvalue_p0 " not in plan
+    assert "app_rangebyvalue_null" not in plan
+
+
+@pytest.mark.django_db
+def test_drop_old_range_partitions(api_client, create_partitioned):
+    table_id = create_partitioned("RangeById", {"type": "range", "interval": 10})
+    rows = [{"field2": number} for number in range(25)]
+    response = api_client.post(
+        reverse("add-rows", kwargs={"id": table_id}), rows, format="json"
+    )
+    assert response.status_code == 201
+    # The ids to come and one spare interval are covered
+    assert partition_names(api_client, table_id) == [
+        "app_rangebyid_p0",
+        "app_rangebyid_p10",
+        "app_rangebyid_p20",
+        "app_rangebyid_p30",
+    ]
+
+    url = reverse("partitions", kwargs={"id": table_id})
+    assert api_client.delete(url).status_code == 400
+    response = api_client.delete(f"{url}?before=25")
+    assert response.status_code == 200
+    assert response.json()["dropped"] == ["app_rangebyid_p0", "app_rangebyid_p10"]
+
+    response = api_client.get(reverse("get-rows", kwargs={"id": table_id}))
+    assert [row["id"] for row in response.json()] == list(range(20, 26))
+
+    # Ids keep growing into new partitions
+    response = api_client.post(
+        reverse("add-rows", kwargs={"id": table_id}), rows, format="json"
+    )
+    assert response.status_code == 201
+    assert partition_names(api_client, table_id)[-1] == "app_rangebyid_p60"
+
+
+@pytest.mark.django_db
+def test_hash_partitions(api_client, create_partitioned):
+    table_id = create_partitioned(
+        "HashByValue", {"type": "hash", "column": "field2", "partitions": 4}
+    )
+    assert partition_names(api_client, table_id) == [
+        f"app_hashbyvalue_h{remainder}" for remainder in range(4)
+    ]
+    rows = [{"field1": str(number), "field2": number} for number in range(40)]
+    response = api_client.post(
+        reverse("add-rows", kwargs={"id": table_id}), rows, format="json"
+    )
+    assert response.status_code == 201
+    response = api_client.get(
+        reverse("get-rows", kwargs={"id": table_id}), {"field2": 7}
+    )
+    assert [row["field1"] for row in response.json()] == ["7"]
+
+    url = reverse("partitions", kwargs={"id": table_id})
+    assert api_client.delete(f"{url}?before=10").status_code == 400
+
+
+@pytest.mark.django_db
+def test_import_into_range_partitions(api_client, create_partitioned):
+    table_id = create_partitioned(
+        "ImportRanges", {"type": "range", "column": "field2", "interval": 1000}
+    )
+    content = b"field1,field2\na,1\nb,2500\nc,\n"
+    upload = SimpleUploadedFile("rows.csv", content, content_type="text/csv")
+    response = api_client.post(
+        reverse("import-rows", kwargs={"id": table_id}),
+        {"file": upload},
+        format="multipart",
+    )
+    assert response.status_code == 201
+    assert response.json()["inserted"] == 3
+    assert partition_names(api_client, table_id) == [
+        "app_importranges_p0",
+        "app_importranges_p2000",
+        "app_importranges_null",
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_index_on_partitioned_table(api_client, create_partitioned):
+    table_id = create_partitioned(
+        f"IndexedParts{uuid.uuid4().hex[:8]}", {"type": "hash", "partitions": 2}
+    )
+    url = reverse("indexes", kwargs={"id": table_id})
+    response = api_client.post(
+        url, {"fields": ["field1"], "unique": True}, format="json"
+    )
+    assert response.status_code == 400
+
+    response = api_client.post(url, {"fields": ["field1"]}, format="json")
+    assert response.status_code == 201
+    index = response.json()["index"]
+    assert index["valid"] is True
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM pg_inherits WHERE inhparent = %s::regclass",
+            [index["name"]],
+        )
+        assert cursor.fetchone()[0] == 2
+
+    detail_url = reverse("index-detail", kwargs={"id": table_id, "name": index["name"]})
+    assert api_client.delete(detail_url).status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_endpoints_with_range_partitions():
+    name = f"AsyncRanges{uuid.uuid4().hex[:8]}"
+
+    @async_to_sync
+    async def run():
+        client = AsyncClient()
+        try:
+            response = await client.post(
+                reverse("async-create-table"),
+                {
+                    "name": name,
+                    "fields": FIELDS,
+                    "partition": {"type": "range", "column": "field2", "interval": 10},
+                },
+                content_type="application/json",
+            )
+            assert response.status_code == 201
+            table_id = response.json()["table_id"]
+            for number in (1, 11, 21):
+                response = await client.post(
+                    reverse("async-add-row", kwargs={"id": table_id}),
+                    {"field2": number},
+                    content_type="application/json",
+                )
+                assert response.status_code == 201
+            response = await client.get(
+                reverse("async-get-rows", kwargs={"id": table_id})
+            )
+            assert sorted(row["field2"] for row in response.json()) == [1, 11, 21]
+            return table_id
+        finally:
+            await close_pool()
+
+    table_id = run()
+    assert CatalogTable.objects.get(name=table_id).partitioning["interval"] == 10
+    assert len(partition_names(APIClient(), table_id)) == 4
@@ -0,0 +1,156 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from app.db.pool import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def make_pool():
+    params = connection.get_connection_params()
+    pools = []
+
+    def _make_pool(**options):
+        pool = ConnectionPool(lambda: psycopg2.connect(**params), **options)
+        pools.append(pool)
+        return pool
+
+    yield _make_pool
+    for pool in pools:
+        pool.close()
+
+
+@pytest.mark.django_db
+def test_connections_are_reused(make_pool):
+    pool = make_pool(max_size=2, health_check_after=0)
+    conn = pool.getconn()
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        pid = cursor.fetchone()[0]
+    pool.putconn(conn)
+
+    conn = pool.getconn()
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        assert cursor.fetchone()[0] == pid
+    pool.putconn(conn)
+
+    stats = pool.stats()
+    assert stats["checkouts"] == 2
+    assert stats["connections_created"] == 1
+    assert stats["health_checks"] == 1
+    assert stats["idle"] == 1
+
+
+@pytest.mark.django_db
+def test_returned_connection_is_reset(make_pool):
+    pool = make_pool()
+    conn = pool.getconn()
+    with conn.cursor() as cursor:
+        cursor.execute("CREATE TEMPORARY TABLE pool_reset (id int)")
+    pool.putconn(conn)
+    # The open transaction was rolled back, so the table is gone
+    conn = pool.getconn()
+    assert conn.autocommit
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('pool_reset')")
+        assert cursor.fetchone()[0] is None
+    pool.putconn(conn)
+
+
+@pytest.mark.django_db
+def test_full_pool_waits_then_times_out(make_pool):
+    pool = make_pool(max_size=1, timeout=0.05)
+    conn = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+
+    threading.Timer(0.02, pool.putconn, [conn]).start()
+    pool.timeout = 5
+    pool.putconn(pool.getconn())
+
+    stats = pool.stats()
+    assert stats["waits"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["max_wait_seconds"] > 0
+    assert stats["size"] == 1
+
+
+@pytest.mark.django_db
+def test_dead_connection_is_replaced_on_checkout(make_pool):
+    pool = make_pool(health_check_after=0)
+    conn = pool.getconn()
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        pid = cursor.fetchone()[0]
+    pool.putconn(conn)
+
+    killer = make_pool().getconn()
+    with killer.cursor() as cursor:
+        cursor.execute("SELECT pg_terminate_backend(%s)", [pid])
+
+    conn = pool.getconn()
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        assert cursor.fetchone()[0] != pid
+    pool.putconn(conn)
+    stats = pool.stats()
+    assert stats["health_check_failures"] == 1
+    assert stats["connections_created"] == 2
+    assert stats["size"] == 1
+
+
+@pytest.mark.django_db
+def test_idle_connections_above_min_size_are_closed(make_pool):
+    pool = make_pool(min_size=1, max_size=3, max_idle=0.01)
+    conns = [pool.getconn() for _ in range(3)]
+    for conn in conns:
+        pool.putconn(conn)
+    time.sleep(0.02)
+
+    pool.putconn(pool.getconn())
+    stats = pool.stats()
+    assert stats["size"] == 1
+    assert stats["connections_closed"] == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_django_connection_goes_back_to_the_pool():
+    connection.ensure_connection()
+    pool = connection.pool
+    created = pool.stats()["connections_created"]
+    for _ in range(3):
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    assert pool.stats()["connections_created"] == created
+
+
+@pytest.mark.django_db(transaction=True)
+def test_db_pool_command(capsys):
+    call_command("db_pool")
+    assert '"checkouts"' in capsys.readouterr().out
+
+
+class UnresettableConnection:
+    closed = 0
+
+    def get_transaction_status(self):
+        raise psycopg2.OperationalError("server closed the connection")
+
+    def close(self):
+        self.closed = 1
+
+
+def test_connection_that_cannot_be_reset_is_discarded():
+    pool = ConnectionPool(UnresettableConnection)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert conn.closed
+    stats = pool.stats()
+    assert stats["size"] == 0 and stats["idle"] == 0
+    assert stats["connections_closed"] == 1
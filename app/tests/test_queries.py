@@ -0,0 +1,205 @@
+import json
+
+import pytest
+from django.http import QueryDict
+from django.urls import reverse
+
+from app.api.queries import (
+    InvalidQuery,
+    RowQuery,
+    parse_fields,
+    parse_filters,
+    parse_order_by,
+)
+
+COLUMNS = {
+    "id": "bigint",
+    "field1": "character varying",
+    "field2": "integer",
+    "field3": "boolean",
+}
+
+
+def test_parse_filters():
+    params = QueryDict("field1__startswith=ab&field2__gte=3&field2__lt=9&field3=true")
+    assert parse_filters(params, COLUMNS) == [
+        ("field1", "startswith", "ab"),
+        ("field2", "gte", 3),
+        ("field2", "lt", 9),
+        ("field3", "eq", True),
+    ]
+    params = QueryDict("field2__in=1,2&field1__isnull=false&limit=5")
+    assert parse_filters(params, COLUMNS) == [
+        ("field2", "in", [1, 2]),
+        ("field1", "isnull", False),
+    ]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "unknown=1",
+        "field2=abc",
+        "field2__startswith=1",
+        "field3__gt=true",
+        "field2__like=1",
+        "field1__isnull=maybe",
+    ],
+)
+def test_parse_filters_rejects_invalid(query):
+    with pytest.raises(InvalidQuery):
+        parse_filters(QueryDict(query), COLUMNS)
+
+
+def test_parse_order_by():
+    assert parse_order_by("field2,-field1", COLUMNS) == [
+        ("field2", False),
+        ("field1", True),
+    ]
+    with pytest.raises(InvalidQuery):
+        parse_order_by("field9", COLUMNS)
+
+
+@pytest.mark.django_db
+def test_row_query_compiles_to_one_parameterized_statement():
+    query = RowQuery(
+        "app_table",
+        filters=[("field1", "startswith", "50%"), ("field2", "in", [1, 2])],
+        order_by=[("field2", True)],
+        limit=10,
+        after=[5, 42],
+    )
+    sql, params = query.sql()
+    assert sql == (
+        'SELECT * FROM "app_table" WHERE "field1" LIKE %s AND "field2" = ANY(%s) '
+        'AND (("field2" < %s) OR ("field2" = %s AND "id" > %s)) '
+        'ORDER BY "field2" DESC, "id" LIMIT %s'
+    )
+    assert params == ["50\\%%", [1, 2], 5, 5, 42, 11]
+
+
+def test_parse_fields():
+    assert parse_fields("field2, id", COLUMNS) == ["field2", "id"]
+    for raw in ("missing", "field1,field1", "field1,"):
+        with pytest.raises(InvalidQuery):
+            parse_fields(raw, COLUMNS)
+
+
+def test_projected_page_selects_sort_keys_for_the_token():
+    query = RowQuery(
+        "app_table", order_by=[("field2", False)], limit=5, fields=["field1"]
+    )
+    sql, _ = query.sql()
+    assert sql.startswith('SELECT "field1", "field2", "id" FROM "app_table"')
+    assert query.extra_columns == ["field2", "id"]
+
+    # Without paging the sort keys are not needed in the select list
+    query.limit = None
+    assert query.sql()[0].startswith('SELECT "field1" FROM')
+
+
+@pytest.fixture
+def filter_table(api_client, create_table):
+    table_id = create_table(
+        "FilterTable",
+        [
+            {"name": "field1", "type": "string"},
+            {"name": "field2", "type": "number"},
+            {"name": "field3", "type": "boolean"},
+        ],
+    )
+    rows = [
+        {"field1": "apple", "field2": 3, "field3": True},
+        {"field1": "apricot", "field2": None, "field3": False},
+        {"field1": "banana", "field2": 1, "field3": True},
+        {"field1": "a_b", "field2": 3, "field3": None},
+        {"field1": None, "field2": 2, "field3": False},
+    ]
+    url = reverse("add-rows", kwargs={"id": table_id})
+    assert api_client.post(url, rows, format="json").status_code == 201
+    return table_id
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params,expected",
+    [
+        ({"field1__startswith": "ap"}, ["apple", "apricot"]),
+        ({"field1__startswith": "a_"}, ["a_b"]),
+        ({"field2__gte": 2, "field3": "true"}, ["apple"]),
+        ({"field2__in": "1,2"}, ["banana", None]),
+        ({"field2__isnull": "true"}, ["apricot"]),
+        ({"field3__ne": "true"}, ["apricot", None]),
+    ],
+)
+def test_get_rows_filters(api_client, filter_table, params, expected):
+    url = reverse("get-rows", kwargs={"id": filter_table})
+    response = api_client.get(url, {**params, "order_by": "id"})
+    assert response.status_code == 200
+    assert [row["field1"] for row in response.json()] == expected
+
+
+@pytest.mark.django_db
+def test_get_rows_invalid_filter(api_client, filter_table):
+    url = reverse("get-rows", kwargs={"id": filter_table})
+    assert api_client.get(url, {"field2": "x"}).status_code == 400
+    assert api_client.get(url, {"order_by": "missing"}).status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("order_by", ["field2,-field1", "-field2,field1", "-field3,id"])
+def test_get_rows_pages_follow_order_by(api_client, filter_table, order_by):
+    url = reverse("get-rows", kwargs={"id": filter_table})
+    expected = api_client.get(url, {"order_by": order_by}).json()
+
+    seen = []
+    response = api_client.get(url, {"order_by": order_by, "limit": 2})
+    while True:
+        page = response.json()
+        seen.extend(page["results"])
+        if page["next"] is None:
+            break
+        response = api_client.get(
+            url, {"order_by": order_by, "limit": 2, "after": page["next"]}
+        )
+    assert seen == expected
+
+
+@pytest.mark.django_db
+def test_get_rows_token_bound_to_order_by(api_client, filter_table):
+    url = reverse("get-rows", kwargs={"id": filter_table})
+    token = api_client.get(url, {"order_by": "field2", "limit": 2}).json()["next"]
+    response = api_client.get(url, {"order_by": "field1", "after": token})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_get_rows_fields(api_client, filter_table, django_assert_num_queries):
+    url = reverse("get-rows", kwargs={"id": filter_table})
+    with django_assert_num_queries(1):
+        response = api_client.get(url, {"fields": "field1", "field2": 3})
+    assert response.json() == [{"field1": "apple"}, {"field1": "a_b"}]
+
+    streamed = api_client.get(url, {"fields": "field3,field1", "stream": "ndjson"})
+    first = b"".join(streamed.streaming_content).splitlines()[0]
+    assert list(json.loads(first)) == ["field3", "field1"]
+
+    assert api_client.get(url, {"fields": "missing"}).status_code == 400
+    assert api_client.get(url, {"fields": ""}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_get_rows_fields_pages(api_client, filter_table):
+    url = reverse("get-rows", kwargs={"id": filter_table})
+    params = {"fields": "field1", "order_by": "-field2", "limit": 2}
+    seen = []
+    response = api_client.get(url, params)
+    while True:
+        page = response.json()
+        seen.extend(page["results"])
+        if page["next"] is None:
+            break
+        response = api_client.get(url, {**params, "after": page["next"]})
+    expected = api_client.get(url, {"fields": "field1", "order_by": "-field2"})
+    assert seen == expected.json()
+    assert all(list(row) == ["field1"] for row in seen)
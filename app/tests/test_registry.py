@@ -0,0 +1,66 @@
+import pytest
+from django.urls import reverse
+
+from app.api.registry import DynamicModelRegistry, registry
+
+
+@pytest.mark.django_db
+def test_registry_caches_table_entry(create_table):
+    table_id = create_table("RegistryTable", [{"name": "field1", "type": "string"}])
+    cache = DynamicModelRegistry()
+
+    entry = cache.get(f"app_{table_id}")
+    assert list(entry.columns) == ["id", "field1"]
+    assert entry.model._meta.db_table == f"app_{table_id}"
+    assert cache.get(f"app_{table_id}") is entry
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.django_db
+def test_registry_missing_table_is_not_cached():
+    cache = DynamicModelRegistry()
+    assert cache.get("app_does_not_exist") is None
+    assert cache.get("app_does_not_exist") is None
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.django_db
+def test_registry_evicts_least_recently_used(create_table):
+    for name in ("LruA", "LruB", "LruC"):
+        create_table(name, [{"name": "field1", "type": "number"}])
+    cache = DynamicModelRegistry(maxsize=2)
+
+    cache.get("app_lrua")
+    cache.get("app_lrub")
+    cache.get("app_lrua")
+    cache.get("app_lruc")
+
+    assert cache.stats()["evictions"] == 1
+    assert "app_lrub" not in cache._entries
+    assert list(cache._entries) == ["app_lrua", "app_lruc"]
+
+
+@pytest.mark.django_db
+def test_update_table_refreshes_registry(api_client, create_table):
+    table_id = create_table("RegistryUpdate", [{"name": "field1", "type": "string"}])
+    add_row_url = reverse("add-row", kwargs={"id": table_id})
+    assert (
+        api_client.post(add_row_url, {"field1": "a"}, format="json").status_code == 201
+    )
+
+    update_url = reverse("update-table", kwargs={"id": table_id})
+    update_data = {"fields": [{"name": "field2", "type": "number"}]}
+    assert api_client.put(update_url, update_data, format="json").status_code == 200
+
+    assert "field2" in registry.get(f"app_{table_id}").columns
+    row_data = {"field1": "b", "field2": 2}
+    assert api_client.post(add_row_url, row_data, format="json").status_code == 201
+
+
+@pytest.mark.django_db
+def test_update_missing_table_returns_404(api_client):
+    update_url = reverse("update-table", kwargs={"id": "missingtable"})
+    update_data = {"fields": [{"name": "field1", "type": "string"}]}
+    assert api_client.put(update_url, update_data, format="json").status_code == 404
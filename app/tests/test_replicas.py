@@ -0,0 +1,160 @@
+import logging
+import uuid
+
+import pytest
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from app.db import replicas
+from app.db.replicas import ReplicaRouter, check_replica_cache, read_alias
+
+FIELDS = [{"name": "field1", "type": "string"}, {"name": "field2", "type": "number"}]
+
+
+@pytest.fixture
+def add_replica(settings):
+    """Configure database aliases that stand in for replicas.
+
+    Each one is a second connection to the test database, which sees the
+    rows committed by ``transaction=True`` tests as a replica would.
+    """
+    aliases = []
+
+    def _add_replica(alias, **overrides):
+        connections.settings[alias] = {
+            **connections[DEFAULT_DB_ALIAS].settings_dict,
+            **overrides,
+        }
+        aliases.append(alias)
+        settings.DATABASE_REPLICAS = list(aliases)
+        return alias
+
+    caches[settings.ROWS_CACHE_ALIAS].clear()
+    replicas.reset_health()
+    yield _add_replica
+    replicas.reset_health()
+    for alias in aliases:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+
+@pytest.fixture
+def replica_table(api_client, create_table):
+    # Tables outlive transaction=True tests, so every test gets its own
+    table_id = create_table(f"Replicated{uuid.uuid4().hex[:8]}", FIELDS)
+    rows = [{"field1": "a", "field2": 1}, {"field1": "b", "field2": 2}]
+    url = reverse("add-rows", kwargs={"id": table_id})
+    assert api_client.post(url, rows, format="json").status_code == 201
+    return table_id
+
+
+def test_replicas_need_a_shared_rows_cache(settings):
+    assert check_replica_cache(None) == []
+    settings.DATABASE_REPLICAS = ["replica1"]
+    assert [error.id for error in check_replica_cache(None)] == ["app.E001"]
+    settings.CACHES = {
+        **settings.CACHES,
+        settings.ROWS_CACHE_ALIAS: {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://localhost:6379",
+        },
+    }
+    assert check_replica_cache(None) == []
+
+
+def test_router_keeps_the_orm_on_the_primary():
+    router = ReplicaRouter()
+    assert router.db_for_read(None) == DEFAULT_DB_ALIAS
+    assert router.allow_migrate(DEFAULT_DB_ALIAS, "app")
+    assert not router.allow_migrate("replica1", "app")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reads_go_to_the_replica(api_client, replica_table, add_replica, settings):
+    replica = add_replica("replica_test")
+    # Rows written before the replica was configured are not pinned
+    rows_url = reverse("get-rows", kwargs={"id": replica_table})
+    aggregate_url = reverse("aggregate-rows", kwargs={"id": replica_table})
+    with CaptureQueriesContext(connections[replica]) as captured:
+        response = api_client.get(rows_url, {"order_by": "id"})
+        assert [row["field1"] for row in response.json()] == ["a", "b"]
+        streamed = api_client.get(rows_url, {"stream": "ndjson"})
+        assert len(b"".join(streamed.streaming_content).splitlines()) == 2
+        response = api_client.get(aggregate_url, {"metrics": "sum:field2"})
+        assert response.json()["results"] == [{"sum_field2": 3}]
+    statements = [query["sql"] for query in captured]
+    assert any(f"app_{replica_table}" in sql and "SUM" in sql for sql in statements)
+    assert sum(f"app_{replica_table}" in sql for sql in statements) == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reads_after_a_write_stay_on_the_primary(
+    api_client, replica_table, add_replica, settings
+):
+    replica = add_replica("replica_test")
+    api_client.post(
+        reverse("add-row", kwargs={"id": replica_table}),
+        {"field1": "c", "field2": 3},
+        format="json",
+    )
+    rows_url = reverse("get-rows", kwargs={"id": replica_table})
+    with CaptureQueriesContext(connections[replica]) as captured:
+        response = api_client.get(rows_url)
+    assert len(response.json()) == 3
+    assert not any(f"app_{replica_table}" in query["sql"] for query in captured)
+
+    # Once the window has passed the table is read from the replica again
+    caches[settings.ROWS_CACHE_ALIAS].delete(f"table-written:app_{replica_table}")
+    with CaptureQueriesContext(connections[replica]) as captured:
+        api_client.get(rows_url, {"limit": 10})
+    assert any(f"app_{replica_table}" in query["sql"] for query in captured)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unreachable_replica_falls_back_to_the_primary(
+    api_client, replica_table, add_replica, settings
+):
+    settings.REPLICA_CHECK_INTERVAL = 60
+    add_replica("replica_down", HOST="127.0.0.1", PORT=1)
+    assert read_alias() == DEFAULT_DB_ALIAS
+
+    response = api_client.get(reverse("get-rows", kwargs={"id": replica_table}))
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+    replica = add_replica("replica_test")
+    assert read_alias() == replica
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_replica_read_is_retried_on_the_primary(add_replica, monkeypatch):
+    replica = add_replica("replica_test")
+    calls = []
+
+    def read(using):
+        calls.append(using)
+        if using == replica:
+            raise replicas.OperationalError("connection lost")
+        return "rows"
+
+    assert replicas.run_on_replica(read) == "rows"
+    assert calls == [replica, DEFAULT_DB_ALIAS]
+    # The replica is skipped until it is checked again
+    assert read_alias() == DEFAULT_DB_ALIAS
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replica_queries_are_measured(
+    api_client, replica_table, add_replica, settings, caplog
+):
+    add_replica("replica_test")
+    settings.SLOW_REQUEST_MS = 0.001
+    aggregate_url = reverse("aggregate-rows", kwargs={"id": replica_table})
+    with caplog.at_level(logging.WARNING, logger="app.api.middleware"):
+        response = api_client.get(aggregate_url, {"metrics": "sum:field2"})
+    assert response.status_code == 200
+    message = caplog.records[-1].getMessage()
+    assert f'FROM "app_{replica_table}"' in message and "SUM" in message
@@ -0,0 +1,72 @@
+import psycopg2
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+
+def table_columns(table_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = %s ORDER BY ordinal_position",
+            [f"app_{table_id}"],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+@pytest.mark.django_db
+def test_update_table_adds_all_columns(api_client, create_table):
+    table_id = create_table("AlterBatch", [{"name": "field1", "type": "string"}])
+    url = reverse("update-table", kwargs={"id": table_id})
+    update_data = {
+        "fields": [
+            {"name": "field2", "type": "number"},
+            {"name": "field3", "type": "boolean"},
+        ]
+    }
+
+    response = api_client.put(url, update_data, format="json")
+    assert response.status_code == 200
+    assert response.json()["added"] == ["field2", "field3"]
+    assert response.json()["lock_held_ms"] >= 0
+    assert table_columns(table_id) == ["id", "field1", "field2", "field3"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "fields",
+    [
+        [{"name": "field2", "type": "number"}, {"name": "field3", "type": "date"}],
+        [{"name": "field2", "type": "number"}, {"name": "field1", "type": "string"}],
+        [{"name": "field2", "type": "number"}, {"name": "field2", "type": "string"}],
+        [{"name": "field2", "type": "number"}, {"type": "string"}],
+    ],
+)
+def test_update_table_invalid_field_changes_nothing(api_client, create_table, fields):
+    table_id = create_table("AlterInvalid", [{"name": "field1", "type": "string"}])
+    url = reverse("update-table", kwargs={"id": table_id})
+
+    response = api_client.put(url, {"fields": fields}, format="json")
+    assert response.status_code == 400
+    assert table_columns(table_id) == ["id", "field1"]
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(SCHEMA_LOCK_TIMEOUT_MS=50)
+def test_update_table_gives_up_on_lock_timeout(api_client, create_table):
+    table_id = create_table("AlterLocked", [{"name": "field1", "type": "string"}])
+    params = connection.get_connection_params()
+    reader = psycopg2.connect(**params)
+    try:
+        with reader.cursor() as cursor:
+            # An open transaction that has read the table blocks ALTER TABLE
+            cursor.execute(f"SELECT * FROM app_{table_id}")
+        url = reverse("update-table", kwargs={"id": table_id})
+        update_data = {"fields": [{"name": "field2", "type": "number"}]}
+        response = api_client.put(url, update_data, format="json")
+        assert response.status_code == 503
+    finally:
+        reader.rollback()
+        reader.close()
+    assert table_columns(table_id) == ["id", "field1"]
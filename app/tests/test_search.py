@@ -0,0 +1,243 @@
+import uuid
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+from app.api.cache import bump_options_version
+from app.api.jobs import executor
+from app.api.queries import RowQuery
+from app.api.registry import registry
+from app.api.search import InvalidSearch, enable_search, parse_search
+from app.models import Job
+
+FIELDS = [
+    {"name": "title", "type": "string"},
+    {"name": "body", "type": "string"},
+    {"name": "votes", "type": "number"},
+]
+COLUMNS = {
+    "id": "bigint",
+    "title": "character varying",
+    "body": "character varying",
+    "votes": "integer",
+}
+ROWS = [
+    {"title": "Postgres indexes", "body": "GIN indexes speed up search", "votes": 3},
+    {"title": "Cooking", "body": "A recipe for bread", "votes": 5},
+    {"title": "Search", "body": "Search search search in postgres", "votes": 1},
+    {"title": "Gardening", "body": None, "votes": 2},
+]
+
+
+@pytest.fixture
+def search_table(api_client, create_table):
+    def _create(options, rows=ROWS):
+        table_id = create_table(f"Search{uuid.uuid4().hex[:8]}", FIELDS)
+        response = api_client.post(
+            reverse("add-rows", kwargs={"id": table_id}), rows, format="json"
+        )
+        assert response.status_code == 201
+        response = api_client.put(
+            reverse("search", kwargs={"id": table_id}), options, format="json"
+        )
+        assert response.status_code == 200, response.json()
+        return table_id
+
+    return _create
+
+
+def search(api_client, table_id, **params):
+    return api_client.get(reverse("get-rows", kwargs={"id": table_id}), params)
+
+
+@pytest.mark.django_db
+def test_parse_search():
+    assert parse_search({"fields": ["title"]}, COLUMNS) == {
+        "fields": ["title"],
+        "config": "simple",
+    }
+    assert parse_search({"fields": ["body", "title"], "config": "english"}, COLUMNS)
+    for options in (
+        {},
+        {"fields": "title"},
+        {"fields": ["votes"]},
+        {"fields": ["missing"]},
+        {"fields": ["title", "title"]},
+        {"fields": ["title"], "config": "klingon"},
+        ["title"],
+    ):
+        with pytest.raises(InvalidSearch):
+            parse_search(options, COLUMNS)
+
+
+def test_search_query_ranks_matches_in_a_subquery():
+    query = RowQuery(
+        "app_table",
+        filters=[("votes", "gt", 1)],
+        columns=list(COLUMNS),
+        search="postgres",
+        search_config="english",
+        limit=10,
+    )
+    sql, params = query.sql()
+    assert sql == (
+        'SELECT "id", "title", "body", "votes", "_rank" FROM '
+        '(SELECT "id", "title", "body", "votes", '
+        'ts_rank("_search", websearch_to_tsquery(%s::regconfig, %s))::float8 '
+        'AS "_rank" FROM "app_table" '
+        'WHERE "_search" @@ websearch_to_tsquery(%s::regconfig, %s) AND "votes" > %s'
+        ') AS "matches" ORDER BY "_rank" DESC, "id" LIMIT %s'
+    )
+    assert params == ["english", "postgres", "english", "postgres", 1, 11]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_search_is_ranked_and_paginated(api_client, search_table):
+    table_id = search_table({"fields": ["title", "body"], "config": "english"})
+    response = search(api_client, table_id, search="postgres search")
+    assert response.status_code == 200
+    rows = response.json()
+    # The row repeating the words ranks first; the search column is internal
+    assert [row["title"] for row in rows] == ["Search", "Postgres indexes"]
+    assert set(rows[0]) == {"id", "title", "body", "votes"}
+
+    # Stemming by the english configuration
+    response = search(api_client, table_id, search="recipes")
+    assert [row["title"] for row in response.json()] == ["Cooking"]
+    response = search(api_client, table_id, search="postgres -gin", fields="title")
+    assert response.json() == [{"title": "Search"}]
+
+    page = search(api_client, table_id, search="postgres OR bread", limit=2).json()
+    assert len(page["results"]) == 2
+    assert set(page["results"][0]) == {"id", "title", "body", "votes"}
+    rest = search(
+        api_client, table_id, search="postgres OR bread", limit=2, after=page["next"]
+    ).json()
+    titles = [row["title"] for row in page["results"] + rest["results"]]
+    assert sorted(titles) == ["Cooking", "Postgres indexes", "Search"]
+    assert rest["next"] is None
+    # A token only continues the search it came from
+    response = search(api_client, table_id, search="bread", limit=2, after=page["next"])
+    assert response.status_code == 400
+
+    response = search(
+        api_client, table_id, search="postgres", order_by="-votes", votes__gt=1
+    )
+    assert [row["title"] for row in response.json()] == ["Postgres indexes"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_search_column_follows_writes(api_client, search_table):
+    table_id = search_table({"fields": ["body"]})
+    response = api_client.post(
+        reverse("add-row", kwargs={"id": table_id}),
+        {"title": "New", "body": "fresh bread"},
+        format="json",
+    )
+    assert response.status_code == 201
+    response = search(api_client, table_id, search="bread")
+    assert sorted(row["title"] for row in response.json()) == ["Cooking", "New"]
+    # The simple configuration does not stem, and titles are not searched
+    assert search(api_client, table_id, search="breads").json() == []
+    assert search(api_client, table_id, search="cooking").json() == []
+
+    response = api_client.post(
+        reverse("add-row", kwargs={"id": table_id}),
+        {"_search": "bread"},
+        format="json",
+    )
+    assert response.status_code == 400
+
+    indexes = api_client.get(reverse("indexes", kwargs={"id": table_id})).json()
+    assert [index["fields"] for index in indexes["indexes"]] == [["id"], ["_search"]]
+
+    url = reverse("search", kwargs={"id": table_id})
+    assert api_client.delete(url).status_code == 200
+    assert api_client.get(url).json() == {"search": None}
+    assert search(api_client, table_id, search="bread").status_code == 400
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM information_schema.columns "
+            "WHERE table_name = %s AND column_name = '_search'",
+            [f"app_{table_id}"],
+        )
+        assert cursor.fetchone()[0] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_search_on_partitioned_table(api_client):
+    response = api_client.post(
+        reverse("create-table"),
+        {
+            "name": f"SearchParts{uuid.uuid4().hex[:8]}",
+            "fields": FIELDS,
+            "partition": {"type": "hash", "partitions": 2},
+        },
+        format="json",
+    )
+    table_id = response.json()["table_id"]
+    api_client.post(reverse("add-rows", kwargs={"id": table_id}), ROWS, format="json")
+    response = api_client.put(
+        reverse("search", kwargs={"id": table_id}),
+        {"fields": ["title", "body"]},
+        format="json",
+    )
+    assert response.status_code == 200
+    response = search(api_client, table_id, search="gardening")
+    assert [row["votes"] for row in response.json()] == [2]
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "jobs"])
+def test_enable_search_in_background(api_client, create_table):
+    table_id = create_table(f"SearchJob{uuid.uuid4().hex[:8]}", FIELDS)
+    url = reverse("search", kwargs={"id": table_id})
+    response = api_client.put(
+        f"{url}?background=true", {"fields": ["votes"]}, format="json"
+    )
+    assert response.status_code == 400
+
+    response = api_client.put(
+        f"{url}?background=true", {"fields": ["title"]}, format="json"
+    )
+    assert response.status_code == 202
+    job = executor.wait(uuid.UUID(response.json()["job_id"]), timeout=10)
+    assert job.status == Job.SUCCEEDED
+    assert api_client.get(url).json()["search"] == {
+        "fields": ["title"],
+        "config": "simple",
+    }
+
+
+@pytest.mark.django_db
+def test_internal_field_names_are_rejected(api_client, create_table):
+    response = api_client.post(
+        reverse("create-table"),
+        {"name": "Internal", "fields": [{"name": "_search", "type": "string"}]},
+        format="json",
+    )
+    assert response.status_code == 400
+    assert "reserved" in response.json()["error"]
+
+    table_id = create_table("NoSearch", FIELDS)
+    response = api_client.put(
+        reverse("update-table", kwargs={"id": table_id}),
+        {"fields": [{"name": "_rank", "type": "number"}]},
+        format="json",
+    )
+    assert response.status_code == 400
+    assert search(api_client, table_id, search="bread").status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_search_enabled_by_another_process(api_client, create_table):
+    table_id = create_table(f"SearchElsewhere{uuid.uuid4().hex[:8]}", FIELDS)
+    api_client.post(reverse("add-rows", kwargs={"id": table_id}), ROWS, format="json")
+    assert search(api_client, table_id, search="bread").status_code == 400
+
+    # What the PUT of another process does, leaving this registry untouched
+    entry = registry.get(f"app_{table_id}")
+    enable_search(entry, {"fields": ["body"], "config": "simple"}, 1000)
+    bump_options_version(f"app_{table_id}")
+    response = search(api_client, table_id, search="bread")
+    assert [row["title"] for row in response.json()] == ["Cooking"]
@@ -0,0 +1,92 @@
+import uuid
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+FIELDS = [
+    {"name": "title", "type": "string"},
+    {"name": "votes", "type": "number"},
+]
+ROWS = [{"title": None if n % 4 == 0 else f"t{n % 5}", "votes": n} for n in range(40)]
+
+
+def add_rows(api_client, table_id, rows):
+    response = api_client.post(
+        reverse("add-rows", kwargs={"id": table_id}), rows, format="json"
+    )
+    assert response.status_code == 201
+
+
+def analyze(table_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE app_{table_id}")
+
+
+def stats(api_client, table_id, **params):
+    return api_client.get(reverse("stats", kwargs={"id": table_id}), params)
+
+
+@pytest.mark.django_db
+def test_stats_of_analyzed_table(api_client, create_table):
+    table_id = create_table(f"Stats{uuid.uuid4().hex[:8]}", FIELDS)
+    add_rows(api_client, table_id, ROWS)
+    analyze(table_id)
+
+    response = stats(api_client, table_id)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["rows_estimate"] == 40
+    assert result["rows"] is None
+    assert result["table_bytes"] > 0 and result["index_bytes"] > 0
+    assert result["total_bytes"] == result["table_bytes"] + result["index_bytes"]
+    assert result["columns"] == {
+        "id": {"null_frac": 0.0, "n_distinct": 40},
+        "title": {"null_frac": 0.25, "n_distinct": 5},
+        "votes": {"null_frac": 0.0, "n_distinct": 40},
+    }
+
+
+# Writes bump the table's version when they commit
+@pytest.mark.django_db(transaction=True)
+def test_stats_are_cached_but_exact_counts_follow_writes(api_client, create_table):
+    table_id = create_table(f"StatsCache{uuid.uuid4().hex[:8]}", FIELDS)
+    result = stats(api_client, table_id).json()
+    # Never analyzed
+    assert result["rows_estimate"] is None
+    assert result["columns"]["title"] == {"null_frac": None, "n_distinct": None}
+
+    add_rows(api_client, table_id, ROWS)
+    analyze(table_id)
+    assert stats(api_client, table_id).json()["rows_estimate"] is None
+    assert stats(api_client, table_id, exact="true").json()["rows"] == 40
+    add_rows(api_client, table_id, ROWS[:5])
+    assert stats(api_client, table_id, exact="true").json()["rows"] == 45
+
+
+@pytest.mark.django_db
+def test_stats_of_partitioned_table(api_client):
+    response = api_client.post(
+        reverse("create-table"),
+        {
+            "name": f"StatsParts{uuid.uuid4().hex[:8]}",
+            "fields": FIELDS,
+            "partition": {"type": "hash", "partitions": 3},
+        },
+        format="json",
+    )
+    table_id = response.json()["table_id"]
+    add_rows(api_client, table_id, ROWS)
+    analyze(table_id)
+
+    result = stats(api_client, table_id, exact="1").json()
+    assert result["rows_estimate"] == 40 and result["rows"] == 40
+    partitions = api_client.get(reverse("partitions", kwargs={"id": table_id}))
+    sizes = [partition["size_bytes"] for partition in partitions.json()["partitions"]]
+    assert result["total_bytes"] == sum(sizes)
+    assert result["columns"]["title"]["null_frac"] == 0.25
+
+
+@pytest.mark.django_db
+def test_stats_of_missing_table(api_client):
+    assert stats(api_client, "missing").status_code == 404
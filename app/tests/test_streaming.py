@@ -0,0 +1,57 @@
+import json
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+
+
+@pytest.fixture
+def stream_table(api_client, create_table):
+    table_id = create_table(
+        "StreamTable",
+        [{"name": "field1", "type": "string"}, {"name": "field2", "type": "number"}],
+    )
+    rows = [{"field1": f"row {i}", "field2": i} for i in range(5)]
+    url = reverse("add-rows", kwargs={"id": table_id})
+    assert api_client.post(url, rows, format="json").status_code == 201
+    return table_id
+
+
+@pytest.mark.django_db
+@override_settings(ROWS_STREAM_BATCH_SIZE=2)
+def test_stream_rows_ndjson(api_client, stream_table):
+    url = reverse("get-rows", kwargs={"id": stream_table})
+    response = api_client.get(url, {"stream": "ndjson"})
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "application/x-ndjson"
+
+    chunks = [chunk.decode() for chunk in response.streaming_content]
+    assert len(chunks) == 3
+    rows = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert sorted(row["field2"] for row in rows) == [0, 1, 2, 3, 4]
+    assert set(rows[0]) == {"id", "field1", "field2"}
+
+
+@pytest.mark.django_db
+@override_settings(ROWS_STREAM_BATCH_SIZE=2)
+def test_stream_rows_json_array(api_client, stream_table):
+    url = reverse("get-rows", kwargs={"id": stream_table})
+    response = api_client.get(url, {"stream": "json"})
+    assert response.status_code == 200
+    rows = json.loads(b"".join(response.streaming_content))
+    assert sorted(row["field1"] for row in rows) == [f"row {i}" for i in range(5)]
+
+
+@pytest.mark.django_db
+def test_stream_rows_empty_table(api_client, create_table):
+    table_id = create_table("StreamEmpty", [{"name": "field1", "type": "string"}])
+    url = reverse("get-rows", kwargs={"id": table_id})
+    response = api_client.get(url, {"stream": "json"})
+    assert json.loads(b"".join(response.streaming_content)) == []
+
+
+@pytest.mark.django_db
+def test_stream_rows_invalid_format(api_client, stream_table):
+    url = reverse("get-rows", kwargs={"id": stream_table})
+    assert api_client.get(url, {"stream": "xml"}).status_code == 400
@@ -0,0 +1,51 @@
+import pytest
+from django.urls import reverse
+
+from app.api.validators import RowValidator
+
+COLUMNS = {
+    "id": "bigint",
+    "field1": "character varying",
+    "field2": "integer",
+    "field3": "boolean",
+}
+
+
+def test_validate_collects_all_errors():
+    validator = RowValidator(COLUMNS)
+    assert validator.validate({"field1": "a", "field2": 1, "field3": None}) == []
+    assert validator.validate({"field1": 1, "field2": True, "extra": 1}) == [
+        "Invalid data type for field 'field1': expected string",
+        "Invalid data type for field 'field2': expected integer",
+        "Unknown field 'extra'",
+    ]
+    assert validator.validate({"field2": 2**31}) == [
+        "Invalid data type for field 'field2': integer out of range"
+    ]
+    assert validator.validate({"id": 2**31}) == []
+    assert validator.validate(["field1"]) == ["Row must be a JSON object"]
+
+
+def test_validate_many():
+    rows = [{"field1": "a"}, {"field2": "b"}, {"field3": False}, 3]
+    valid, errors = RowValidator(COLUMNS).validate_many(rows)
+    assert valid == [(0, rows[0]), (2, rows[2])]
+    assert [error["index"] for error in errors] == [1, 3]
+
+
+@pytest.mark.django_db
+def test_add_row_reports_every_invalid_field(api_client, create_table):
+    table_id = create_table(
+        "Validated",
+        [{"name": "field1", "type": "string"}, {"name": "field2", "type": "number"}],
+    )
+    url = reverse("add-row", kwargs={"id": table_id})
+    response = api_client.post(
+        url, {"field1": 1, "field2": False, "field9": "x"}, format="json"
+    )
+    assert response.status_code == 400
+    assert len(response.json()["errors"]) == 3
+    assert response.json()["error"] == response.json()["errors"][0]
+
+    response = api_client.post(url, [{"field1": "a"}], format="json")
+    assert response.status_code == 400
@@ -0,0 +1,155 @@
+"""Compare concurrent reads on the WSGI app and the ASGI app.
+
+Seeds a table through the WSGI API, then fires ``--requests`` GETs with
+``--concurrency`` connections at ``/api/table/<id>/rows`` on the WSGI base
+URL and ``/api/async/table/<id>/rows`` on the ASGI base URL. Prints latency
+percentiles and throughput for both, as JSON with ``--json``.
+
+    python benchmarks/async_vs_wsgi.py --wsgi http://localhost:8000 \\
+        --asgi http://localhost:8001 --concurrency 50 --requests 2000
+
+Only the standard library is used, so it runs outside the containers.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import urllib.request
+import uuid
+from urllib.parse import urlsplit
+
+
+def post_json(url, payload):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def seed_table(base_url, rows):
+    name = f"bench{uuid.uuid4().hex[:8]}"
+    table_id = post_json(
+        f"{base_url}/api/table",
+        {
+            "name": name,
+            "fields": [
+                {"name": "label", "type": "string"},
+                {"name": "amount", "type": "number"},
+                {"name": "active", "type": "boolean"},
+            ],
+        },
+    )["table_id"]
+    post_json(
+        f"{base_url}/api/table/{table_id}/rows/bulk",
+        [{"label": f"row {i}", "amount": i, "active": i % 2 == 0} for i in range(rows)],
+    )
+    return table_id
+
+
+async def fetch(host, port, path):
+    """One HTTP/1.1 GET on a fresh connection; returns the status code."""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode()
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    return int(response.split(b" ", 2)[1])
+
+
+async def run_load(url, concurrency, total):
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                code = await fetch(parts.hostname, parts.port or 80, path)
+            except OSError:
+                code = None
+            latencies.append(time.perf_counter() - started)
+            if code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def percentile(p):
+        return round(
+            latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2
+        )
+
+    return {
+        "url": url,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies) * 1000, 2),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": round(latencies[-1] * 1000, 2),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wsgi", default="http://localhost:8000")
+    parser.add_argument("--asgi", default="http://localhost:8001")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument(
+        "--rows", type=int, default=1000, help="rows in the seeded table"
+    )
+    parser.add_argument(
+        "--query", default="limit=100", help="query string of each read"
+    )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    table_id = seed_table(args.wsgi, args.rows)
+    targets = {
+        "wsgi": f"{args.wsgi}/api/table/{table_id}/rows?{args.query}",
+        "asgi": f"{args.asgi}/api/async/table/{table_id}/rows?{args.query}",
+    }
+    results = {
+        name: asyncio.run(run_load(url, args.concurrency, args.requests))
+        for name, url in targets.items()
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, result in results.items():
+        latency = result["latency_ms"]
+        print(
+            f"{name}: {result['requests_per_second']} req/s, "
+            f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+            f"p99 {latency['p99']} ms, errors {result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
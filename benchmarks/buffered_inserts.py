@@ -0,0 +1,141 @@
+"""Throughput of single-row inserts with and without a write buffer.
+
+Creates a synthetic table, then sends ``--rows`` add-row requests from
+``--concurrency`` threads through Django's test client, once per mode:
+``direct`` commits each row in its own transaction, ``flush`` and
+``enqueue`` go through the table's write buffer with that ack mode. The
+``enqueue`` time includes flushing the rows left in the buffer. The table is
+dropped afterwards.
+
+    python benchmarks/buffered_inserts.py --columns 10 --rows 5000 --concurrency 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from app.api.buffers import close_buffer  # noqa: E402
+from app.api.synthetic import (  # noqa: E402
+    drop_table,
+    generate_table,
+    synthetic_fields,
+    synthetic_rows,
+)
+
+MODES = ("direct", "flush", "enqueue")
+
+
+def set_buffer(client, table_id, options):
+    url = reverse("write-buffer", kwargs={"id": table_id})
+    if options is None:
+        response = client.delete(url)
+    else:
+        response = client.put(url, options, content_type="application/json")
+    assert response.status_code == 200, response.content
+
+
+def run_mode(table_id, mode, rows, concurrency, max_rows, max_delay_ms):
+    client = Client(HTTP_HOST="localhost")
+    if mode == "direct":
+        set_buffer(client, table_id, None)
+    else:
+        options = {"max_rows": max_rows, "max_delay_ms": max_delay_ms, "ack": mode}
+        set_buffer(client, table_id, options)
+    url = reverse("add-row", kwargs={"id": table_id})
+
+    def add(row):
+        response = Client(HTTP_HOST="localhost").post(
+            url, row, content_type="application/json"
+        )
+        # Hands the connection back to the pool, as a server does after a request
+        connections.close_all()
+        return response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        statuses = list(pool.map(add, rows))
+    # Rows acknowledged on enqueue are only written by the next flush
+    close_buffer(f"app_{table_id}")
+    seconds = time.perf_counter() - started
+    return {
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(len(rows) / seconds),
+        "statuses": {str(code): statuses.count(code) for code in set(statuses)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-rows", type=int, default=500)
+    parser.add_argument("--max-delay-ms", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    fields = synthetic_fields(args.columns)
+    rows = list(synthetic_rows(fields, args.rows))
+    table_id = generate_table(f"bench_buffer_{os.getpid()}", args.columns, 0)
+    try:
+        measurements = {
+            mode: run_mode(
+                table_id,
+                mode,
+                rows,
+                args.concurrency,
+                args.max_rows,
+                args.max_delay_ms,
+            )
+            for mode in MODES
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {connection.ops.quote_name(f'app_{table_id}')}"
+            )
+            written = cursor.fetchone()[0]
+    finally:
+        close_buffer(f"app_{table_id}")
+        drop_table(table_id)
+    baseline = measurements["direct"]["seconds"]
+    for measurement in measurements.values():
+        measurement["speedup"] = round(baseline / measurement["seconds"], 1)
+
+    results = {
+        "columns": args.columns,
+        "rows": args.rows,
+        "concurrency": args.concurrency,
+        "written": written,
+        "modes": measurements,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{args.rows} rows x {args.columns} columns from {args.concurrency} threads, "
+        f"{written} rows written"
+    )
+    for mode, measurement in measurements.items():
+        print(
+            f"{mode:<8} {measurement['seconds']:>8} s "
+            f"{measurement['rows_per_second']:>8} rows/s ({measurement['speedup']}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Micro-benchmark of encoding row reads in each output format.
+
+Compares the dict-per-row list encoded by ``JsonResponse`` that the rows
+endpoint used to return with the formats of ``app.api.formats``, on rows
+shaped like those of the synthetic benchmark tables.
+
+    python benchmarks/row_formats.py --columns 20 --rows 10000 --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.http import JsonResponse  # noqa: E402
+
+from app.api import formats  # noqa: E402
+from app.api.synthetic import synthetic_fields, synthetic_rows  # noqa: E402
+
+DATA_TYPES = {
+    "string": "character varying",
+    "number": "integer",
+    "boolean": "boolean",
+}
+
+
+def make_rows(column_count, row_count):
+    fields = synthetic_fields(column_count)
+    columns = ["id"] + [field["name"] for field in fields]
+    types = {"id": "bigint"}
+    types.update({field["name"]: DATA_TYPES[field["type"]] for field in fields})
+    rows = [
+        (number, *row.values())
+        for number, row in enumerate(synthetic_rows(fields, row_count), 1)
+    ]
+    return columns, rows, types
+
+
+def dict_per_row(columns, rows, types):
+    """The former rows endpoint body: a dict per row encoded by JsonResponse."""
+    results = [dict(zip(columns, row)) for row in rows]
+    return JsonResponse(results, safe=False).content
+
+
+def best_time(function, number=3, repeat=5):
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    columns, rows, types = make_rows(args.columns, args.rows)
+    encoders = {"dict_per_row": dict_per_row}
+    for name in formats.ROW_FORMATS:
+        encoders[name] = lambda columns, rows, types, name=name: formats.render_rows(
+            name, columns, rows, types
+        )[0]
+
+    measurements = {}
+    for name, encode in encoders.items():
+        seconds = best_time(lambda: encode(columns, rows, types))
+        measurements[name] = {
+            "ms": round(seconds * 1000, 2),
+            "bytes": len(encode(columns, rows, types)),
+        }
+    baseline = measurements["dict_per_row"]["ms"]
+    for measurement in measurements.values():
+        measurement["speedup"] = round(baseline / measurement["ms"], 1)
+
+    results = {
+        "columns": args.columns + 1,
+        "rows": args.rows,
+        "json_encoder": "orjson" if formats.orjson is not None else "json",
+        "formats": measurements,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{args.rows} rows x {args.columns + 1} columns, "
+        f"JSON encoder {results['json_encoder']}"
+    )
+    for name, measurement in measurements.items():
+        print(
+            f"{name:<14} {measurement['ms']:>9} ms {measurement['bytes']:>11} bytes "
+            f"({measurement['speedup']}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Micro-benchmark of row validation on wide tables.
+
+Compares the per-field linear scan over the table's columns that AddRowView
+used to do with the ``RowValidator`` compiled once per schema, for single
+rows and for batches as validated by the bulk endpoint.
+
+    python benchmarks/validators.py --columns 120 --rows 10000 --json
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.api.validators import RowValidator, validate_row  # noqa: E402
+
+TYPES = ["character varying", "integer", "boolean"]
+SAMPLE_VALUES = {"character varying": "some text", "integer": 42, "boolean": True}
+
+
+def make_schema(column_count):
+    columns = {"id": "bigint"}
+    for number in range(column_count):
+        columns[f"field{number}"] = TYPES[number % len(TYPES)]
+    return columns
+
+
+def make_row(columns):
+    return {
+        column: SAMPLE_VALUES[data_type]
+        for column, data_type in columns.items()
+        if column != "id"
+    }
+
+
+def linear_scan_validate(columns, row):
+    """The former AddRowView check: find each field's type by scanning the columns."""
+    column_list = list(columns.items())
+    errors = []
+    for field_name, field_value in row.items():
+        column_type = next(
+            (data_type for name, data_type in column_list if name == field_name), None
+        )
+        if column_type == "integer" and not isinstance(field_value, int):
+            errors.append(
+                f"Invalid data type for field '{field_name}': expected integer"
+            )
+        if column_type == "character varying" and not isinstance(field_value, str):
+            errors.append(
+                f"Invalid data type for field '{field_name}': expected string"
+            )
+        if column_type == "boolean" and not isinstance(field_value, bool):
+            errors.append(
+                f"Invalid data type for field '{field_name}': expected boolean"
+            )
+    return errors
+
+
+def best_time(function, number, repeat=5):
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--columns", type=int, default=120)
+    parser.add_argument("--rows", type=int, default=10000, help="rows per batch")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    columns = make_schema(args.columns)
+    row = make_row(columns)
+    rows = [dict(row) for _ in range(args.rows)]
+    validator = RowValidator(columns)
+    assert not validator.validate(row) and not linear_scan_validate(columns, row)
+
+    single_number = 2000
+    batch_number = 3
+    linear_row = best_time(lambda: linear_scan_validate(columns, row), single_number)
+    compiled_row = best_time(lambda: validator.validate(row), single_number)
+    uncompiled_batch = best_time(
+        lambda: [validate_row(columns, item) for item in rows], batch_number
+    )
+    linear_batch = best_time(
+        lambda: [linear_scan_validate(columns, item) for item in rows], batch_number
+    )
+    compiled_batch = best_time(lambda: validator.validate_many(rows), batch_number)
+
+    results = {
+        "columns": args.columns,
+        "batch_rows": args.rows,
+        "single_row_us": {
+            "linear_scan": round(linear_row * 1e6, 2),
+            "compiled": round(compiled_row * 1e6, 2),
+            "speedup": round(linear_row / compiled_row, 1),
+        },
+        "batch_ms": {
+            "linear_scan": round(linear_batch * 1000, 2),
+            "compiled_per_row": round(uncompiled_batch * 1000, 2),
+            "compiled_once": round(compiled_batch * 1000, 2),
+            "speedup": round(linear_batch / compiled_batch, 1),
+        },
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{args.columns} columns, one row: linear scan "
+        f"{results['single_row_us']['linear_scan']} us, compiled "
+        f"{results['single_row_us']['compiled']} us "
+        f"({results['single_row_us']['speedup']}x)"
+    )
+    print(
+        f"{args.rows} rows: linear scan {results['batch_ms']['linear_scan']} ms, "
+        f"compiled per row {results['batch_ms']['compiled_per_row']} ms, "
+        f"compiled once {results['batch_ms']['compiled_once']} ms "
+        f"({results['batch_ms']['speedup']}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "app.api.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -79,15 +80,63 @@ WSGI_APPLICATION = "project.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # PostgreSQL with a per-process connection pool, see app/db/base.py
+        "ENGINE": "app.db",
         "NAME": os.environ.get("POSTGRES_DB"),
         "USER": os.environ.get("POSTGRES_USER"),
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
         "HOST": "db",
         "PORT": 5432,
+        "POOL": {
+            "MIN_SIZE": int(os.environ.get("DB_POOL_MIN_SIZE", 1)),
+            "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            # Seconds after which idle connections above MIN_SIZE are closed
+            "MAX_IDLE": float(os.environ.get("DB_POOL_MAX_IDLE", 300)),
+            # Seconds a request waits for a connection when all are in use
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+            # Connections idle for longer are checked with SELECT 1 on checkout
+            "HEALTH_CHECK_AFTER": float(
+                os.environ.get("DB_POOL_HEALTH_CHECK_AFTER", 10)
+            ),
+        },
     }
 }
 
+# Read replicas of the default database, as comma separated host[:port]
+# pairs. Row reads and aggregations go to them, everything else to default.
+
+DATABASE_REPLICAS = []
+for number, address in enumerate(
+    filter(None, os.environ.get("DB_REPLICAS", "").split(",")), 1
+):
+    host, _, port = address.strip().partition(":")
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": int(port or 5432),
+        # Give up quickly on a replica that is down and read from default
+        "OPTIONS": {
+            "connect_timeout": int(os.environ.get("DB_REPLICA_CONNECT_TIMEOUT", 2))
+        },
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{number}")
+DATABASE_ROUTERS = ["app.db.replicas.ReplicaRouter"]
+
+# Seconds after a write during which the table is read from default, so that
+# clients see their own writes. Replicas lagging further behind are skipped.
+
+REPLICA_STICKY_SECONDS = float(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))
+
+# Seconds between checks of a replica's availability and lag
+
+REPLICA_CHECK_INTERVAL = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", 1))
+
+# Second connection to default for the state of background jobs, so that
+# progress and cancellation are seen while a job's own transaction is open
+
+DATABASES["jobs"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -143,3 +192,134 @@ LOGGING = {
         "level": "DEBUG",
     },
 }
+
+# Dynamic tables
+# Maximum number of dynamic table models kept in the per-process registry
+
+DYNAMIC_MODEL_REGISTRY_SIZE = int(os.environ.get("DYNAMIC_MODEL_REGISTRY_SIZE", 1024))
+
+# Default number of rows written per INSERT by the bulk row endpoint
+
+BULK_INSERT_CHUNK_SIZE = int(os.environ.get("BULK_INSERT_CHUNK_SIZE", 1000))
+
+# Default and maximum page size of paginated row reads
+
+ROWS_PAGE_SIZE = int(os.environ.get("ROWS_PAGE_SIZE", 100))
+ROWS_MAX_PAGE_SIZE = int(os.environ.get("ROWS_MAX_PAGE_SIZE", 1000))
+
+# Rows fetched per round trip from the server-side cursor of streamed reads
+
+ROWS_STREAM_BATCH_SIZE = int(os.environ.get("ROWS_STREAM_BATCH_SIZE", 2000))
+
+# Rows sent per COPY round trip by file imports
+
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 10000))
+
+# Views pick their own output formats through ?format=, so DRF must not
+# treat that parameter as a renderer override
+
+REST_FRAMEWORK = {
+    "URL_FORMAT_OVERRIDE": None,
+}
+
+# How long schema changes wait for the table lock before giving up
+
+SCHEMA_LOCK_TIMEOUT_MS = int(os.environ.get("SCHEMA_LOCK_TIMEOUT_MS", 5000))
+
+# asyncpg connection pool used by the async endpoints under /api/async/
+
+ASYNC_DB_POOL = {
+    "MIN_SIZE": int(os.environ.get("ASYNC_DB_POOL_MIN_SIZE", 2)),
+    "MAX_SIZE": int(os.environ.get("ASYNC_DB_POOL_MAX_SIZE", 20)),
+    # Seconds after which idle connections above MIN_SIZE are closed
+    "MAX_IDLE": float(os.environ.get("ASYNC_DB_POOL_MAX_IDLE", 300)),
+}
+
+# Requests to /api/ slower than this are logged with the SQL they ran; 0 disables the log
+
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", 0))
+
+# Cache of table versions and row read responses. It must be shared when the
+# app runs in several processes; docker-compose.yml points it at Redis. The
+# local memory default only suits a single process.
+
+ROWS_CACHE_BACKEND = os.environ.get(
+    "ROWS_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "rows": {
+        "BACKEND": ROWS_CACHE_BACKEND,
+        "LOCATION": os.environ.get("ROWS_CACHE_LOCATION", "table-rows"),
+        "TIMEOUT": int(os.environ.get("ROWS_CACHE_TIMEOUT", 300)),
+    },
+}
+# Redis evicts by its own maxmemory policy, and takes OPTIONS as client options
+if not ROWS_CACHE_BACKEND.endswith(".RedisCache"):
+    CACHES["rows"]["OPTIONS"] = {
+        # Entries kept before the least recently used ones are evicted
+        "MAX_ENTRIES": int(os.environ.get("ROWS_CACHE_MAX_ENTRIES", 1000)),
+    }
+ROWS_CACHE_ALIAS = "rows"
+
+# Row read responses larger than this are not cached
+
+ROWS_CACHE_MAX_BYTES = int(os.environ.get("ROWS_CACHE_MAX_BYTES", 1024 * 1024))
+
+# Background jobs (app/api/jobs.py): threads per process, and how many jobs
+# of a kind may run at once, as comma separated kind=limit pairs
+
+JOBS_MAX_WORKERS = int(os.environ.get("JOBS_MAX_WORKERS", 4))
+JOBS_KIND_LIMITS = {
+    "add_columns": 1,
+    "create_index": 1,
+    **{
+        kind.strip(): int(limit)
+        for kind, _, limit in (
+            pair.partition("=")
+            for pair in os.environ.get("JOBS_KIND_LIMITS", "").split(",")
+            if pair.strip()
+        )
+    },
+}
+
+# Where uploads of background imports wait for their job
+
+JOBS_UPLOAD_DIR = os.environ.get("JOBS_UPLOAD_DIR") or None
+
+# Seconds between progress updates (and cancellation checks) of a job
+
+JOBS_PROGRESS_INTERVAL = float(os.environ.get("JOBS_PROGRESS_INTERVAL", 1))
+
+# Most jobs listed by GET /api/jobs, newest first
+
+JOBS_LIST_LIMIT = int(os.environ.get("JOBS_LIST_LIMIT", 100))
+
+# Buffered single-row inserts (app/api/buffers.py), for tables that opt in:
+# rows queued per table before requests wait for room, and how long they wait
+
+WRITE_BUFFER_CAPACITY = int(os.environ.get("WRITE_BUFFER_CAPACITY", 10000))
+WRITE_BUFFER_PUT_TIMEOUT_MS = int(os.environ.get("WRITE_BUFFER_PUT_TIMEOUT_MS", 1000))
+
+# Defaults of a table's buffer: flush every MAX_ROWS rows or MAX_DELAY_MS
+# after the first queued row, whichever comes first
+
+WRITE_BUFFER_MAX_ROWS = int(os.environ.get("WRITE_BUFFER_MAX_ROWS", 500))
+WRITE_BUFFER_MAX_DELAY_MS = int(os.environ.get("WRITE_BUFFER_MAX_DELAY_MS", 50))
+
+# Longest an ack=flush request waits for its row to be written; the row stays
+# queued when the wait runs out
+
+WRITE_BUFFER_ACK_TIMEOUT_MS = int(os.environ.get("WRITE_BUFFER_ACK_TIMEOUT_MS", 30000))
+
+# Change feed (app/api/changes.py): the longest wait= of a long poll, and how
+# often a waiting poll looks again when no notification woke it
+
+CHANGES_MAX_WAIT = float(os.environ.get("CHANGES_MAX_WAIT", 30))
+CHANGES_POLL_INTERVAL = float(os.environ.get("CHANGES_POLL_INTERVAL", 1))
+
+# Seconds the statistics of a table (app/api/stats.py) are cached
+
+STATS_CACHE_SECONDS = int(os.environ.get("STATS_CACHE_SECONDS", 30))